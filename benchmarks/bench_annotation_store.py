@@ -0,0 +1,85 @@
+"""Benchmark of annotation store
+
+Compare build time and retained memory between
+  dict  : {image_id: [{"annotation_id": ..., "class_id": ..., "bbox": [...], "score": ...}, ...]}
+  table : AnnotationTable built by AnnotationTableBuilder (columnar NumPy arrays)
+
+Usage:
+    python benchmarks/bench_annotation_store.py --num-images 100000 --boxes-per-image 10
+"""
+import argparse
+from collections import defaultdict
+import gc
+import random
+import time
+import tracemalloc
+
+from objdet_converter.utils.annotation_table import AnnotationTableBuilder
+
+
+def create_box_list(num_images: int, boxes_per_image: int) -> list:
+    random.seed(0)
+    box_list = list()
+    for image_id in range(num_images):
+        for _ in range(boxes_per_image):
+            box_list.append((
+                image_id,
+                random.randint(1, 80),
+                [random.uniform(0, 600), random.uniform(0, 400), random.uniform(1, 40), random.uniform(1, 80)],
+            ))
+    return box_list
+
+def build_dict(box_list: list):
+    image_id_to_annotation_list = defaultdict(list)
+    for annotation_id, (image_id, class_id, bbox) in enumerate(box_list, 1):
+        image_id_to_annotation_list[image_id].append({
+            "annotation_id": annotation_id,
+            "class_id": class_id,
+            # Parsers create a new list per box
+            "bbox": list(bbox),
+            "score": None,
+        })
+    return image_id_to_annotation_list
+
+def build_table(box_list: list):
+    builder = AnnotationTableBuilder()
+    for annotation_id, (image_id, class_id, bbox) in enumerate(box_list, 1):
+        builder.add(image_id, annotation_id, class_id, bbox)
+    return builder.build()
+
+def measure(func, box_list: list) -> dict:
+    # Time is measured without tracemalloc, which slows down allocation heavy code
+    gc.collect()
+    start = time.perf_counter()
+    store = func(box_list)
+    elapsed = time.perf_counter() - start
+    del store
+    gc.collect()
+    tracemalloc.start()
+    # Kept alive until traced memory is read, so that 'retained' is memory held by the store
+    store = func(box_list)
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del store
+    return {
+        "time_sec": round(elapsed, 3),
+        "retained_mib": round(retained / 1024 / 1024, 1),
+        "peak_traced_mib": round(peak / 1024 / 1024, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark annotation store")
+    parser.add_argument("--num-images", type=int, default=100000, help="Number of images")
+    parser.add_argument("--boxes-per-image", type=int, default=10, help="Number of boxes per image")
+    args = parser.parse_args()
+    box_list = create_box_list(args.num_images, args.boxes_per_image)
+    print(f"{len(box_list)} boxes")
+    print(f"{'':6} {'time[s]':>9} {'retained[MiB]':>14} {'peak[MiB]':>10}")
+    for label, func in [("dict", build_dict), ("table", build_table)]:
+        result = measure(func, box_list)
+        print(f"{label:6} {result['time_sec']:>9} {result['retained_mib']:>14} {result['peak_traced_mib']:>10}")
+
+
+if __name__ == "__main__":
+    main()
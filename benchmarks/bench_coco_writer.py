@@ -0,0 +1,123 @@
+"""Benchmark of MSCOCO json writer
+
+Compare time, peak traced memory and file size between
+  legacy   : build whole annotation dict and json.dump(indent=4)
+  stream   : MSCOCODataset.dump_json() (default, byte-identical to legacy)
+  compact  : MSCOCODataset.dump_json() with compact_json=True
+  gzip     : MSCOCODataset.dump_json() with compact_json=True, gzip_json=True
+
+Usage:
+    python benchmarks/bench_coco_writer.py --num-images 10000 --boxes-per-image 20
+"""
+import argparse
+from collections import defaultdict
+import json
+import logging
+from pathlib import Path
+import random
+import tempfile
+import time
+import tracemalloc
+
+from objdet_converter.utils.mscoco import MSCOCODataset
+
+
+def create_dataset(dst_path: Path, num_images: int, boxes_per_image: int, **kwargs) -> MSCOCODataset:
+    random.seed(0)
+    image_id_to_image_info = dict()
+    image_id_to_annotation_list = defaultdict(list)
+    annotation_id = 1
+    for image_id in range(num_images):
+        image_id_to_image_info[image_id] = {
+            "file_name": f"{image_id:08d}.jpg",
+            "file_path": f"/data/images/{image_id:08d}.jpg",
+            "width": 640,
+            "height": 480,
+        }
+        for _ in range(boxes_per_image):
+            image_id_to_annotation_list[image_id].append({
+                "annotation_id": annotation_id,
+                "class_id": random.randint(1, 80),
+                "bbox": [random.uniform(0, 600), random.uniform(0, 400), random.uniform(1, 40), random.uniform(1, 80)],
+                "score": None,
+            })
+            annotation_id += 1
+    class_id_to_class_name = {class_id: f"class_{class_id}" for class_id in range(1, 81)}
+    class_name_to_class_id = {class_name: class_id for class_id, class_name in class_id_to_class_name.items()}
+    dataset = MSCOCODataset(dst_path, "", "", **kwargs)
+    dataset.set_data(image_id_to_image_info, image_id_to_annotation_list, class_id_to_class_name, class_name_to_class_id)
+    return dataset
+
+def legacy_dump_json(dataset: MSCOCODataset) -> Path:
+    """Writer before streaming. Whole json tree is built before dumping"""
+    images = list()
+    for image_id, image_info in dataset.image_id_to_image_info.items():
+        images.append({
+            "license": 100, "file_name": image_info["file_name"], "coco_url": image_info["file_path"],
+            "height": image_info["height"], "width": image_info["width"], "date_captured": "",
+            "flickr_url": "", "id": image_id,
+        })
+    annotations = list()
+    for image_id, annotation_list in dataset.image_id_to_annotation_list.items():
+        for annotation in annotation_list:
+            bbox = annotation["bbox"]
+            annotations.append({
+                "segmentation": [], "num_keypoints": 0, "area": bbox[2] * bbox[3], "iscrowd": 0,
+                "keypoints": [], "image_id": image_id, "bbox": bbox, "category_id": annotation["class_id"],
+                "id": annotation["annotation_id"], "caption": "hoge hoge",
+            })
+    categories = [
+        {"supercategory": "Unspecified", "id": class_id, "name": class_name, "keypoints": [], "skeleton": []}
+        for class_id, class_name in dataset.class_id_to_class_name.items()
+    ]
+    annotation_dict = dict()
+    annotation_dict.update(dataset.info_dict)
+    annotation_dict.update(dataset.license)
+    annotation_dict.update({"images": images, "annotations": annotations, "categories": categories})
+    dst_path = dataset.dst_path / "annotation.json"
+    dst_path.parent.mkdir(exist_ok=True, parents=True)
+    with open(dst_path, "w") as f:
+        json.dump(annotation_dict, f, indent=4)
+    return dst_path
+
+def stream_dump_json(dataset: MSCOCODataset) -> Path:
+    dataset.dump_json()
+    return dataset.dst_path
+
+def measure(func, dataset: MSCOCODataset) -> dict:
+    # Time is measured without tracemalloc, which slows down allocation heavy code
+    start = time.perf_counter()
+    dst_path = func(dataset)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func(dataset)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "time_sec": round(elapsed, 3),
+        "peak_traced_mib": round(peak / 1024 / 1024, 1),
+        "file_size_mib": round(dst_path.stat().st_size / 1024 / 1024, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MSCOCO json writer")
+    parser.add_argument("--num-images", type=int, default=10000, help="Number of images")
+    parser.add_argument("--boxes-per-image", type=int, default=20, help="Number of boxes per image")
+    args = parser.parse_args()
+    logging.getLogger("logger").setLevel(logging.WARNING)
+    case_list = [
+        ("legacy", legacy_dump_json, dict()),
+        ("stream", stream_dump_json, dict()),
+        ("compact", stream_dump_json, {"compact_json": True}),
+        ("gzip", stream_dump_json, {"compact_json": True, "gzip_json": True}),
+    ]
+    print(f"{'':8} {'time[s]':>9} {'peak[MiB]':>10} {'size[MiB]':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for label, func, options in case_list:
+            dataset = create_dataset(Path(tmp_dir) / label, args.num_images, args.boxes_per_image, **options)
+            result = measure(func, dataset)
+            print(f"{label:8} {result['time_sec']:>9} {result['peak_traced_mib']:>10} {result['file_size_mib']:>10}")
+
+
+if __name__ == "__main__":
+    main()
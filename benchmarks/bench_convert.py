@@ -0,0 +1,164 @@
+"""Benchmark of every conversion route through 'convert_format'
+
+A synthetic dataset is generated by 'synthetic_dataset.py' and each src->dst route is converted
+in a fresh subprocess, so that peak RSS of the route is measured independently.
+Results are written as JSON to compare runs before and after upgrading.
+    seconds       : Wall time of 'convert_format'
+    files_per_sec : Images converted per second
+    boxes_per_sec : Boxes converted per second
+    peak_rss_mb   : Peak RSS of the converting process ('worker_peak_rss_mb' for its worker processes)
+    output_files  : Number of written files, to notice routes which converted nothing
+
+Usage:
+    python benchmarks/bench_convert.py --num-images 10000 --boxes-per-image 20 --output result.json
+    python benchmarks/bench_convert.py --dataset-dir ./synthetic --routes yolo:coco pascalvoc:yolo --workers 4
+"""
+import argparse
+import json
+import os
+from pathlib import Path
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from synthetic_dataset import FORMAT_PATH_DICT, IMAGE_REQUIRED_FORMAT_LIST, generate_dataset
+
+FORMAT_LIST = list(FORMAT_PATH_DICT)
+
+
+def _get_peak_rss_mb(who) -> float:
+    # Kilobytes on Linux, bytes on macOS
+    max_rss = resource.getrusage(who).ru_maxrss
+    if sys.platform == "darwin":
+        return max_rss / 1024 / 1024
+    return max_rss / 1024
+
+def run_route(src_format: str, dst_format: str, src_path: str, dst_path: str, class_txt_path: str, options: dict) -> dict:
+    """Convert one route in this process. Called in subprocess
+
+    Returns:
+        dict: {"seconds", "peak_rss_mb", "worker_peak_rss_mb"}
+    """
+    import logging
+    from objdet_converter.convert import convert_format
+    logging.getLogger("logger").disabled = True
+    start = time.perf_counter()
+    convert_format(src_format, dst_format, src_path, dst_path, class_txt_path, **options)
+    seconds = time.perf_counter() - start
+    return {
+        "seconds": seconds,
+        "peak_rss_mb": _get_peak_rss_mb(resource.RUSAGE_SELF),
+        "worker_peak_rss_mb": _get_peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+
+def measure_route(src_format: str, dst_format: str, summary: dict, output_dir: Path, options: dict) -> dict:
+    """Convert one route in a subprocess and compute throughput"""
+    result = {"src": src_format, "dst": dst_format}
+    if src_format in IMAGE_REQUIRED_FORMAT_LIST and not summary["with_images"]:
+        result["status"] = "skipped (images required)"
+        return result
+    dst_path = output_dir / f"{src_format}_to_{dst_format}"
+    if dst_format == "coco":
+        dst_path = dst_path / "annotation.json"
+    class_txt_path = summary["class_txt_path"] if src_format == "yolo" else ""
+    command = [
+        sys.executable, __file__, "--run-route",
+        json.dumps([src_format, dst_format, summary["paths"][src_format], str(dst_path), class_txt_path, options]),
+    ]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    # Converter calls exit() on invalid input, so result line may be missing even if return code is 0
+    output_line = completed.stdout.strip().split("\n")[-1]
+    if completed.returncode != 0 or not output_line.startswith("{"):
+        result["status"] = "failed"
+        result["error"] = completed.stderr.strip().split("\n")[-1]
+        return result
+    route_result = json.loads(output_line)
+    output_file_count = sum(len(file_name_list) for _, _, file_name_list in os.walk(output_dir / f"{src_format}_to_{dst_format}"))
+    seconds = route_result["seconds"]
+    result.update({
+        "status": "ok",
+        "seconds": round(seconds, 4),
+        "files_per_sec": round(summary["num_images"] / seconds, 1),
+        "boxes_per_sec": round(summary["num_boxes"] / seconds, 1),
+        "peak_rss_mb": round(route_result["peak_rss_mb"], 1),
+        "worker_peak_rss_mb": round(route_result["worker_peak_rss_mb"], 1),
+        "output_files": output_file_count,
+    })
+    shutil.rmtree(output_dir / f"{src_format}_to_{dst_format}", ignore_errors=True)
+    return result
+
+def get_environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark all conversion routes")
+    parser.add_argument("--dataset-dir", type=str, default="", help="Dataset dir. Generated in temporary dir if empty, "
+                        "reused if it has been generated with the same parameters")
+    parser.add_argument("--num-images", type=int, default=1000, help="Number of images")
+    parser.add_argument("--boxes-per-image", type=int, default=10, help="Number of boxes per image")
+    parser.add_argument("--num-classes", type=int, default=20, help="Number of classes")
+    parser.add_argument("--no-images", action="store_true", help="Do not write placeholder images. YOLO/KITTI sources are skipped")
+    parser.add_argument("--routes", type=str, nargs="*", default=None, help="Routes as 'src:dst'. All routes if not specified")
+    parser.add_argument("--workers", type=int, default=1, help="'workers' option of convert_format")
+    parser.add_argument("--io-threads", type=int, default=0, help="'io_threads' option of convert_format")
+    parser.add_argument("--output", type=str, default="", help="JSON output path. Printed to stdout if empty")
+    parser.add_argument("--run-route", type=str, default="", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run_route:
+        print(json.dumps(run_route(*json.loads(args.run_route))))
+        return
+
+    if args.routes is None:
+        route_list = [(src, dst) for src in FORMAT_LIST for dst in FORMAT_LIST if src != dst]
+    else:
+        route_list = [tuple(route.split(":")) for route in args.routes]
+    # Image metadata cache is disabled, so that every run probes images
+    options = {"no_cache": True, "workers": args.workers, "io_threads": args.io_threads}
+    config = {
+        "num_images": args.num_images,
+        "boxes_per_image": args.boxes_per_image,
+        "num_classes": args.num_classes,
+        "with_images": not args.no_images,
+        "options": options,
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        dataset_dir = Path(args.dataset_dir) if args.dataset_dir else Path(tmp_dir) / "dataset"
+        summary_path = dataset_dir / "summary.json"
+        summary = None
+        if summary_path.exists():
+            with open(summary_path) as f:
+                summary = json.load(f)
+            if summary["config"] != {key: config[key] for key in summary["config"]}:
+                summary = None
+        if summary is None:
+            print("Generating dataset", file=sys.stderr)
+            summary = generate_dataset(dataset_dir, args.num_images, args.boxes_per_image, args.num_classes,
+                                       with_images=not args.no_images)
+            summary["config"] = {key: value for key, value in config.items() if key != "options"}
+            with open(summary_path, "w") as f:
+                json.dump(summary, f, indent=4)
+        result_list = list()
+        for src_format, dst_format in route_list:
+            print(f"{src_format} -> {dst_format}", file=sys.stderr)
+            result_list.append(measure_route(src_format, dst_format, summary, Path(tmp_dir) / "output", options))
+    report = {"config": config, "environment": get_environment(), "results": result_list}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+    else:
+        print(json.dumps(report, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Benchmark of YOLO/KITTI label file parsing
+
+Compare boxes/sec of line by line parsing and batch parsing of 'label_reader.py' on synthetic label files.
+Image sizes are given, so that only label files are read.
+
+Usage:
+    python benchmarks/bench_label_reader.py --num-files 20000 --boxes-per-file 20
+"""
+import argparse
+import gc
+from pathlib import Path
+import random
+import tempfile
+import time
+
+from objdet_converter.utils import kitti, yolo
+from objdet_converter.utils.label_reader import split_label_batches
+
+IMAGE_SIZE = (640, 480, 3)
+
+
+def create_files(dst_dir: Path, num_files: int, boxes_per_file: int) -> tuple:
+    random.seed(0)
+    yolo_task_list = list()
+    kitti_task_list = list()
+    for index in range(num_files):
+        yolo_line_list = list()
+        kitti_line_list = list()
+        for _ in range(boxes_per_file):
+            center_x, center_y, width, height = [round(random.random(), 6) for _ in range(4)]
+            yolo_line_list.append(f"{random.randint(0, 79)} {center_x} {center_y} {width} {height}")
+            left = random.uniform(0, 600)
+            top = random.uniform(0, 440)
+            kitti_line_list.append(
+                f"class{random.randint(1, 20)} 0.0 0 0 {left:.2f} {top:.2f} {left + random.uniform(1, 40):.2f} "
+                f"{top + random.uniform(1, 40):.2f} 0 0 0 0 0 0 0"
+            )
+        yolo_path = dst_dir / f"{index:08d}_yolo.txt"
+        yolo_path.write_text("\n".join(yolo_line_list) + "\n")
+        kitti_path = dst_dir / f"{index:08d}_kitti.txt"
+        kitti_path.write_text("\n".join(kitti_line_list) + "\n")
+        # Image path is not opened since image size is given
+        yolo_task_list.append((yolo_path, Path(f"{index:08d}.jpg"), IMAGE_SIZE))
+        kitti_task_list.append((kitti_path, Path(f"{index:08d}.jpg"), IMAGE_SIZE))
+    return yolo_task_list, kitti_task_list
+
+def measure(name: str, func, num_boxes: int):
+    # Results of previous run are alive, so GC is disabled for fair comparison
+    gc.collect()
+    gc.disable()
+    start = time.perf_counter()
+    results = func()
+    elapsed = time.perf_counter() - start
+    gc.enable()
+    print(f"{name:14} {elapsed:>9.3f} {num_boxes / elapsed:>12.0f}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark YOLO/KITTI label parsing")
+    parser.add_argument("--num-files", type=int, default=20000, help="Number of label files per format")
+    parser.add_argument("--boxes-per-file", type=int, default=20, help="Number of boxes per file")
+    args = parser.parse_args()
+    num_boxes = args.num_files * args.boxes_per_file
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        yolo_task_list, kitti_task_list = create_files(Path(tmp_dir), args.num_files, args.boxes_per_file)
+        print(f"{args.num_files} files, {num_boxes} boxes per format")
+        print(f"{'':14} {'time[s]':>9} {'boxes/sec':>12}")
+        for module, task_list in [(yolo, yolo_task_list), (kitti, kitti_task_list)]:
+            format_name = module.__name__.split(".")[-1]
+            line_results = measure(
+                f"{format_name} line", lambda: [module._parse_annotation_file(task) for task in task_list], num_boxes
+            )
+            batch_results = measure(
+                f"{format_name} batch",
+                lambda: [result for task_batch in split_label_batches(task_list, 1) for result in module._parse_annotation_batch(task_batch)],
+                num_boxes,
+            )
+            print(f"Results identical: {line_results == batch_results}")
+
+
+if __name__ == "__main__":
+    main()
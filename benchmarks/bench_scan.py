@@ -0,0 +1,87 @@
+"""Benchmark of annotation/image file discovery
+
+Compare stat/scandir syscall counts and time between
+  before: glob() for class scan + glob() for annotation parsing + check_image_existence() per file
+  after : scan_annotation_dir() once
+
+Usage:
+    python benchmarks/bench_scan.py --num-files 10000
+"""
+import argparse
+import os
+from pathlib import Path
+import tempfile
+import time
+
+from objdet_converter.utils.utils import check_image_existence, scan_annotation_dir
+
+
+class SyscallCounter:
+    """Count calls of os functions that issue filesystem syscalls"""
+    target_name_list = ["stat", "lstat", "scandir", "listdir"]
+
+    def __init__(self) -> None:
+        self.counts = {name: 0 for name in self.target_name_list}
+        self.originals = dict()
+
+    def __enter__(self):
+        for name in self.target_name_list:
+            original = getattr(os, name)
+            self.originals[name] = original
+            def counted(*args, _name=name, _original=original, **kwargs):
+                self.counts[_name] += 1
+                return _original(*args, **kwargs)
+            setattr(os, name, counted)
+        return self
+
+    def __exit__(self, *args):
+        for name, original in self.originals.items():
+            setattr(os, name, original)
+
+def create_dataset(root: Path, num_files: int, num_dirs: int) -> None:
+    # Images are placed with the last extension in check order (worst case for probing)
+    for i in range(num_files):
+        dir_path = root / f"dir_{i % num_dirs:03d}"
+        dir_path.mkdir(exist_ok=True)
+        (dir_path / f"{i:08d}.txt").write_text("0 0.5 0.5 0.1 0.1\n")
+        (dir_path / f"{i:08d}.tif").touch()
+
+def run_before(root: Path) -> int:
+    # Class scan
+    sorted(root.glob("**/*txt"))
+    # Annotation parsing
+    found_count = 0
+    for annotation_path in sorted(root.glob("**/*txt")):
+        if check_image_existence(annotation_path):
+            found_count += 1
+    return found_count
+
+def run_after(root: Path) -> int:
+    annotation_image_list = scan_annotation_dir(root, "txt")
+    return sum(1 for _, image_path in annotation_image_list if image_path is not None)
+
+def measure(func, root: Path) -> dict:
+    with SyscallCounter() as counter:
+        start = time.perf_counter()
+        found_count = func(root)
+        elapsed = time.perf_counter() - start
+    return {"found": found_count, "time_sec": round(elapsed, 4), "syscalls": counter.counts}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark annotation/image file discovery")
+    parser.add_argument("--num-files", type=int, default=10000, help="Number of annotation files")
+    parser.add_argument("--num-dirs", type=int, default=10, help="Number of sub directories")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir)
+        create_dataset(root, args.num_files, args.num_dirs)
+        before = measure(run_before, root)
+        after = measure(run_after, root)
+    print(f"{'':8} {'found':>8} {'time[s]':>9} " + " ".join(f"{name:>9}" for name in SyscallCounter.target_name_list))
+    for label, result in [("before", before), ("after", after)]:
+        counts = " ".join(f"{result['syscalls'][name]:>9}" for name in SyscallCounter.target_name_list)
+        print(f"{label:8} {result['found']:>8} {result['time_sec']:>9} {counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Benchmark of YOLO/KITTI text writers
+
+Compare time and boxes/sec of MSCOCODataset YOLO and KITTI writers between
+  legacy : per-box scalar np.clip/round and print() per line
+  batch  : MSCOCODataset.convert() (batched conversion, one write per file)
+
+Usage:
+    python benchmarks/bench_text_writer.py --num-images 50000 --boxes-per-image 20
+"""
+import argparse
+import logging
+from pathlib import Path
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from objdet_converter.utils.annotation_table import AnnotationTableBuilder
+from objdet_converter.utils.mscoco import MSCOCODataset
+from objdet_converter.utils.utils import absolute2relative, topleftwh2centerwh, topleftwh2topleftbottomright
+
+
+def create_dataset(dst_path: Path, num_images: int, boxes_per_image: int) -> MSCOCODataset:
+    random.seed(0)
+    image_id_to_image_info = dict()
+    builder = AnnotationTableBuilder()
+    annotation_id = 1
+    for image_id in range(num_images):
+        image_id_to_image_info[image_id] = {
+            "file_name": f"{image_id:08d}.jpg",
+            "file_path": f"/data/images/{image_id:08d}.jpg",
+            "width": 640,
+            "height": 480,
+        }
+        for _ in range(boxes_per_image):
+            bbox = [random.uniform(-10, 620), random.uniform(-10, 460), random.uniform(1, 60), random.uniform(1, 80)]
+            builder.add(image_id, annotation_id, random.randint(1, 80), bbox)
+            annotation_id += 1
+    class_id_to_class_name = {class_id: f"class {class_id}" for class_id in range(1, 81)}
+    class_name_to_class_id = {class_name: class_id for class_id, class_name in class_id_to_class_name.items()}
+    dataset = MSCOCODataset(dst_path, "", "")
+    dataset.set_data(image_id_to_image_info, builder.build(), class_id_to_class_name, class_name_to_class_id)
+    return dataset
+
+def legacy_convert(dataset: MSCOCODataset, format: str) -> None:
+    """Writers before batching. Each value is clipped, rounded and each line is printed one by one"""
+    dataset.dst_path.mkdir(exist_ok=True, parents=True)
+    for image_id, image_info in dataset.image_id_to_image_info.items():
+        image_width = image_info["width"]
+        image_height = image_info["height"]
+        with open(dataset.dst_path / Path(image_info["file_name"]).with_suffix(".txt"), "w") as f:
+            for annotation in dataset.image_id_to_annotation_list[image_id]:
+                class_name = dataset.class_id_to_class_name[annotation["class_id"]]
+                if format == "yolo":
+                    class_id = dataset.class_name_to_class_id[class_name]
+                    bbox = topleftwh2centerwh(annotation["bbox"])
+                    bbox = absolute2relative(bbox, image_width, image_height)
+                    bbox = [str(round(np.clip(b, 0, 1), 4)) for b in bbox]
+                    print(f"{class_id-1} {' '.join(bbox)}", file=f)
+                else:
+                    bbox = topleftwh2topleftbottomright(annotation["bbox"])
+                    bbox[0] = np.clip(bbox[0], 0, image_width)
+                    bbox[1] = np.clip(bbox[1], 0, image_height)
+                    bbox[2] = np.clip(bbox[2], 0, image_width)
+                    bbox[3] = np.clip(bbox[3], 0, image_height)
+                    bbox = [str(round(b, 4)) for b in bbox]
+                    print(f"{class_name.replace(' ', '-')} 0.0 0 0 {' '.join(bbox)} 0 0 0 0 0 0 0", file=f)
+
+def batch_convert(dataset: MSCOCODataset, format: str) -> None:
+    dataset.convert(format)
+
+def compare_output(dir_a: Path, dir_b: Path) -> bool:
+    for path_a in sorted(dir_a.glob("*.txt")):
+        if path_a.name == "classes.txt":
+            continue
+        if path_a.read_bytes() != (dir_b / path_a.name).read_bytes():
+            return False
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark YOLO/KITTI text writers")
+    parser.add_argument("--num-images", type=int, default=50000, help="Number of images")
+    parser.add_argument("--boxes-per-image", type=int, default=20, help="Number of boxes per image")
+    args = parser.parse_args()
+    logging.getLogger("logger").setLevel(logging.WARNING)
+    num_boxes = args.num_images * args.boxes_per_image
+    print(f"{num_boxes} boxes, {args.num_images} files")
+    print(f"{'':14} {'time[s]':>9} {'boxes/sec':>12}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for format in ["yolo", "kitti"]:
+            for label, func in [("legacy", legacy_convert), ("batch", batch_convert)]:
+                dataset = create_dataset(Path(tmp_dir) / f"{format}_{label}", args.num_images, args.boxes_per_image)
+                start = time.perf_counter()
+                func(dataset, format)
+                elapsed = time.perf_counter() - start
+                print(f"{format + ' ' + label:14} {elapsed:>9.3f} {num_boxes / elapsed:>12.0f}")
+            same = compare_output(Path(tmp_dir) / f"{format}_legacy", Path(tmp_dir) / f"{format}_batch")
+            print(f"{format} output identical: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark of PascalVOC annotation file parsers
+
+Compare files/sec of parsers in 'voc_parser.py' on synthetic LabelImg style annotation files
+  etree : xml.etree.ElementTree
+  lxml  : lxml.etree (skipped if not installed)
+  fast  : regular expressions for standard VOC layout
+
+Usage:
+    python benchmarks/bench_voc_parser.py --num-files 100000 --objects-per-file 10
+"""
+import argparse
+from pathlib import Path
+import random
+import tempfile
+import time
+
+from objdet_converter.utils import voc_parser
+from objdet_converter.utils.voc_parser import get_voc_parser, VOC_PARSER_LIST
+
+OBJECT_TEMPLATE = """\t<object>
+\t\t<name>{class_name}</name>
+\t\t<pose>Unspecified</pose>
+\t\t<truncated>0</truncated>
+\t\t<difficult>0</difficult>
+\t\t<bndbox>
+\t\t\t<xmin>{xmin}</xmin>
+\t\t\t<ymin>{ymin}</ymin>
+\t\t\t<xmax>{xmax}</xmax>
+\t\t\t<ymax>{ymax}</ymax>
+\t\t</bndbox>
+\t</object>
+"""
+ANNOTATION_TEMPLATE = """<annotation verified="yes">
+\t<folder>images</folder>
+\t<filename>{file_name}</filename>
+\t<path>/data/images/{file_name}</path>
+\t<source>
+\t\t<database>Unknown</database>
+\t</source>
+\t<size>
+\t\t<width>640</width>
+\t\t<height>480</height>
+\t\t<depth>3</depth>
+\t</size>
+\t<segmented>0</segmented>
+{objects}</annotation>
+"""
+
+
+def create_files(dst_dir: Path, num_files: int, objects_per_file: int) -> list:
+    random.seed(0)
+    path_list = list()
+    for index in range(num_files):
+        object_list = list()
+        for _ in range(objects_per_file):
+            xmin = random.randint(0, 600)
+            ymin = random.randint(0, 440)
+            object_list.append(OBJECT_TEMPLATE.format(
+                class_name=f"class{random.randint(1, 20)}",
+                xmin=xmin,
+                ymin=ymin,
+                xmax=xmin + random.randint(1, 40),
+                ymax=ymin + random.randint(1, 40),
+            ))
+        annotation_path = dst_dir / f"{index:08d}.xml"
+        annotation_path.write_text(ANNOTATION_TEMPLATE.format(file_name=f"{index:08d}.jpg", objects="".join(object_list)))
+        path_list.append(annotation_path)
+    return path_list
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PascalVOC parsers")
+    parser.add_argument("--num-files", type=int, default=100000, help="Number of annotation files")
+    parser.add_argument("--objects-per-file", type=int, default=10, help="Number of objects per file")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path_list = create_files(Path(tmp_dir), args.num_files, args.objects_per_file)
+        print(f"{len(path_list)} files")
+        print(f"{'':6} {'time[s]':>9} {'files/sec':>12}")
+        result_dict = dict()
+        for name in VOC_PARSER_LIST:
+            if name == "lxml" and voc_parser.lxml_etree is None:
+                print(f"{name:6} skipped (lxml not installed)")
+                continue
+            parse_func = get_voc_parser(name)
+            start = time.perf_counter()
+            for annotation_path in path_list:
+                parse_func(annotation_path, None)
+            elapsed = time.perf_counter() - start
+            result_dict[name] = [parse_func(annotation_path, None) for annotation_path in path_list[:1000]]
+            print(f"{name:6} {elapsed:>9.3f} {len(path_list) / elapsed:>12.0f}")
+        same = all(result == result_dict["etree"] for result in result_dict.values())
+        print(f"Results of first 1000 files identical: {same}")
+
+
+if __name__ == "__main__":
+    main()
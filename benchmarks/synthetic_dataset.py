@@ -0,0 +1,164 @@
+"""Synthetic dataset generator for benchmarks
+
+Create the same random dataset in MSCOCO, YOLO, KITTI and PascalVOC format.
+    <dst_dir>/coco.json
+    <dst_dir>/yolo/       : '*.txt', 'classes.txt' and images
+    <dst_dir>/kitti/      : '*.txt' and images
+    <dst_dir>/pascalvoc/  : '*.xml' and images
+YOLO and KITTI readers get image sizes from image files, so small placeholder images are written by default.
+Every image is the same PNG of given size, which is encoded once and copied.
+Without images, only MSCOCO and PascalVOC can be converted.
+
+Usage:
+    python benchmarks/synthetic_dataset.py ./synthetic --num-images 10000 --boxes-per-image 20 --num-classes 80
+"""
+import argparse
+import json
+from pathlib import Path
+import random
+
+import cv2
+import numpy as np
+
+# Source path of each format under dataset dir
+FORMAT_PATH_DICT = {
+    "coco": "coco.json",
+    "yolo": "yolo",
+    "kitti": "kitti",
+    "pascalvoc": "pascalvoc",
+}
+
+# Formats whose reader probes image files for sizes
+IMAGE_REQUIRED_FORMAT_LIST = ["yolo", "kitti"]
+
+OBJECT_TEMPLATE = """  <object>
+    <name>{class_name}</name>
+    <pose>Unspecified</pose>
+    <truncated>0</truncated>
+    <difficult>0</difficult>
+    <bndbox>
+      <xmin>{xmin}</xmin>
+      <ymin>{ymin}</ymin>
+      <xmax>{xmax}</xmax>
+      <ymax>{ymax}</ymax>
+    </bndbox>
+  </object>
+"""
+ANNOTATION_TEMPLATE = """<annotation>
+  <folder>pascalvoc</folder>
+  <filename>{file_name}</filename>
+  <size>
+    <width>{width}</width>
+    <height>{height}</height>
+    <depth>3</depth>
+  </size>
+  <segmented>0</segmented>
+{objects}</annotation>
+"""
+
+
+def generate_dataset(dst_dir, num_images: int = 1000, boxes_per_image: int = 10, num_classes: int = 20,
+                     image_size: tuple = (640, 480), with_images: bool = True, seed: int = 0) -> dict:
+    """Generate synthetic dataset in all formats
+
+    Args:
+        dst_dir (str | pathlib.Path): Output directory
+        num_images (int): Number of images
+        boxes_per_image (int): Number of boxes per image
+        num_classes (int): Number of classes
+        image_size (tuple): (width, height) of all images
+        with_images (bool): Write placeholder images
+        seed (int): Random seed
+
+    Returns:
+        dict: Summary. {"num_images", "num_boxes", "num_classes", "with_images", "paths": {format: path}, "class_txt_path"}
+    """
+    dst_dir = Path(dst_dir)
+    random.seed(seed)
+    width, height = image_size
+    class_name_list = [f"class{index}" for index in range(num_classes)]
+    format_dir_dict = {name: dst_dir / FORMAT_PATH_DICT[name] for name in ["yolo", "kitti", "pascalvoc"]}
+    for format_dir in format_dir_dict.values():
+        format_dir.mkdir(parents=True, exist_ok=True)
+    image_data = None
+    if with_images:
+        image_data = cv2.imencode(".png", np.zeros((height, width, 3), dtype=np.uint8))[1].tobytes()
+    image_list = list()
+    annotation_list = list()
+    for image_index in range(num_images):
+        file_name = f"{image_index:08d}.png"
+        image_list.append({"id": image_index+1, "file_name": file_name, "width": width, "height": height})
+        yolo_line_list = list()
+        kitti_line_list = list()
+        voc_object_list = list()
+        for _ in range(boxes_per_image):
+            class_index = random.randrange(num_classes)
+            box_width = random.randint(1, width // 4)
+            box_height = random.randint(1, height // 4)
+            left = random.randint(0, width - box_width)
+            top = random.randint(0, height - box_height)
+            annotation_list.append({
+                "id": len(annotation_list)+1,
+                "image_id": image_index+1,
+                "category_id": class_index+1,
+                "bbox": [left, top, box_width, box_height],
+                "area": box_width * box_height,
+                "iscrowd": 0,
+            })
+            yolo_line_list.append(
+                f"{class_index} {(left + box_width / 2) / width} {(top + box_height / 2) / height} "
+                f"{box_width / width} {box_height / height}\n"
+            )
+            kitti_line_list.append(
+                f"{class_name_list[class_index]} 0.0 0 0 {left} {top} {left + box_width} {top + box_height} 0 0 0 0 0 0 0\n"
+            )
+            voc_object_list.append(OBJECT_TEMPLATE.format(
+                class_name=class_name_list[class_index], xmin=left, ymin=top, xmax=left + box_width, ymax=top + box_height
+            ))
+        stem = f"{image_index:08d}"
+        (format_dir_dict["yolo"] / f"{stem}.txt").write_text("".join(yolo_line_list))
+        (format_dir_dict["kitti"] / f"{stem}.txt").write_text("".join(kitti_line_list))
+        (format_dir_dict["pascalvoc"] / f"{stem}.xml").write_text(ANNOTATION_TEMPLATE.format(
+            file_name=file_name, width=width, height=height, objects="".join(voc_object_list)
+        ))
+        if with_images:
+            for format_dir in format_dir_dict.values():
+                (format_dir / file_name).write_bytes(image_data)
+    class_txt_path = format_dir_dict["yolo"] / "classes.txt"
+    class_txt_path.write_text("".join(f"{class_name}\n" for class_name in class_name_list))
+    with open(dst_dir / FORMAT_PATH_DICT["coco"], "w") as f:
+        json.dump({
+            "info": {},
+            "licenses": [],
+            "images": image_list,
+            "annotations": annotation_list,
+            "categories": [{"id": index+1, "name": class_name} for index, class_name in enumerate(class_name_list)],
+        }, f)
+    return {
+        "num_images": num_images,
+        "num_boxes": num_images * boxes_per_image,
+        "num_classes": num_classes,
+        "with_images": with_images,
+        "paths": {name: str(dst_dir / path) for name, path in FORMAT_PATH_DICT.items()},
+        "class_txt_path": str(class_txt_path),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic MSCOCO/YOLO/KITTI/PascalVOC dataset")
+    parser.add_argument("dst_dir", type=str, help="Output directory")
+    parser.add_argument("--num-images", type=int, default=1000, help="Number of images")
+    parser.add_argument("--boxes-per-image", type=int, default=10, help="Number of boxes per image")
+    parser.add_argument("--num-classes", type=int, default=20, help="Number of classes")
+    parser.add_argument("--image-size", type=int, nargs=2, default=[640, 480], metavar=("WIDTH", "HEIGHT"), help="Image size")
+    parser.add_argument("--no-images", action="store_true", help="Do not write placeholder images")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+    summary = generate_dataset(
+        args.dst_dir, args.num_images, args.boxes_per_image, args.num_classes,
+        tuple(args.image_size), not args.no_images, args.seed,
+    )
+    print(json.dumps(summary, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,41 @@
+from functools import wraps
+
 import fire
 
-from .convert import convert_format
-from .utils.utils import supported_data_format_list
+from .convert import clean_cache, convert_format
+from .utils.registry import get_format_list
 
 def help():
     print("Usage:")
     print("objdet-conv convert --src-format 'SRC_FORMAT' --dst-format 'DST_FORMAT' --src-path 'PATH_TO_SRC' --dst-path 'PAST_TO_OUTPUT' --class-txt-path 'IF NEEDED'")
-    print(f"Supported format: {', '.join(supported_data_format_list)}")
+    print("Options:")
+    print("  --no-cache              Do not use image metadata cache")
+    print("  --cache-path 'PATH'     Image metadata cache file or dir (default: user cache dir)")
+    print("  --workers N             Number of parser processes and file writers, 0 means all CPU cores (default: 1)")
+    print("  --writer-pool TYPE      Pool type for file writers, 'thread' or 'process' (default: thread)")
+    print("  --compact-json          Write MSCOCO json without indent")
+    print("  --gzip-json             Write MSCOCO json compressed with gzip (*.json.gz)")
+    print("  --json-shard-images N   Split MSCOCO json into shards of at most N images with index file")
+    print("  --json-shard-size SIZE  Split MSCOCO json into shards of about SIZE bytes, e.g. 512M (default: no split)")
+    print("  --incremental           Convert only annotation files added or changed since last run")
+    print("  --voc-parser NAME       PascalVOC parser, 'fast', 'etree' or 'lxml' (default: fast)")
+    print("  --io-threads N          Threads per process keeping file reads/writes in flight, for NFS etc. (default: 0)")
+    print("  --progress              Print progress of parsed/written files with rate and ETA")
+    print("  --profile               Print time of each stage, file/box counts and bytes read/written")
+    print("  --profile-json 'PATH'   Write the stats above as JSON")
+    print("  --cprofile-path 'PATH'  Dump cProfile stats of main process, e.g. for snakeviz")
+    print("objdet-conv clean-cache [--max-age-days N] [--all] [--cache-path 'PATH']")
+    print(f"Supported format: {', '.join(get_format_list())}")
+
+@wraps(convert_format)
+def convert(*args, **kwargs):
+    # Returned stats are not printed by fire. See '--profile' instead
+    convert_format(*args, **kwargs)
 
 convert_app = {
     "help": help,
-    "convert": convert_format,
+    "convert": convert,
+    "clean-cache": clean_cache,
 }
 
 def app() -> None:
@@ -1,10 +1,19 @@
+import cProfile
+import json
 import logging
+import time
 
-from .utils.utils import check_format_validation
+from .utils.utils import check_format_validation, parse_byte_size
 from .utils.format_converter import ObjDetFormatConverter
+from .utils.image_cache import ImageMetaCache
+from .utils.parallel import WRITER_POOL_LIST
+from .utils.progress import ProgressPrinter
+from .utils.registry import get_reader_class, get_writer_class
+from .utils.stats import reset_stats
+from .utils.voc_parser import VOC_PARSER_LIST
 
 
-def convert_format(src_format, dst_format, src_path, dst_path, class_txt_path=""):
+def get_logger():
     logger = logging.getLogger("logger")
     if not logger.hasHandlers():
         st_handler = logging.StreamHandler()
@@ -12,6 +21,25 @@ def convert_format(src_format, dst_format, src_path, dst_path, class_txt_path=""
         st_handler.setFormatter(logging.Formatter(format))
         logger.setLevel(logging.INFO)
         logger.addHandler(st_handler)
+    return logger
+
+def convert_format(src_format, dst_format, src_path, dst_path, class_txt_path="",
+                   no_cache=False, cache_path="", workers=1, writer_pool="thread",
+                   compact_json=False, gzip_json=False, incremental=False, voc_parser="fast",
+                   json_shard_images=0, json_shard_size=0, io_threads=0,
+                   profile=False, profile_json="", cprofile_path="", progress=False):
+    """Convert dataset. See 'ObjDetFormatConverter' for options
+
+    Args:
+        profile (bool): Log time of each stage and counters. See 'stats.py' as well.
+        profile_json (str): Write stats as JSON into this path
+        cprofile_path (str): Run conversion under cProfile and dump stats into this path (main process only)
+        progress (bool): Print progress with rate and ETA into stderr. See 'progress.py' as well.
+
+    Returns:
+        False | ConversionStats: False if arguments are invalid, else stats of the conversion
+    """
+    logger = get_logger()
 
     if src_format == dst_format:
         logger.error("Input format and Output format are same")
@@ -20,13 +48,77 @@ def convert_format(src_format, dst_format, src_path, dst_path, class_txt_path=""
         return False
     if not check_format_validation(dst_format):
         return False
+    if not voc_parser in VOC_PARSER_LIST:
+        logger.error(f"PascalVOC parser '{voc_parser}' not supported. Choose from {VOC_PARSER_LIST}")
+        return False
+    if not writer_pool in WRITER_POOL_LIST:
+        logger.error(f"Writer pool '{writer_pool}' not supported. Choose from {WRITER_POOL_LIST}")
+        return False
+    json_shard_size = parse_byte_size(json_shard_size)
+    if json_shard_size is None:
+        logger.error("Invalid shard size. e.g. 500000000, '512M', '2G'")
+        return False
+    if get_reader_class(src_format) is None:
+        logger.error(f"Format '{src_format}' can not be read")
+        return False
+    if get_writer_class(dst_format) is None:
+        logger.error(f"Format '{dst_format}' can not be written")
+        return False
+    stats = reset_stats()
+    start = time.perf_counter()
+    profiler = None
+    if cprofile_path:
+        profiler = cProfile.Profile()
+        profiler.enable()
     obj_det_format_converter = ObjDetFormatConverter(
         src_format,
         dst_format,
         src_path,
         dst_path,
         class_txt_path,
+        use_cache=not no_cache,
+        cache_path=cache_path,
+        workers=workers,
+        writer_pool=writer_pool,
+        compact_json=compact_json,
+        gzip_json=gzip_json,
+        incremental=incremental,
+        voc_parser=voc_parser,
+        json_shard_images=int(json_shard_images),
+        json_shard_size=json_shard_size,
+        io_threads=int(io_threads),
+        progress_callback=ProgressPrinter() if progress else None,
     )
     obj_det_format_converter.run_convert()
+    stats.total_time = time.perf_counter() - start
+    if not profiler is None:
+        profiler.disable()
+        profiler.dump_stats(cprofile_path)
+        logger.info(f"cProfile stats written to '{cprofile_path}'")
     logger.info("Converting completed")
+    if profile:
+        for line in stats.format_table():
+            logger.info(line)
+    if profile_json:
+        with open(profile_json, "w") as f:
+            json.dump(stats.as_dict(), f, indent=4)
+    return stats
+
+def clean_cache(cache_path="", max_age_days=None, all=False):
+    """Clean up image metadata cache
+       Entries of removed or changed images are deleted.
 
+    Args:
+        cache_path (str): Cache file path. If empty, default path in user cache dir is used
+        max_age_days (None | float): Delete entries not used for the days as well
+        all (bool): Delete all entries
+    """
+    logger = get_logger()
+    image_meta_cache = ImageMetaCache(cache_path)
+    if all:
+        image_meta_cache.clear()
+        logger.info(f"All entries deleted from '{image_meta_cache.cache_path}'")
+    else:
+        deleted_count = image_meta_cache.cleanup(max_age_days)
+        logger.info(f"{deleted_count} entries deleted from '{image_meta_cache.cache_path}'")
+    image_meta_cache.close()
@@ -0,0 +1,110 @@
+"""Conversion of datasets in memory
+   Same conversion as 'convert_format()' for data held by the caller. No file is read or written,
+   image files are not probed, and invalid data raises an exception instead of stopping the process.
+"""
+import logging
+from pathlib import Path
+
+import numpy as np
+
+from .utils.annotation_writer import YoloFileWriter
+from .utils.mscoco import MSCOCODataset, MSCOCOWriter
+from .utils.utils import topleftbottomright2topleftwh
+from .utils.voc_parser import get_voc_parser
+
+
+def coco_to_yolo(coco_dict: dict) -> dict:
+    """Convert MSCOCO dict to YOLO arrays. Values are same as YOLO files written by 'convert_format()'
+
+    Args:
+        coco_dict (dict): Same structure as MSCOCO json file. 'images', 'annotations' and 'categories' are used
+
+    Returns:
+        dict: {"classes": [class name of each YOLO class index as str, ...],
+               "images": [{"id", "file_name", "width", "height",
+                           "labels": (N,) int64 class indexes,
+                           "bboxes": (N, 4) float64 relative [center_x, center_y, width, height]}, ...]}
+
+    Raises:
+        ValueError: If 'coco_dict' is malformed
+    """
+    mscoco_data = MSCOCODataset("", "", "")
+    mscoco_data.load_dict(coco_dict)
+    writer = YoloFileWriter("", mscoco_data.class_id_to_class_name, mscoco_data.class_name_to_class_id)
+    annotation_table = mscoco_data.annotation_table
+    bboxes, _ = writer.convert_table(mscoco_data.image_id_to_image_info, annotation_table)
+    labels = np.array([writer.get_label(class_id) for class_id in annotation_table.class_id.tolist()], dtype=np.int64)
+    image_list = list()
+    for image_id, image_info in mscoco_data.image_id_to_image_info.items():
+        rows = annotation_table.rows(image_id)
+        image_list.append({
+            "id": image_id,
+            "file_name": image_info["file_name"],
+            "width": image_info["width"],
+            "height": image_info["height"],
+            "labels": labels[rows],
+            "bboxes": bboxes[rows],
+        })
+    # Lacked class ids are filled with the id itself. Written as str into 'classes.txt'
+    class_name_list = [str(class_name) for class_name in mscoco_data.class_id_to_class_name.values()]
+    return {"classes": class_name_list, "images": image_list}
+
+def voc_to_coco(xml_list: list, class_list: list = None, voc_parser: str = "fast") -> dict:
+    """Convert PascalVOC XML strings to MSCOCO dict. Values are same as json file written by 'convert_format()'
+       Annotations without image size are ignored, since image files are not probed.
+
+    Args:
+        xml_list (list): Content of each annotation file. str is encoded in UTF-8, bytes are parsed as file content
+        class_list (None | list): Class names. Class ids are assigned in sorted class name order if None
+        voc_parser (str): PascalVOC parser. 'fast', 'etree' or 'lxml'. See 'voc_parser.py' as well.
+
+    Returns:
+        dict: {"info", "licenses", "images", "annotations", "categories"}. Image id is index in 'xml_list'
+
+    Raises:
+        ValueError: If an XML is malformed or has a class not in 'class_list'
+    """
+    logger = logging.getLogger("logger")
+    parse_func = get_voc_parser(voc_parser)
+    named_record_list = list()
+    class_name_set = set()
+    for index, data in enumerate(xml_list):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        # Used for messages and as image file name if 'filename' is not given
+        annotation_path = Path(f"{index}.xml")
+        try:
+            image_path, image_width, image_height, object_list, message_list, appeared_class_name_set = parse_func(
+                annotation_path, None, data
+            )
+        except SyntaxError as e:
+            # ParseError of xml.etree and lxml
+            raise ValueError(f"{index}-th XML could not be parsed: {e}") from e
+        class_name_set.update(appeared_class_name_set)
+        if (image_width is None) or (image_height is None):
+            logger.warning(f"Image size not specified in {annotation_path}, Ignored")
+            continue
+        for message in message_list:
+            logger.warning(message)
+        image_info = {
+            "file_name": image_path.name,
+            "file_path": str(image_path),
+            "width": image_width,
+            "height": image_height,
+        }
+        object_list = [(class_name, topleftbottomright2topleftwh(bbox)) for class_name, bbox in object_list]
+        named_record_list.append((index, image_info, object_list))
+    if class_list is None:
+        class_list = sorted(class_name_set)
+    class_id_to_class_name = {index+1: class_name for index, class_name in enumerate(class_list) if class_name != ""}
+    class_name_to_class_id = {class_name: class_id for class_id, class_name in class_id_to_class_name.items()}
+    for index, _, object_list in named_record_list:
+        for class_name, _ in object_list:
+            if not class_name in class_name_to_class_id:
+                raise ValueError(f"Class '{class_name}' of {index}-th XML not found in 'class_list'")
+    records = (
+        (index, image_info, [(class_name_to_class_id[class_name], bbox, None) for class_name, bbox in object_list])
+        for index, image_info, object_list in named_record_list
+    )
+    writer = MSCOCOWriter("", class_id_to_class_name, class_name_to_class_id)
+    return writer.create_dataset(*writer.collect_records(records)).to_dict()
@@ -0,0 +1,239 @@
+from array import array
+from collections.abc import Mapping
+from typing import Iterator, Union
+
+import numpy as np
+
+from .utils import bbox_array2list
+
+
+class AnnotationTable:
+    """Columnar annotation store
+       Annotations are held in contiguous arrays grouped by image, instead of one dict per box.
+       Rows of 'image_ids[i]' are 'offsets[i]:offsets[i+1]'.
+
+    Attributes:
+        image_ids (np.ndarray): (M,) int64. Image ids in order of first appearance
+        offsets (np.ndarray): (M+1,) int64. Row offset of each image
+        annotation_id (np.ndarray): (N,) int64
+        class_id (np.ndarray): (N,) int64
+        bbox (np.ndarray): (N, 4) float64. Absolute [left, top, width, height]
+        bbox_is_int (np.ndarray): (N, 4) bool. Whether each bbox value was given as integer,
+                                  so that the value is written back in the same form
+        score (np.ndarray): (N,) float64. NaN if not provided
+    """
+    def __init__(self, image_ids, offsets, annotation_id, class_id, bbox, bbox_is_int, score) -> None:
+        self.image_ids = image_ids
+        self.offsets = offsets
+        self.annotation_id = annotation_id
+        self.class_id = class_id
+        self.bbox = bbox
+        self.bbox_is_int = bbox_is_int
+        self.score = score
+        self.image_id_to_group_index = {image_id: index for index, image_id in enumerate(image_ids.tolist())}
+
+    def __len__(self) -> int:
+        return len(self.annotation_id)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of arrays in bytes"""
+        return sum(column.nbytes for column in [
+            self.image_ids, self.offsets, self.annotation_id, self.class_id, self.bbox, self.bbox_is_int, self.score,
+        ])
+
+    def rows(self, image_id) -> slice:
+        """Get row range of the image. Empty range if the image has no annotation
+
+        Args:
+            image_id (int): Image id
+
+        Returns:
+            slice: Row range
+        """
+        group_index = self.image_id_to_group_index.get(image_id)
+        if group_index is None:
+            return slice(0, 0)
+        return slice(int(self.offsets[group_index]), int(self.offsets[group_index+1]))
+
+    def iter_images(self) -> Iterator:
+        """Iterate images which have annotations
+
+        Yields:
+            tuple: (image_id, rows)
+        """
+        offset_list = self.offsets.tolist()
+        for group_index, image_id in enumerate(self.image_ids.tolist()):
+            yield image_id, slice(offset_list[group_index], offset_list[group_index+1])
+
+    def bbox_list(self, rows: slice) -> list:
+        """Get bboxes as lists of python numbers. Integer values are returned as int
+
+        Args:
+            rows (slice): Row range
+
+        Returns:
+            list: [[left, top, width, height], ...]
+        """
+        return bbox_array2list(self.bbox[rows], self.bbox_is_int[rows])
+
+    def annotation_list(self, image_id) -> list:
+        """Get annotations of the image in dict form. See 'base.py' as well.
+
+        Args:
+            image_id (int): Image id
+
+        Returns:
+            list: [{"annotation_id": ..., "class_id": ..., "bbox": [...], "score": ...}, ...]
+        """
+        rows = self.rows(image_id)
+        return [
+            {
+                "annotation_id": annotation_id,
+                "class_id": class_id,
+                "bbox": bbox,
+                "score": None if score != score else score,
+            }
+            for annotation_id, class_id, bbox, score in zip(
+                self.annotation_id[rows].tolist(),
+                self.class_id[rows].tolist(),
+                self.bbox_list(rows),
+                self.score[rows].tolist(),
+            )
+        ]
+
+    def as_annotation_lists(self) -> "AnnotationListView":
+        """Get read-only view compatible with 'image_id_to_annotation_list'"""
+        return AnnotationListView(self)
+
+    @classmethod
+    def from_annotation_lists(cls, image_id_to_annotation_list) -> "AnnotationTable":
+        """Create table from dict form {image_id: [annotation dict, ...]}
+
+        Args:
+            image_id_to_annotation_list (dict): See 'base.py' as well.
+
+        Returns:
+            AnnotationTable: Created table
+        """
+        if isinstance(image_id_to_annotation_list, AnnotationListView):
+            return image_id_to_annotation_list.table
+        builder = AnnotationTableBuilder()
+        for image_id, annotation_list in image_id_to_annotation_list.items():
+            for annotation in annotation_list:
+                builder.add(
+                    image_id,
+                    annotation["annotation_id"],
+                    annotation["class_id"],
+                    annotation["bbox"],
+                    annotation["score"],
+                )
+        return builder.build()
+
+
+class AnnotationListView(Mapping):
+    """Read-only dict-like view of AnnotationTable, compatible with 'image_id_to_annotation_list'.
+       Like defaultdict(list), missing image id returns empty list.
+       Dicts are created on access, so iterating whole view costs as much as the old dict form.
+    """
+    def __init__(self, table: AnnotationTable) -> None:
+        self.table = table
+
+    def __getitem__(self, image_id) -> list:
+        return self.table.annotation_list(image_id)
+
+    def __iter__(self) -> Iterator:
+        return iter(self.table.image_ids.tolist())
+
+    def __len__(self) -> int:
+        return len(self.table.image_ids)
+
+    def __contains__(self, image_id) -> bool:
+        return image_id in self.table.image_id_to_group_index
+
+
+class AnnotationTableBuilder:
+    """Append-only builder of AnnotationTable
+       Rows are stored in compact typed arrays while parsing.
+    """
+    def __init__(self) -> None:
+        self.image_id = array("q")
+        self.annotation_id = array("q")
+        self.class_id = array("q")
+        self.bbox = array("d")
+        self.bbox_is_int = array("b")
+        self.score = array("d")
+
+    def __len__(self) -> int:
+        return len(self.annotation_id)
+
+    def add(self, image_id: int, annotation_id: int, class_id: int, bbox: list, score: Union[None, float] = None) -> None:
+        """Append one annotation
+
+        Args:
+            image_id (int): Image id
+            annotation_id (int): Annotation id
+            class_id (int): Class id
+            bbox (list): Absolute [left, top, width, height]
+            score (None | float): Score if exists, otherwise None
+        """
+        self.image_id.append(image_id)
+        self.annotation_id.append(annotation_id)
+        self.class_id.append(class_id)
+        self.bbox.extend(bbox)
+        self.bbox_is_int.extend([isinstance(b, (int, np.integer)) for b in bbox])
+        self.score.append(np.nan if score is None else score)
+
+    def build(self) -> AnnotationTable:
+        """Create table. Rows are grouped by image keeping order of first appearance
+
+        Returns:
+            AnnotationTable: Created table
+        """
+        image_id = np.frombuffer(self.image_id, dtype=np.int64)
+        annotation_id = np.frombuffer(self.annotation_id, dtype=np.int64)
+        class_id = np.frombuffer(self.class_id, dtype=np.int64)
+        bbox = np.frombuffer(self.bbox, dtype=np.float64).reshape(-1, 4)
+        bbox_is_int = np.frombuffer(self.bbox_is_int, dtype=np.int8).reshape(-1, 4).astype(bool)
+        score = np.frombuffer(self.score, dtype=np.float64)
+        if len(image_id) == 0:
+            image_ids = np.zeros(0, dtype=np.int64)
+            offsets = np.zeros(1, dtype=np.int64)
+        elif _is_grouped(image_id):
+            # Already grouped (e.g. parsed file by file)
+            boundary = np.flatnonzero(image_id[1:] != image_id[:-1]) + 1
+            image_ids = image_id[np.concatenate([[0], boundary])]
+            offsets = np.concatenate([[0], boundary, [len(image_id)]]).astype(np.int64)
+        else:
+            unique_ids, first_index, inverse = np.unique(image_id, return_index=True, return_inverse=True)
+            # Order groups by first appearance, rows keep their order in each group
+            group_order = np.argsort(first_index, kind="stable")
+            group_rank = np.empty_like(group_order)
+            group_rank[group_order] = np.arange(len(group_order))
+            order = np.argsort(group_rank[inverse], kind="stable")
+            image_ids = unique_ids[group_order]
+            counts = np.bincount(group_rank[inverse], minlength=len(unique_ids))
+            offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+            annotation_id = annotation_id[order]
+            class_id = class_id[order]
+            bbox = bbox[order]
+            bbox_is_int = bbox_is_int[order]
+            score = score[order]
+        # Copy to own the memory instead of referring to the builder's buffers
+        table = AnnotationTable(
+            np.array(image_ids, dtype=np.int64),
+            offsets,
+            np.array(annotation_id),
+            np.array(class_id),
+            np.array(bbox),
+            bbox_is_int,
+            np.array(score),
+        )
+        return table
+
+
+def _is_grouped(image_id: np.ndarray) -> bool:
+    """Whether same image ids are contiguous"""
+    boundary = np.flatnonzero(image_id[1:] != image_id[:-1]) + 1
+    group_ids = image_id[np.concatenate([[0], boundary])]
+    return len(np.unique(group_ids)) == len(group_ids)
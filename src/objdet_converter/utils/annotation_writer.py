@@ -0,0 +1,474 @@
+from abc import ABC, abstractmethod
+import logging
+from functools import partial
+from pathlib import Path
+from itertools import chain
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from .archive import ArchiveWriter, file_exists, get_image_size, is_archive_path
+from .parallel import get_worker_count, run_bounded
+from .progress import ProgressReporter
+from .stats import get_stats
+from .utils import bbox_array2list, topleftwh2kitti_batch, topleftwh2yolo_batch
+
+# Number of images converted at once in 'AnnotationFileWriter.write_records()'
+RECORD_CHUNK_SIZE = 64
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, (int, np.integer))
+
+def get_bbox_is_int(bbox_list: list) -> np.ndarray:
+    """Get whether each bbox value is integer
+
+    Args:
+        bbox_list (list): [[left, top, width, height], ...]
+
+    Returns:
+        np.ndarray: (N, 4) bool
+    """
+    value_types = set(map(type, chain.from_iterable(bbox_list)))
+    if value_types == {float}:
+        return np.zeros((len(bbox_list), 4), dtype=bool)
+    if value_types == {int}:
+        return np.ones((len(bbox_list), 4), dtype=bool)
+    return np.array([[_is_int(b) for b in bbox] for bbox in bbox_list], dtype=bool).reshape(-1, 4)
+
+def iter_table_records(image_id_to_image_info: dict, annotation_table) -> Iterator:
+    """Iterate per-image records of AnnotationTable. See 'BaseDataFormat._iter_image_records()' as well.
+
+    Args:
+        image_id_to_image_info (dict): See 'base.py' as well.
+        annotation_table (AnnotationTable): Annotations
+
+    Yields:
+        tuple: (image_id, image_info, [(class_id, bbox, score or None), ...])
+    """
+    for image_id, image_info in image_id_to_image_info.items():
+        rows = annotation_table.rows(image_id)
+        score_list = [None if score != score else score for score in annotation_table.score[rows].tolist()]
+        yield image_id, image_info, list(zip(
+            annotation_table.class_id[rows].tolist(), annotation_table.bbox_list(rows), score_list
+        ))
+
+
+def _write_file(path: Path, data, context) -> None:
+    """Write output file, or add it into archive if 'context' is ArchiveWriter
+
+    Args:
+        path (pathlib.Path): Output file path
+        data (str | bytes): Content. str is written in text mode
+        context (None | ArchiveWriter): Archive or None
+    """
+    if not context is None:
+        size = context.write(path, data)
+    else:
+        with open(path, "w" if isinstance(data, str) else "wb") as f:
+            f.write(data)
+            size = f.tell()
+    get_stats().count("files_written")
+    get_stats().count("bytes_written", size)
+
+def _measure_write(write_func, job, context):
+    """Call 'write_func' measuring time as 'write' stage. See 'stats.py' as well."""
+    with get_stats().measure("write"):
+        write_func(job, context)
+
+def _write_yolo_file(job, context):
+    """Write one YOLO annotation file. Called in writer thread/process.
+
+    Args:
+        job (tuple): (annotation_path, [class index, ...], [yolo bbox, ...])
+        context (None | ArchiveWriter): Archive which file is written into. See 'archive.py' as well.
+    """
+    annotation_path, label_list, bbox_list = job
+    # All lines are formatted into one buffer and written at once
+    line_list = list()
+    for label, bbox in zip(label_list, bbox_list):
+        line_list.append(f"{label} {bbox[0]} {bbox[1]} {bbox[2]} {bbox[3]}\n")
+    _write_file(annotation_path, "".join(line_list), context)
+
+def _write_kitti_file(job, context):
+    """Write one KITTI annotation file. Called in writer thread/process.
+
+    Args:
+        job (tuple): (annotation_path, [class name, ...], [kitti bbox, ...], [score or None, ...])
+        context (None | ArchiveWriter): See '_write_yolo_file()'
+    """
+    annotation_path, label_list, bbox_list, score_list = job
+    # truncated, occluded and alpha
+    header = "0.0 0 0"
+    # dimensions, location and rotation_y
+    footer = "0 0 0 0 0 0 0"
+    line_list = list()
+    for class_name, bbox, score in zip(label_list, bbox_list, score_list):
+        if score:
+            line_list.append(f"{class_name} {header} {bbox[0]} {bbox[1]} {bbox[2]} {bbox[3]} {footer} {score}\n")
+        else:
+            line_list.append(f"{class_name} {header} {bbox[0]} {bbox[1]} {bbox[2]} {bbox[3]} {footer}\n")
+    _write_file(annotation_path, "".join(line_list), context)
+
+def _escape_xml_text(text: str) -> str:
+    """Escape text of XML element same as xml.etree.ElementTree"""
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+def _xml_element(tag: str, text: str, indent: str) -> str:
+    """Format one leaf element in a line. Empty element is self-closed same as xml.etree.ElementTree"""
+    if text == "":
+        return f"{indent}<{tag} />\n"
+    return f"{indent}<{tag}>{_escape_xml_text(text)}</{tag}>\n"
+
+def _write_pascalvoc_file(job, context):
+    """Write one PascalVOC annotation file. Called in writer thread/process.
+       XML is formatted by string templates into one buffer. Output is byte-identical to
+       xml.etree.ElementTree with 'ET.indent(tree, space="  ")' and US-ASCII encoding.
+
+    Args:
+        job (tuple): (annotation_path, image_info, [class name, ...], [pascalvoc bbox, ...], image_channel)
+        context (None | ArchiveWriter): See '_write_yolo_file()'
+    """
+    annotation_path, image_info, label_list, bbox_list, image_channel = job
+    image_name = image_info["file_name"]
+    image_path = image_info["file_path"]
+    folder = "Unknown"
+    if len(Path(image_path).parts) > 1:
+        folder = str(Path(image_path).parts[-2])
+    line_list = [
+        "<annotation>\n",
+        _xml_element("folder", folder, "  "),
+        _xml_element("filename", image_name, "  "),
+        _xml_element("path", image_path, "  "),
+        "  <source>\n    <database>Unknown</database>\n  </source>\n",
+        f"  <size>\n    <width>{image_info['width']}</width>\n    <height>{image_info['height']}</height>\n",
+        f"    <depth>{image_channel}</depth>\n  </size>\n",
+        "  <segmented>1</segmented>\n",
+    ]
+    for class_name, bbox in zip(label_list, bbox_list):
+        line_list.append("  <object>\n")
+        line_list.append(_xml_element("name", class_name, "    "))
+        line_list.append(
+            "    <pose>Unspecified</pose>\n    <truncated>0</truncated>\n    <difficult>0</difficult>\n"
+            f"    <bndbox>\n      <xmin>{bbox[0]}</xmin>\n      <ymin>{bbox[1]}</ymin>\n"
+            f"      <xmax>{bbox[2]}</xmax>\n      <ymax>{bbox[3]}</ymax>\n    </bndbox>\n  </object>\n"
+        )
+    # Last line has no line break
+    line_list.append("</annotation>")
+    # Non ASCII characters are written as character references
+    _write_file(annotation_path, "".join(line_list).encode("ascii", "xmlcharrefreplace"), context)
+
+
+class BaseWriter(ABC):
+    """Writer super class
+       A writer consumes per-image records yielded by a reader (dataset class).
+       Subclass implements 'write_records()'. Writer lacking abstract methods fails when it is registered.
+       See 'BaseDataFormat._iter_image_records()' and 'registry.py' as well.
+
+    Args:
+        dst_path (str): Output path
+        class_id_to_class_name (dict): Class id to class name. Referred while writing,
+                                       so reader can add new classes while records are consumed.
+        class_name_to_class_id (dict): Class name to class id
+        image_meta_cache (None | ImageMetaCache): Image metadata cache (optional)
+        workers (int): Number of writers. 0 means all CPU cores.
+        writer_pool (str): Pool type of writers. 'thread' or 'process'
+        io_threads (int): Number of thread writers for high-latency filesystems. Used if larger than 'workers'
+        progress (None | ProgressReporter): Reporter of written files. See 'progress.py' as well.
+        kwargs: Other options. See 'base.py' as well.
+    """
+    # Whether one output file is written per image. See 'incremental.py' as well.
+    per_file = False
+
+    def __init__(self, dst_path, class_id_to_class_name: dict, class_name_to_class_id: dict, image_meta_cache=None,
+                 workers: int = 1, writer_pool: str = "thread", io_threads: int = 0, progress=None, **kwargs) -> None:
+        self.dst_path = Path(dst_path)
+        self.class_id_to_class_name = class_id_to_class_name
+        self.class_name_to_class_id = class_name_to_class_id
+        self.image_meta_cache = image_meta_cache
+        self.workers = get_worker_count(workers)
+        self.writer_pool = writer_pool
+        self.io_threads = io_threads
+        self.progress = ProgressReporter() if progress is None else progress
+        self.logger = logging.getLogger("logger")
+
+    def _get_image_size(self, image_path):
+        """Get (width, height, channels) of image. Use cache if available"""
+        if self.image_meta_cache is None:
+            return get_image_size(image_path)
+        return self.image_meta_cache.get_image_size(image_path)
+
+    def get_output_path(self, image_info):
+        """Get output file path where the image is written
+
+        Args:
+            image_info (None | dict): See 'base.py' as well. None for writers of whole dataset
+
+        Returns:
+            pathlib.Path: Output file path
+        """
+        return self.dst_path
+
+    @abstractmethod
+    def write_records(self, records: Iterable) -> list:
+        """Write dataset consuming per-image records
+
+        Args:
+            records (Iterable): (image_id, image_info, [(class_id, bbox, score or None), ...]) for each image
+
+        Returns:
+            list: [(output path, error message), ...] of failed outputs
+        """
+
+    def write_table(self, image_id_to_image_info: dict, annotation_table) -> list:
+        """Write dataset already held in memory. See 'write_records()' as well.
+
+        Args:
+            image_id_to_image_info (dict): See 'base.py' as well.
+            annotation_table (AnnotationTable): Annotations
+        """
+        return self.write_records(iter_table_records(image_id_to_image_info, annotation_table))
+
+
+class AnnotationFileWriter(BaseWriter):
+    """Writer super class of formats with one annotation file per image
+       Records are converted in chunks with batched bbox kernels and
+       each file is written by 'write_func' in thread/process pool. See 'parallel.py' as well.
+       If 'dst_path' ends with archive suffix, files are added into the archive instead. See 'archive.py' as well.
+       Subclass sets 'format_name', 'suffix', 'write_func' and implements 'convert_bboxes()'.
+    """
+    format_name = ""
+    suffix = ".txt"
+    write_func = None
+    per_file = True
+
+    def __init__(self, dst_path, class_id_to_class_name, class_name_to_class_id, **kwargs) -> None:
+        super().__init__(dst_path, class_id_to_class_name, class_name_to_class_id, **kwargs)
+        self.class_id_to_label = dict()
+        # Set while writing into archive. See '_write_jobs()'
+        self.archive_writer = None
+
+    @abstractmethod
+    def convert_bboxes(self, bboxes: np.ndarray, bbox_is_int: np.ndarray, image_sizes: np.ndarray, size_is_int: np.ndarray) -> tuple:
+        """Convert absolute [left, top, width, height] to bbox points of output format
+
+        Args:
+            bboxes (np.ndarray): (N, 4) Absolute [left, top, width, height]
+            bbox_is_int (np.ndarray): (N, 4) bool. Whether each value was given as integer
+            image_sizes (np.ndarray): (N, 2) [width, height] of image of each bbox
+            size_is_int (np.ndarray): (N, 2) bool. Whether width/height is integer
+
+        Returns:
+            tuple: ((N, 4) converted bboxes, (N, 4) bool values to be written as integer or None)
+        """
+
+    def _get_label(self, class_name: str):
+        """Get class label written in output file from class name"""
+        return class_name
+
+    def get_label(self, class_id: int):
+        """Get class label written in output file
+
+        Args:
+            class_id (int): Class id (1-origin, MSCOCO style)
+
+        Returns:
+            int | str: Label. e.g. class index for YOLO, class name for KITTI
+        """
+        label = self.class_id_to_label.get(class_id)
+        if label is None:
+            label = self._get_label(self.class_id_to_class_name[class_id])
+            self.class_id_to_label[class_id] = label
+        return label
+
+    def get_output_path(self, image_info):
+        return self.dst_path / Path(image_info["file_name"]).with_suffix(self.suffix)
+
+    def create_job(self, image_info: dict, class_id_list: list, bbox_list: list, score_list: list) -> tuple:
+        """Create writer job of one image
+
+        Args:
+            image_info (dict): See 'base.py' as well.
+            class_id_list (list): Class ids of annotations
+            bbox_list (list): Converted bboxes. See 'convert_bboxes()'
+            score_list (list): Scores or None
+
+        Returns:
+            tuple: Job passed to 'write_func'. First item is output file path
+        """
+        annotation_path = self.get_output_path(image_info)
+        label_list = [self.get_label(class_id) for class_id in class_id_list]
+        return annotation_path, label_list, bbox_list, score_list
+
+    def _convert_chunk(self, record_list: list) -> Iterator:
+        # Bboxes of several images are converted at once to amortize numpy call overhead
+        counts = [len(annotation_list) for _, _, annotation_list in record_list]
+        bbox_list = [bbox for _, _, annotation_list in record_list for _, bbox, _ in annotation_list]
+        image_size_list = [(image_info["width"], image_info["height"]) for _, image_info, _ in record_list]
+        image_sizes = np.repeat(np.array(image_size_list, dtype=np.float64).reshape(-1, 2), counts, axis=0)
+        size_is_int = np.array([[_is_int(v) for v in size] for size in image_size_list], dtype=bool).reshape(-1, 2)
+        size_is_int = np.repeat(size_is_int, counts, axis=0)
+        bboxes = np.array(bbox_list, dtype=np.float64).reshape(-1, 4)
+        with get_stats().measure("bbox"):
+            bboxes, bbox_is_int = self.convert_bboxes(bboxes, get_bbox_is_int(bbox_list), image_sizes, size_is_int)
+            bbox_list = bbox_array2list(bboxes, bbox_is_int)
+        start = 0
+        for (_, image_info, annotation_list), count in zip(record_list, counts):
+            class_id_list = [class_id for class_id, _, _ in annotation_list]
+            score_list = [score for _, _, score in annotation_list]
+            yield self.create_job(image_info, class_id_list, bbox_list[start:start+count], score_list)
+            start += count
+
+    def write_records(self, records: Iterable) -> list:
+        """Write one file per record. Only RECORD_CHUNK_SIZE records and pending jobs are held at once,
+           so whole dataset is never held in memory when records are yielded lazily.
+        """
+        def create_jobs():
+            record_list = list()
+            for record in records:
+                record_list.append(record)
+                if len(record_list) >= RECORD_CHUNK_SIZE:
+                    yield from self._convert_chunk(record_list)
+                    record_list = list()
+            if record_list:
+                yield from self._convert_chunk(record_list)
+        return self._write_jobs(create_jobs())
+
+    def convert_table(self, image_id_to_image_info: dict, annotation_table) -> tuple:
+        """Convert bboxes of whole dataset at once. Rows of unknown images are NaN
+
+        Returns:
+            tuple: See 'convert_bboxes()'
+        """
+        group_size_list = list()
+        for image_id in annotation_table.image_ids.tolist():
+            image_info = image_id_to_image_info.get(image_id)
+            if image_info is None:
+                # Annotations of unknown image are not written
+                group_size_list.append((np.nan, np.nan))
+            else:
+                group_size_list.append((image_info["width"], image_info["height"]))
+        counts = np.diff(annotation_table.offsets)
+        image_sizes = np.repeat(np.array(group_size_list, dtype=np.float64).reshape(-1, 2), counts, axis=0)
+        size_is_int = np.array([[_is_int(v) for v in size] for size in group_size_list], dtype=bool).reshape(-1, 2)
+        size_is_int = np.repeat(size_is_int, counts, axis=0)
+        with get_stats().measure("bbox"):
+            return self.convert_bboxes(annotation_table.bbox, annotation_table.bbox_is_int, image_sizes, size_is_int)
+
+    def write_table(self, image_id_to_image_info: dict, annotation_table) -> list:
+        """Write one file per image. Whole dataset is converted at once, jobs only format the values"""
+        bboxes, bbox_is_int = self.convert_table(image_id_to_image_info, annotation_table)
+
+        def create_jobs():
+            for image_id, image_info in image_id_to_image_info.items():
+                rows = annotation_table.rows(image_id)
+                score_list = [None if score != score else score for score in annotation_table.score[rows].tolist()]
+                bbox_list = bbox_array2list(bboxes[rows], None if bbox_is_int is None else bbox_is_int[rows])
+                yield self.create_job(image_info, annotation_table.class_id[rows].tolist(), bbox_list, score_list)
+        return self._write_jobs(create_jobs(), len(image_id_to_image_info))
+
+    def _write_jobs(self, jobs: Iterable, total: int = None) -> list:
+        """Write one file per job. Files are written in thread/process pool when workers > 1.
+           Failed files are reported at the end instead of aborting the whole run.
+           'total' is number of jobs if known, for progress.
+        """
+        self.logger.info(f"Converting to {self.format_name}")
+        jobs = self.progress.track(jobs, "write", total)
+        write_func = partial(_measure_write, type(self).write_func)
+        if is_archive_path(self.dst_path):
+            # Members are added one by one in this thread
+            self.archive_writer = ArchiveWriter(self.dst_path)
+            write_error_list = run_bounded(write_func, jobs, 1, context=self.archive_writer)
+        else:
+            self.dst_path.mkdir(exist_ok=True, parents=True)
+            workers = self.workers
+            writer_pool = self.writer_pool
+            if self.io_threads > self.workers:
+                # Writers wait for filesystem rather than CPU
+                workers = self.io_threads
+                writer_pool = "thread"
+            write_error_list = run_bounded(write_func, jobs, workers, writer_pool)
+        for annotation_path, error in write_error_list:
+            self.logger.error(f"Failed to write '{annotation_path}': {error}")
+        if write_error_list:
+            self.logger.error(f"{len(write_error_list)} files could not be written")
+        self._finalize()
+        if not self.archive_writer is None:
+            self.archive_writer.close()
+            self.archive_writer = None
+        return write_error_list
+
+    def _finalize(self):
+        """Called after all files are written"""
+        pass
+
+
+class YoloFileWriter(AnnotationFileWriter):
+    """Writer for YOLO. Writes 'classes.txt' as well"""
+    format_name = "YOLO"
+    write_func = _write_yolo_file
+
+    def convert_bboxes(self, bboxes, bbox_is_int, image_sizes, size_is_int):
+        return topleftwh2yolo_batch(bboxes, image_sizes), None
+
+    def _get_label(self, class_name):
+        # MSCOCO "categories" in json file is not sequential
+        return self.class_name_to_class_id[class_name] - 1
+
+    def create_job(self, image_info, class_id_list, bbox_list, score_list):
+        annotation_path, label_list, bbox_list, _ = super().create_job(image_info, class_id_list, bbox_list, score_list)
+        return annotation_path, label_list, bbox_list
+
+    def _finalize(self):
+        text = "".join(f"{class_name}\n" for class_name in self.class_id_to_class_name.values())
+        _write_file(self.dst_path / "classes.txt", text, self.archive_writer)
+
+
+class KITTIFileWriter(AnnotationFileWriter):
+    """Writer for KITTI"""
+    format_name = "KITTI"
+    write_func = _write_kitti_file
+
+    def convert_bboxes(self, bboxes, bbox_is_int, image_sizes, size_is_int):
+        bboxes = topleftwh2kitti_batch(bboxes, image_sizes)
+        # right/bottom are integers if left/top and width/height are, and clipped values if image size is
+        bbox_is_int = np.concatenate([bbox_is_int[:, :2], bbox_is_int[:, :2] & bbox_is_int[:, 2:]], axis=1)
+        bbox_is_int &= size_is_int[:, [0, 1, 0, 1]]
+        return bboxes, bbox_is_int
+
+    def _get_label(self, class_name):
+        # In case that class name includes space
+        return class_name.replace(' ', '-')
+
+
+class PascalVOCFileWriter(AnnotationFileWriter):
+    """Writer for PascalVOC. Image depth is 'channels' of image info or probed from image file"""
+    format_name = "PascalVOC"
+    suffix = ".xml"
+    write_func = _write_pascalvoc_file
+
+    def convert_bboxes(self, bboxes, bbox_is_int, image_sizes, size_is_int):
+        # Coordinates are truncated to integers. Rows of unknown images are NaN and never written
+        with np.errstate(invalid="ignore"):
+            bboxes = topleftwh2kitti_batch(bboxes, image_sizes, decimals=None).astype(np.int64)
+        return bboxes, None
+
+    def create_job(self, image_info, class_id_list, bbox_list, score_list):
+        annotation_path, label_list, bbox_list, _ = super().create_job(image_info, class_id_list, bbox_list, score_list)
+        image_path = image_info["file_path"]
+        # Image is probed only if reader did not provide channels. Probed size is cached if cache is enabled
+        image_channel = image_info.get("channels")
+        if not image_channel is None:
+            return annotation_path, image_info, label_list, bbox_list, image_channel
+        image_channel = 3
+        if file_exists(image_path):
+            image_size = self._get_image_size(image_path)
+            if image_size is not None:
+                image_channel = image_size[2]
+        return annotation_path, image_info, label_list, bbox_list, image_channel
@@ -0,0 +1,374 @@
+"""Archive-aware file access
+   Datasets in tar/zip archives are read and written without extraction.
+   A member is addressed by a virtual path '<archive path>/<member name>'. e.g. 'dataset.zip/labels/0001.txt'
+   Readers scan, open and probe members with the functions of this module same as files in a directory.
+       zip: Members are read by random access. Image size is probed from member header.
+       tar: Archive is read sequentially once, including compressed ones ('*.tar.gz' etc.).
+            Non-image members (annotation files) are held in memory and image sizes are probed
+            while images are streamed, so images are neither extracted nor held.
+   Loaded archives are cached per process. Worker processes started by fork share them, and tar archives loaded
+   by parent process are sent to workers started by spawn/forkserver, so workers do not stream the tar again.
+   See 'get_shared_archives()'.
+   Files can be read concurrently in advance for high-latency filesystems. See 'prefetch_files()'.
+   Output is written into an archive when output path ends with archive suffix. See 'ArchiveWriter'.
+"""
+from contextlib import contextmanager
+import io
+import locale
+import os
+from pathlib import Path
+import posixpath
+import re
+import tarfile
+import time
+from typing import Union
+import zipfile
+
+from .image_size import get_image_size as get_file_image_size, get_image_size_from_file
+from .parallel import thread_map
+from .stats import get_stats
+from .utils import pair_annotation_files, scan_annotation_dir, supported_ext_list
+
+ARCHIVE_SUFFIX_LIST = [".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz"]
+
+# Compression of tar output by suffix
+TAR_WRITE_MODE_DICT = {
+    ".tar": "w",
+    ".tar.gz": "w:gz",
+    ".tgz": "w:gz",
+    ".tar.bz2": "w:bz2",
+    ".tbz2": "w:bz2",
+    ".tar.xz": "w:xz",
+    ".txz": "w:xz",
+}
+
+# Archive suffix followed by path separator. Longer suffixes first
+_MEMBER_PATTERN = re.compile(
+    "(?:" + "|".join(re.escape(suffix) for suffix in sorted(ARCHIVE_SUFFIX_LIST, key=len, reverse=True)) + r")(?=[/\\])",
+    re.IGNORECASE,
+)
+
+# {absolute archive path: ZipArchiveReader or TarArchiveReader} of this process
+_archive_cache = dict()
+
+# {path: bytes} read by 'prefetch_files()'. Referred by 'open_file()'
+_prefetched_data = dict()
+
+
+def _get_archive_suffix(path) -> Union[None, str]:
+    name = str(path).lower()
+    for suffix in sorted(ARCHIVE_SUFFIX_LIST, key=len, reverse=True):
+        if name.endswith(suffix):
+            return suffix
+    return None
+
+def is_archive_path(path) -> bool:
+    """Whether path has archive suffix. Existence is not checked
+
+    Args:
+        path (str | pathlib.Path): File path
+
+    Returns:
+        bool: True if path ends with one of ARCHIVE_SUFFIX_LIST
+    """
+    return not _get_archive_suffix(path) is None
+
+def split_member_path(path) -> Union[None, tuple]:
+    """Split virtual path of archive member
+
+    Args:
+        path (str | pathlib.Path): File path or virtual path of archive member
+
+    Returns:
+        None | tuple: (absolute archive path, member name) if path is in an archive file, else None
+    """
+    path = str(path)
+    for match in _MEMBER_PATTERN.finditer(path):
+        archive_path = os.path.abspath(path[:match.end()])
+        if archive_path in _archive_cache or os.path.isfile(archive_path):
+            return archive_path, path[match.end()+1:].replace(os.sep, "/")
+    return None
+
+
+class ZipArchiveReader:
+    """Random access reader of zip archive
+
+    Args:
+        archive_path (str): Zip file path
+    """
+    def __init__(self, archive_path) -> None:
+        self.archive_path = archive_path
+        self.zip_file = None
+        self.pid = None
+        # Normalized member name to name in archive
+        self.member_to_name = dict()
+        for info in self._get_zip_file().infolist():
+            if not info.is_dir():
+                self.member_to_name[posixpath.normpath(info.filename)] = info.filename
+        self.member_list = list(self.member_to_name)
+
+    def _get_zip_file(self) -> zipfile.ZipFile:
+        # File position is shared with parent process after fork, so archive is opened again
+        if self.pid != os.getpid():
+            self.zip_file = zipfile.ZipFile(self.archive_path)
+            self.pid = os.getpid()
+        return self.zip_file
+
+    def exists(self, member: str) -> bool:
+        return member in self.member_to_name
+
+    def read(self, member: str) -> bytes:
+        if not member in self.member_to_name:
+            raise FileNotFoundError(f"'{member}' not found in '{self.archive_path}'")
+        return self._get_zip_file().read(self.member_to_name[member])
+
+    def get_image_size(self, member: str) -> Union[None, tuple]:
+        if not member in self.member_to_name:
+            return None
+        with self._get_zip_file().open(self.member_to_name[member]) as f:
+            return get_image_size_from_file(f)
+
+
+class TarArchiveReader:
+    """Sequential reader of tar archive. Archive is streamed once when created. See module docstring.
+
+    Args:
+        archive_path (str): Tar file path. Compressed one is supported as well
+    """
+    def __init__(self, archive_path) -> None:
+        self.archive_path = archive_path
+        image_ext_set = set(supported_ext_list)
+        self.member_to_data = dict()
+        self.member_to_image_size = dict()
+        with tarfile.open(archive_path, "r|*") as tar_file:
+            for info in tar_file:
+                if not info.isfile():
+                    continue
+                member = posixpath.normpath(info.name)
+                data = tar_file.extractfile(info).read()
+                if os.path.splitext(member)[1] in image_ext_set:
+                    with get_stats().measure("probe"):
+                        self.member_to_image_size[member] = get_image_size_from_file(io.BytesIO(data))
+                    get_stats().count("images_probed")
+                else:
+                    self.member_to_data[member] = data
+        self.member_list = list(self.member_to_data) + list(self.member_to_image_size)
+
+    def exists(self, member: str) -> bool:
+        return (member in self.member_to_data) or (member in self.member_to_image_size)
+
+    def read(self, member: str) -> bytes:
+        if not member in self.member_to_data:
+            # Images are not held
+            raise FileNotFoundError(f"'{member}' not found in '{self.archive_path}'")
+        return self.member_to_data[member]
+
+    def get_image_size(self, member: str) -> Union[None, tuple]:
+        return self.member_to_image_size.get(member)
+
+
+def get_archive(archive_path) -> Union[ZipArchiveReader, TarArchiveReader]:
+    """Get archive reader. Archive is loaded once per process
+
+    Args:
+        archive_path (str | pathlib.Path): Archive file path
+
+    Returns:
+        ZipArchiveReader | TarArchiveReader: Reader
+    """
+    archive_path = os.path.abspath(archive_path)
+    archive = _archive_cache.get(archive_path)
+    if archive is None:
+        if _get_archive_suffix(archive_path) == ".zip":
+            archive = ZipArchiveReader(archive_path)
+        else:
+            archive = TarArchiveReader(archive_path)
+        _archive_cache[archive_path] = archive
+    return archive
+
+def get_shared_archives() -> dict:
+    """Get tar archives loaded in this process, to be shared with worker processes.
+       Zip archives are opened again in each process, since they are read by random access.
+
+    Returns:
+        dict: {absolute archive path: TarArchiveReader}
+    """
+    return {path: archive for path, archive in _archive_cache.items() if isinstance(archive, TarArchiveReader)}
+
+def add_shared_archives(path_to_archive: dict) -> None:
+    """Add archives loaded by parent process into cache of this process
+
+    Args:
+        path_to_archive (dict): Return value of 'get_shared_archives()'
+    """
+    for archive_path, archive in path_to_archive.items():
+        _archive_cache.setdefault(archive_path, archive)
+
+def scan_annotation_files(src_path: Path, annotation_suffix: str) -> list:
+    """Pair annotation files with image files in dataset directory or archive. See 'scan_annotation_dir()' as well.
+
+    Args:
+        src_path (pathlib.Path): Dataset directory or archive file
+        annotation_suffix (str): Annotation file name suffix. e.g. 'txt'
+
+    Returns:
+        list: [(annotation_path, image_path), ...] sorted by annotation path.
+              Paths of members are virtual paths under 'src_path'.
+    """
+    with get_stats().measure("scan"):
+        annotation_image_list = _scan_annotation_files(src_path, annotation_suffix)
+    get_stats().count("annotation_files", len(annotation_image_list))
+    return annotation_image_list
+
+def _scan_annotation_files(src_path: Path, annotation_suffix: str) -> list:
+    if not (is_archive_path(src_path) and src_path.is_file()):
+        return scan_annotation_dir(src_path, annotation_suffix)
+    dir_to_name_list = dict()
+    for member in get_archive(src_path).member_list:
+        dir_name, name = posixpath.split(member)
+        dir_to_name_list.setdefault(dir_name, list()).append(name)
+    annotation_image_list = list()
+    for dir_name, name_list in dir_to_name_list.items():
+        annotation_image_list.extend(pair_annotation_files(src_path / dir_name, name_list, annotation_suffix))
+    annotation_image_list.sort(key=lambda x: x[0])
+    return annotation_image_list
+
+def open_file(path, mode: str = "r"):
+    """Open file or archive member for reading same as 'open()'. Counted as read unless prefetched
+
+    Args:
+        path (str | pathlib.Path): File path or virtual path of archive member
+        mode (str): 'r' or 'rb'
+
+    Returns:
+        IO: File object
+    """
+    data = _prefetched_data.get(str(path))
+    if data is None:
+        member_path = split_member_path(path)
+        if member_path is None:
+            f = open(path, mode)
+            get_stats().count("files_read")
+            get_stats().count("bytes_read", os.fstat(f.fileno()).st_size)
+            return f
+        archive_path, member = member_path
+        data = get_archive(archive_path).read(member)
+        get_stats().count("files_read")
+        get_stats().count("bytes_read", len(data))
+    f = io.BytesIO(data)
+    if mode == "rb":
+        return f
+    # Same encoding and line break translation as text mode 'open()'
+    return io.TextIOWrapper(f)
+
+def _read_or_none(path: str) -> Union[None, bytes]:
+    try:
+        with open_file(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+@contextmanager
+def prefetch_files(path_list: list, io_threads: int):
+    """Read files concurrently in advance, so that 'open_file()' in the block does not wait for filesystem.
+       Files which cannot be read are not prefetched, and 'open_file()' raises same error as without prefetch.
+
+    Args:
+        path_list (list): File paths or virtual paths of archive members
+        io_threads (int): Number of threads. 1 or less means files are not prefetched
+    """
+    if io_threads <= 1:
+        yield
+        return
+    path_list = [str(path) for path in path_list]
+    for path, data in zip(path_list, thread_map(_read_or_none, path_list, io_threads)):
+        if not data is None:
+            _prefetched_data[path] = data
+    try:
+        yield
+    finally:
+        for path in path_list:
+            _prefetched_data.pop(path, None)
+
+def file_exists(path) -> bool:
+    """'pathlib.Path.exists()' which can check archive members
+
+    Args:
+        path (str | pathlib.Path): File path or virtual path of archive member
+
+    Returns:
+        bool: Whether file exists
+    """
+    member_path = split_member_path(path)
+    if member_path is None:
+        return Path(path).exists()
+    archive_path, member = member_path
+    return get_archive(archive_path).exists(member)
+
+def get_image_size(image_path) -> Union[None, tuple]:
+    """Get image size of image file or archive member. See 'image_size.py' as well.
+
+    Args:
+        image_path (str | pathlib.Path): Image file path or virtual path of archive member
+
+    Returns:
+        None | tuple: (width, height, channels) if image is readable, else None
+    """
+    member_path = split_member_path(image_path)
+    if member_path is None:
+        with get_stats().measure("probe"):
+            image_size = get_file_image_size(image_path)
+        get_stats().count("images_probed")
+        return image_size
+    archive_path, member = member_path
+    # Tar images are probed when archive is loaded
+    return get_archive(archive_path).get_image_size(member)
+
+
+class ArchiveWriter:
+    """Writer of output files into zip or tar archive. Members are added one by one from one thread.
+       Passed to write functions of 'annotation_writer.py' as context.
+
+    Args:
+        archive_path (str | pathlib.Path): Output archive path. Compression is selected by suffix
+    """
+    def __init__(self, archive_path) -> None:
+        self.archive_path = Path(archive_path)
+        self.archive_path.parent.mkdir(exist_ok=True, parents=True)
+        suffix = _get_archive_suffix(self.archive_path)
+        if suffix == ".zip":
+            self.zip_file = zipfile.ZipFile(self.archive_path, "w", compression=zipfile.ZIP_DEFLATED)
+            self.tar_file = None
+        else:
+            self.zip_file = None
+            self.tar_file = tarfile.open(self.archive_path, TAR_WRITE_MODE_DICT[suffix])
+        self.encoding = locale.getpreferredencoding(False)
+
+    def write(self, path, data: Union[str, bytes]) -> int:
+        """Add member
+
+        Args:
+            path (str | pathlib.Path): Virtual path of member under archive path
+            data (str | bytes): Content. str is encoded same as text mode 'open()'
+
+        Returns:
+            int: Number of bytes of member
+        """
+        member = Path(path).relative_to(self.archive_path).as_posix()
+        if isinstance(data, str):
+            data = data.encode(self.encoding)
+        if not self.zip_file is None:
+            self.zip_file.writestr(member, data)
+            return len(data)
+        info = tarfile.TarInfo(member)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        info.mode = 0o644
+        self.tar_file.addfile(info, io.BytesIO(data))
+        return len(data)
+
+    def close(self) -> None:
+        if not self.zip_file is None:
+            self.zip_file.close()
+        else:
+            self.tar_file.close()
@@ -2,11 +2,23 @@ from collections import defaultdict
 import logging
 from pathlib import Path
 
+import numpy as np
+
+from .annotation_table import AnnotationTable, AnnotationTableBuilder
+from .annotation_writer import iter_table_records
+from .archive import get_image_size, is_archive_path
+from .incremental import convert_incremental
+from .parallel import get_worker_count
+from .progress import ProgressReporter
+from .registry import get_writer_class
+from .stats import get_stats
+
 class BaseDataFormat:
     """Data format super class
 
     Args:
-        dst_path (str): Converted dataset output path
+        dst_path (str): Converted dataset output path. YOLO, KITTI and PascalVOC are written into
+                        tar/zip archive if it ends with archive suffix. See 'archive.py' as well.
         class_txt_path (str): Class list text path
                               The file contains all class names in each line
             Example:
@@ -17,28 +29,193 @@ class BaseDataFormat:
                 motorcycle
                 airplane
                 ```
-        src_path (str): Input dataset path to be converted
+        src_path (str): Input dataset path to be converted. Directory of YOLO, KITTI and PascalVOC can be
+                        tar/zip archive. See 'archive.py' as well.
+        image_meta_cache (None | ImageMetaCache): Image metadata cache (optional)
+                                                  See 'image_cache.py' as well.
+        workers (int): Number of processes for parsing annotation files and
+                       number of writers for output files. 0 means all CPU cores.
+                       See 'parallel.py' as well.
+        writer_pool (str): Pool type used for writing output files. 'thread' or 'process'
+        compact_json (bool): Write MSCOCO json without indent and whitespaces
+        gzip_json (bool): Write MSCOCO json compressed with gzip ('*.json.gz')
+        json_shard_images (int): Split MSCOCO json into shards of at most this number of images. 0 means no limit
+        json_shard_size (int): Split MSCOCO json into shards of about this number of bytes. 0 means no limit
+                               See 'MSCOCODataset._dump_json_shards()' as well.
+        incremental (bool): Convert only annotation files added or changed since last run
+                            See 'incremental.py' as well.
+        voc_parser (str): PascalVOC annotation file parser. 'fast', 'etree' or 'lxml'
+                          See 'voc_parser.py' as well.
+        io_threads (int): Number of threads per process reading annotation files and image headers concurrently,
+                          and number of thread writers. For high-latency filesystems. 0 means no I/O threads.
+                          See 'parallel.thread_map()' as well.
+        progress (None | ProgressReporter): Reporter of parsed files and written files. See 'progress.py' as well.
     """
-    def __init__(self, dst_path, class_txt_path, src_path) -> None:
+    def __init__(self, dst_path, class_txt_path, src_path, image_meta_cache=None, workers=1, writer_pool="thread",
+                 compact_json=False, gzip_json=False, incremental=False, voc_parser="fast",
+                 json_shard_images=0, json_shard_size=0, io_threads=0, progress=None) -> None:
         self.src_path = Path(src_path)
         self.dst_path = Path(dst_path)
         self.class_txt_path = Path(class_txt_path)
         self.image_id_to_image_info = dict()
+        # Custom dataset can append annotation dicts to 'image_id_to_annotation_list'.
+        # Built-in datasets store annotations in 'annotation_table' and
+        # 'image_id_to_annotation_list' becomes its read-only view.
         self.image_id_to_annotation_list = defaultdict(list)
+        self.annotation_table = None
+        # [(annotation_path, image_path or None), ...] of formats with one annotation file per image
+        self.annotation_image_list = None
         self.class_id_to_class_name = dict()
         self.class_name_to_class_id = dict()
+        self.image_meta_cache = image_meta_cache
+        self.workers = get_worker_count(workers)
+        self.writer_pool = writer_pool
+        self.write_error_list = list()
+        self.compact_json = compact_json
+        self.gzip_json = gzip_json
+        self.json_shard_images = json_shard_images
+        self.json_shard_size = json_shard_size
+        self.incremental = incremental
+        self.voc_parser = voc_parser
+        self.io_threads = int(io_threads)
+        self.progress = ProgressReporter() if progress is None else progress
         self.logger = logging.getLogger("logger")
         self.validation_check()
         
     def _parse_annotation(self):
-        pass
+        """Parse all annotations into 'annotation_table'. See '_iter_image_records()' as well."""
+        annotation_id = 1
+        annotation_builder = AnnotationTableBuilder()
+        for image_id, image_info, annotation_list in self._iter_image_records():
+            self.image_id_to_image_info[image_id] = image_info
+            for class_id, bbox, score in annotation_list:
+                annotation_builder.add(image_id, annotation_id, class_id, bbox, score)
+                annotation_id += 1
+        self._set_annotation_table(annotation_builder.build())
+
+    def _iter_image_records(self):
+        """Parse annotation files one by one. Dataset formats with one annotation file per image implement this,
+           so that they can be converted to another per-file format without holding the whole dataset.
+           By default, annotations parsed in advance by '_parse_annotation()' are yielded.
+
+        Yields:
+            tuple: (image_id, image_info, [(class_id, bbox, score or None), ...])
+                   bbox is absolute [left, top, width, height]
+        """
+        # Dataset parsed in advance
+        if self.annotation_table is None:
+            self._set_annotation_table(AnnotationTable.from_annotation_lists(self.image_id_to_annotation_list))
+        yield from iter_table_records(self.image_id_to_image_info, self.annotation_table)
     
     def _parse_class_list(self):
         pass
 
-    def convert(self):
+    def _iter_records_assigning_class_ids(self, named_records, appeared_class_name_set):
+        """Assign class ids after all annotation files are parsed. Used when class list is discovered
+           from annotation files, so that each file is read only once instead of scanning class names in advance.
+           Class ids are sequential in sorted class name order and 'class_id_to_class_name' and
+           'class_name_to_class_id' are updated in place. Records are held until all files are parsed.
+
+        Args:
+            named_records (Iterable): (image_id, image_info, [(class_name, bbox, score or None), ...]) for each image
+            appeared_class_name_set (set): Class names appeared in all annotation files.
+                                           Filled while 'named_records' is consumed.
+
+        Yields:
+            tuple: (image_id, image_info, [(class_id, bbox, score or None), ...])
+        """
+        image_id_to_image_info = dict()
+        annotation_builder = AnnotationTableBuilder()
+        # Temporary ids in appearance order
+        class_name_to_temporary_id = dict()
+        annotation_id = 1
+        for image_id, image_info, annotation_list in named_records:
+            image_id_to_image_info[image_id] = image_info
+            for class_name, bbox, score in annotation_list:
+                temporary_id = class_name_to_temporary_id.setdefault(class_name, len(class_name_to_temporary_id))
+                annotation_builder.add(image_id, annotation_id, temporary_id, bbox, score)
+                annotation_id += 1
+        class_name_list = sorted(appeared_class_name_set | set(class_name_to_temporary_id))
+        self.class_id_to_class_name.clear()
+        self.class_name_to_class_id.clear()
+        for index, class_name in enumerate(class_name_list):
+            self.class_id_to_class_name[index+1] = class_name
+            self.class_name_to_class_id[class_name] = index+1
+        annotation_table = annotation_builder.build()
+        temporary_id_to_class_id = np.array(
+            [self.class_name_to_class_id[class_name] for class_name in class_name_to_temporary_id], dtype=np.int64
+        )
+        annotation_table.class_id = temporary_id_to_class_id[annotation_table.class_id]
+        yield from iter_table_records(image_id_to_image_info, annotation_table)
+
+    def _restore_classes(self, class_id_list):
+        """Restore classes of annotations not parsed in incremental conversion. See 'incremental.py' as well."""
         pass
 
+    def _set_annotation_table(self, annotation_table):
+        """Set parsed annotations. See 'annotation_table.py' as well."""
+        self.annotation_table = annotation_table
+        self.image_id_to_annotation_list = annotation_table.as_annotation_lists()
+
+    def _get_image_size(self, image_path):
+        """Get (width, height, channels) of image. Use cache if available"""
+        if self.image_meta_cache is None:
+            return get_image_size(image_path)
+        return self.image_meta_cache.get_image_size(image_path)
+
+    def _lookup_image_size(self, image_path):
+        """Get cached (width, height, channels) of image without probing. None if not cached"""
+        if self.image_meta_cache is None:
+            return None
+        return self.image_meta_cache.lookup(image_path)
+
+    def _store_image_size(self, image_path, image_size):
+        """Store (width, height, channels) probed outside of this process to cache"""
+        if self.image_meta_cache is None:
+            return
+        self.image_meta_cache.store(image_path, image_size)
+
+    def _get_dataset_options(self):
+        """Get options to be passed to another dataset class or writer. e.g. MSCOCODataset"""
+        return {
+            "image_meta_cache": self.image_meta_cache,
+            "workers": self.workers,
+            "writer_pool": self.writer_pool,
+            "compact_json": self.compact_json,
+            "gzip_json": self.gzip_json,
+            "incremental": self.incremental,
+            "voc_parser": self.voc_parser,
+            "json_shard_images": self.json_shard_images,
+            "json_shard_size": self.json_shard_size,
+            "io_threads": self.io_threads,
+            "progress": self.progress,
+        }
+
+    def convert(self, dst_format):
+        """Convert to 'dst_format' passing per-image records to the writer of the format.
+           See 'registry.py' as well.
+        """
+        writer_class = get_writer_class(dst_format)
+        writer = writer_class(self.dst_path, self.class_id_to_class_name, self.class_name_to_class_id, **self._get_dataset_options())
+        if self.incremental and self.annotation_image_list is None:
+            self.logger.warning("Incremental conversion is not supported for this format. All data is converted")
+        elif self.incremental and (is_archive_path(self.src_path) or is_archive_path(self.dst_path)):
+            self.logger.warning("Incremental conversion is not supported for archive. All data is converted")
+        elif self.incremental:
+            settings = {
+                "reader": type(self).__name__,
+                "writer": type(writer).__name__,
+                "src_path": str(self.src_path.absolute()),
+                "compact_json": self.compact_json,
+                "gzip_json": self.gzip_json,
+            }
+            self.write_error_list = convert_incremental(self, writer, settings)
+            return
+        total = None if self.annotation_image_list is None else len(self.annotation_image_list)
+        # Image id is index of annotation file, so skipped files are counted as done
+        records = self.progress.track(self._iter_image_records(), "parse", total, lambda record: record[0] + 1)
+        self.write_error_list = writer.write_records(get_stats().iter_records(records))
+
     def validation_check(self):
         pass
 
@@ -0,0 +1,211 @@
+"""Columnar dataset format
+   Dataset is stored in a directory of NumPy arrays ('*.npy') and 'meta.json'.
+   Arrays are memory-mapped when the dataset is read, so loading takes almost no time
+   compared with parsing text, XML or JSON files. Convert any dataset into this format once
+   and convert from it afterwards.
+       meta.json                                   : Version, number of images/annotations and classes
+       image_id.npy                                : (M,) int64
+       image_size.npy                              : (M, 2) float64. [width, height]
+       image_size_is_int.npy                       : (M, 2) bool. Whether width/height was given as integer
+       image_channels.npy                          : (M,) int64. -1 if unknown
+       file_name.npy, file_path.npy                : (L,) uint8. UTF-8 bytes of all strings concatenated
+       file_name_offsets.npy, file_path_offsets.npy: (M+1,) int64. Byte offset of each string
+       annotation_*.npy                            : Columns of AnnotationTable. See 'annotation_table.py' as well.
+"""
+from collections.abc import Mapping
+import json
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+
+from .annotation_table import AnnotationTable, AnnotationTableBuilder
+from .annotation_writer import BaseWriter, _is_int
+from .base import BaseDataFormat
+from .registry import get_writer_class
+from .stats import get_stats
+
+COLUMNAR_VERSION = 1
+
+META_FILE_NAME = "meta.json"
+
+ANNOTATION_COLUMN_LIST = ["image_ids", "offsets", "annotation_id", "class_id", "bbox", "bbox_is_int", "score"]
+
+IMAGE_ARRAY_LIST = [
+    "image_id", "image_size", "image_size_is_int", "image_channels",
+    "file_name", "file_name_offsets", "file_path", "file_path_offsets",
+]
+
+# Names of '*.npy' files. Other files in the directory are not read
+ARRAY_NAME_LIST = IMAGE_ARRAY_LIST + [f"annotation_{column}" for column in ANNOTATION_COLUMN_LIST]
+
+
+def _join_strings(string_list: list) -> tuple:
+    """Concatenate UTF-8 bytes of strings
+
+    Returns:
+        tuple: ((L,) uint8 bytes, (M+1,) int64 offsets)
+    """
+    encoded_list = [string.encode("utf-8") for string in string_list]
+    offsets = np.zeros(len(encoded_list)+1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(encoded) for encoded in encoded_list], dtype=np.int64)
+    return np.frombuffer(b"".join(encoded_list), dtype=np.uint8), offsets
+
+def save_columnar(dst_path, image_id_to_image_info: dict, annotation_table: AnnotationTable,
+                  class_id_to_class_name: dict, class_name_to_class_id: dict) -> None:
+    """Save dataset in columnar format
+
+    Args:
+        dst_path (str): Output directory
+        image_id_to_image_info (dict): See 'base.py' as well.
+        annotation_table (AnnotationTable): Annotations
+        class_id_to_class_name (dict): Class id to class name
+        class_name_to_class_id (dict): Class name to class id
+    """
+    dst_path = Path(dst_path)
+    dst_path.mkdir(exist_ok=True, parents=True)
+    # Old dataset in the directory becomes unreadable before its arrays are overwritten
+    (dst_path / META_FILE_NAME).unlink(missing_ok=True)
+    image_info_list = list(image_id_to_image_info.values())
+    image_size_list = [(image_info["width"], image_info["height"]) for image_info in image_info_list]
+    array_dict = {
+        "image_id": np.array(list(image_id_to_image_info), dtype=np.int64),
+        "image_size": np.array(image_size_list, dtype=np.float64).reshape(-1, 2),
+        "image_size_is_int": np.array([[_is_int(v) for v in size] for size in image_size_list], dtype=bool).reshape(-1, 2),
+        "image_channels": np.array([image_info.get("channels", -1) for image_info in image_info_list], dtype=np.int64),
+    }
+    for key in ["file_name", "file_path"]:
+        array_dict[key], array_dict[f"{key}_offsets"] = _join_strings([image_info[key] for image_info in image_info_list])
+    for column in ANNOTATION_COLUMN_LIST:
+        array_dict[f"annotation_{column}"] = np.ascontiguousarray(getattr(annotation_table, column))
+    for key, value in array_dict.items():
+        np.save(dst_path / f"{key}.npy", value)
+        get_stats().count("files_written")
+        get_stats().count("bytes_written", (dst_path / f"{key}.npy").stat().st_size)
+    # Written last, so that incomplete output is not read
+    with open(dst_path / META_FILE_NAME, "w") as f:
+        json.dump({
+            "version": COLUMNAR_VERSION,
+            "num_images": len(image_info_list),
+            "num_annotations": len(annotation_table),
+            "classes": [[class_id, class_name] for class_id, class_name in class_id_to_class_name.items()],
+            "class_name_to_class_id": [[class_name, class_id] for class_name, class_id in class_name_to_class_id.items()],
+        }, f, indent=4)
+    get_stats().count("files_written")
+    get_stats().count("bytes_written", (dst_path / META_FILE_NAME).stat().st_size)
+
+
+class ImageInfoView(Mapping):
+    """Read-only {image_id: image_info} view of memory-mapped image columns.
+       image_info dict is created when accessed.
+    """
+    def __init__(self, array_dict: dict) -> None:
+        self.array_dict = array_dict
+        self.image_id_list = array_dict["image_id"].tolist()
+        self.image_id_to_index = {image_id: index for index, image_id in enumerate(self.image_id_list)}
+
+    def _get_string(self, key: str, index: int) -> str:
+        offsets = self.array_dict[f"{key}_offsets"]
+        return bytes(self.array_dict[key][offsets[index]:offsets[index+1]]).decode("utf-8")
+
+    def _get_image_info(self, index: int) -> dict:
+        image_size = self.array_dict["image_size"][index].tolist()
+        image_size_is_int = self.array_dict["image_size_is_int"][index].tolist()
+        width, height = [int(v) if is_int else v for v, is_int in zip(image_size, image_size_is_int)]
+        image_info = {
+            "file_name": self._get_string("file_name", index),
+            "file_path": self._get_string("file_path", index),
+            "width": width,
+            "height": height,
+        }
+        image_channel = int(self.array_dict["image_channels"][index])
+        if image_channel >= 0:
+            image_info["channels"] = image_channel
+        return image_info
+
+    def __getitem__(self, image_id) -> dict:
+        return self._get_image_info(self.image_id_to_index[image_id])
+
+    def __iter__(self) -> Iterator:
+        return iter(self.image_id_list)
+
+    def __len__(self) -> int:
+        return len(self.image_id_list)
+
+    def __contains__(self, image_id) -> bool:
+        return image_id in self.image_id_to_index
+
+
+class ColumnarDataset(BaseDataFormat):
+    """Dataset reader for columnar format
+       See module docstring and 'base.py' as well.
+    """
+    def __init__(self, dst_path, class_txt_path, src_path="", **kwargs) -> None:
+        super().__init__(dst_path, class_txt_path, src_path, **kwargs)
+        if str(self.src_path) != ".":
+            self._parse_annotation()
+
+    def _parse_annotation(self):
+        with get_stats().measure("parse"):
+            self._load_arrays()
+        # Arrays are memory-mapped, so bytes are of files rather than actually read
+        for path in [self.src_path / META_FILE_NAME] + [self.src_path / f"{name}.npy" for name in ARRAY_NAME_LIST]:
+            get_stats().count("files_read")
+            get_stats().count("bytes_read", path.stat().st_size)
+
+    def _load_arrays(self):
+        self.logger.info("Loading columnar dataset")
+        with open(self.src_path / META_FILE_NAME) as f:
+            meta = json.load(f)
+        assert meta["version"] == COLUMNAR_VERSION, f"Columnar format version {meta['version']} not supported"
+        array_dict = {name: np.load(self.src_path / f"{name}.npy", mmap_mode="r") for name in ARRAY_NAME_LIST}
+        self.image_id_to_image_info = ImageInfoView(array_dict)
+        self._set_annotation_table(AnnotationTable(
+            *[array_dict[f"annotation_{column}"] for column in ANNOTATION_COLUMN_LIST]
+        ))
+        self.class_id_to_class_name = {class_id: class_name for class_id, class_name in meta["classes"]}
+        self.class_name_to_class_id = {class_name: class_id for class_name, class_id in meta["class_name_to_class_id"]}
+
+    def convert(self, format):
+        """Convert to 'format'. Whole dataset is passed to the writer at once. See 'registry.py' as well."""
+        writer_class = get_writer_class(format)
+        writer = writer_class(self.dst_path, self.class_id_to_class_name, self.class_name_to_class_id, **self._get_dataset_options())
+        if self.incremental:
+            self.logger.warning("Incremental conversion is not supported for columnar source. All data is converted")
+        get_stats().count("images", len(self.image_id_to_image_info))
+        get_stats().count("boxes", len(self.annotation_table))
+        self.write_error_list = writer.write_table(self.image_id_to_image_info, self.annotation_table)
+
+    def validation_check(self):
+        if str(self.src_path) == ".":
+            return
+        if not (self.src_path / META_FILE_NAME).exists():
+            self.logger.critical(f"'{self.src_path / META_FILE_NAME}' not found. '{self.src_path}' must be columnar dataset directory")
+            super()._finalize()
+
+
+class ColumnarWriter(BaseWriter):
+    """Writer for columnar format
+       All records are collected into AnnotationTable and saved at once. See 'save_columnar()' as well.
+    """
+    def get_output_path(self, image_info):
+        return self.dst_path / META_FILE_NAME
+
+    def write_records(self, records):
+        image_id_to_image_info = dict()
+        annotation_id = 1
+        annotation_builder = AnnotationTableBuilder()
+        for image_id, image_info, annotation_list in records:
+            image_id_to_image_info[image_id] = image_info
+            for class_id, bbox, score in annotation_list:
+                annotation_builder.add(image_id, annotation_id, class_id, bbox, score)
+                annotation_id += 1
+        return self.write_table(image_id_to_image_info, annotation_builder.build())
+
+    def write_table(self, image_id_to_image_info, annotation_table):
+        self.logger.info("Converting to columnar")
+        with get_stats().measure("write"):
+            save_columnar(
+                self.dst_path, image_id_to_image_info, annotation_table, self.class_id_to_class_name, self.class_name_to_class_id
+            )
+        return list()
@@ -1,7 +1,11 @@
-from .kitti import KITTIDataset
-from .mscoco import MSCOCODataset 
-from .pascalvoc import PascalVOCDataset
-from .yolo import YoloDataset
+import logging
+import sqlite3
+
+from .image_cache import ImageMetaCache
+from .parallel import WRITER_POOL_LIST
+from .progress import ProgressReporter
+from .registry import get_reader_class
+from .stats import get_stats
 
 class ObjDetFormatConverter():
     """Converter class from 'dst_format' to 'src_format'
@@ -13,24 +17,77 @@ class ObjDetFormatConverter():
         dst_path (str): Output dataset path
         class_txt_path (str): Class list file txt (optional)
                               See 'base.py' as well.
+        use_cache (bool): Use persistent image metadata cache
+        cache_path (str): Image metadata cache path. If empty, user cache dir is used.
+                          See 'image_cache.py' as well.
+        workers (int): Number of parser processes and output file writers. 0 means all CPU cores.
+                       Output is identical to serial mode (workers=1).
+        writer_pool (str): Pool type for output file writers. 'thread' or 'process'
+        compact_json (bool): Write MSCOCO json without indent
+        gzip_json (bool): Write MSCOCO json compressed with gzip
+        json_shard_images (int): Split MSCOCO json into shards of at most this number of images. 0 means no limit
+        json_shard_size (int): Split MSCOCO json into shards of about this number of bytes. 0 means no limit
+        incremental (bool): Convert only annotation files added or changed since last run.
+                            See 'incremental.py' as well.
+        voc_parser (str): PascalVOC annotation file parser. 'fast', 'etree' or 'lxml'
+        io_threads (int): Number of threads per process for file I/O on high-latency filesystems. 0 means no I/O threads
+        progress_callback (None | Callable): Called with progress of parsed/written files. e.g. 'progress.ProgressPrinter()'
+                                             See 'progress.py' as well.
+        progress_interval (float): Minimum seconds between calls of 'progress_callback'
+
+    Raises:
+        ValueError: If 'writer_pool' is not one of WRITER_POOL_LIST
     """
-    def __init__(self, src_format: str, dst_format: str, src_path: str, dst_path: str, class_txt_path: str = "") -> None:
+    def __init__(self, src_format: str, dst_format: str, src_path: str, dst_path: str, class_txt_path: str = "",
+                 use_cache: bool = False, cache_path: str = "", workers: int = 1, writer_pool: str = "thread",
+                 compact_json: bool = False, gzip_json: bool = False, incremental: bool = False,
+                 voc_parser: str = "fast", json_shard_images: int = 0, json_shard_size: int = 0,
+                 io_threads: int = 0, progress_callback=None, progress_interval: float = 1.0) -> None:
+        # Checked before loading dataset, since writers are created after the whole source is parsed
+        if not writer_pool in WRITER_POOL_LIST:
+            raise ValueError(f"Writer pool '{writer_pool}' not supported. Choose from {WRITER_POOL_LIST}")
         self.src_format = src_format
         self.dst_format = dst_format
         self.src_path = src_path
         self.dst_path = dst_path
         self.class_txt_path = class_txt_path
+        self.logger = logging.getLogger("logger")
+        self.image_meta_cache = None
+        if use_cache:
+            self.image_meta_cache = self.create_image_meta_cache(cache_path)
+        # Passed to dataset classes. See 'base.py' as well.
+        self.dataset_options = {
+            "image_meta_cache": self.image_meta_cache,
+            "workers": workers,
+            "writer_pool": writer_pool,
+            "compact_json": compact_json,
+            "gzip_json": gzip_json,
+            "incremental": incremental,
+            "voc_parser": voc_parser,
+            "json_shard_images": json_shard_images,
+            "json_shard_size": json_shard_size,
+            "io_threads": io_threads,
+            "progress": ProgressReporter(progress_callback, progress_interval),
+        }
         self.src_dataset_class = self.create_src_dataset_class()
+
+    def create_image_meta_cache(self, cache_path):
+        try:
+            return ImageMetaCache(cache_path)
+        except (OSError, sqlite3.Error) as e:
+            self.logger.warning(f"Image metadata cache not available: {e}")
+            return None
     
     def create_src_dataset_class(self):
-        if self.src_format == "coco":
-            return MSCOCODataset(self.dst_path, self.class_txt_path, self.src_path)
-        elif self.src_format == "yolo":
-            return YoloDataset(self.dst_path, self.class_txt_path, self.src_path)
-        elif self.src_format == "kitti":
-            return KITTIDataset(self.dst_path, self.class_txt_path, self.src_path)
-        elif self.src_format == "pascalvoc":
-            return PascalVOCDataset(self.dst_path, self.class_txt_path, self.src_path)
+        # Dataset class of each format is registered in 'registry.py'
+        reader_class = get_reader_class(self.src_format)
+        with get_stats().measure("load"):
+            return reader_class(self.dst_path, self.class_txt_path, self.src_path, **self.dataset_options)
         
     def run_convert(self):
-        self.src_dataset_class.convert(self.dst_format)
\ No newline at end of file
+        try:
+            with get_stats().measure("convert"):
+                self.src_dataset_class.convert(self.dst_format)
+        finally:
+            if self.image_meta_cache is not None:
+                self.image_meta_cache.close()
\ No newline at end of file
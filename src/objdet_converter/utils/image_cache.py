@@ -0,0 +1,203 @@
+import logging
+import os
+from pathlib import Path
+import sqlite3
+import time
+from typing import Union
+
+from .archive import get_image_size
+
+CACHE_FILE_NAME = "image_meta.sqlite3"
+
+# Number of updated rows kept in memory before committing
+COMMIT_INTERVAL = 1000
+
+# Seconds to wait for a cache file locked by another process
+LOCK_TIMEOUT = 10.0
+
+
+def get_default_cache_path() -> Path:
+    """Get default cache file path in user cache dir
+       '$XDG_CACHE_HOME/objdet_converter/image_meta.sqlite3' or '~/.cache/objdet_converter/image_meta.sqlite3'
+
+    Returns:
+        pathlib.Path: Cache file path
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME", "")
+    if cache_home == "":
+        cache_home = Path.home() / ".cache"
+    return Path(cache_home) / "objdet_converter" / CACHE_FILE_NAME
+
+class ImageMetaCache:
+    """Persistent image metadata cache
+       Holds width, height, channels and extension of images keyed by (path, size, mtime).
+       Image whose size or mtime is changed is probed again.
+       If cache file cannot be used while converting (e.g. locked by another process longer than LOCK_TIMEOUT),
+       the cache is disabled with a warning and images are probed without cache.
+
+    Args:
+        cache_path (str): Cache file path. If empty, default path in user cache dir is used.
+                          When dir path is specified, 'image_meta.sqlite3' in the dir is used.
+                          e.g. Pass source dataset dir to keep the cache with the dataset.
+    """
+    def __init__(self, cache_path: str = "") -> None:
+        self.logger = logging.getLogger("logger")
+        if str(cache_path) == "":
+            cache_path = get_default_cache_path()
+        self.cache_path = Path(cache_path)
+        if self.cache_path.is_dir():
+            self.cache_path = self.cache_path / CACHE_FILE_NAME
+        self.cache_path.parent.mkdir(exist_ok=True, parents=True)
+        self.connection = sqlite3.connect(str(self.cache_path), timeout=LOCK_TIMEOUT)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS image_meta ("
+            "path TEXT PRIMARY KEY, "
+            "size INTEGER NOT NULL, "
+            "mtime_ns INTEGER NOT NULL, "
+            "width INTEGER NOT NULL, "
+            "height INTEGER NOT NULL, "
+            "channels INTEGER NOT NULL, "
+            "extension TEXT NOT NULL, "
+            "last_used REAL NOT NULL)"
+        )
+        self.connection.commit()
+        self.pending_count = 0
+        self.hit_count = 0
+        self.miss_count = 0
+
+    def get_image_size(self, image_path: Union[str, Path]) -> Union[None, tuple]:
+        """Get image size from cache. If not cached or file is changed, probe image header.
+           See 'image_size.py' as well.
+
+        Args:
+            image_path (str | pathlib.Path): Image file path
+
+        Returns:
+            None | tuple: (width, height, channels) if image is readable, else None
+        """
+        image_size = self.lookup(image_path)
+        if image_size is not None:
+            return image_size
+        image_size = get_image_size(image_path)
+        if image_size is not None:
+            self.store(image_path, image_size)
+        return image_size
+
+    def lookup(self, image_path: Union[str, Path]) -> Union[None, tuple]:
+        """Get cached image size without probing
+
+        Args:
+            image_path (str | pathlib.Path): Image file path
+
+        Returns:
+            None | tuple: (width, height, channels) if cached and file is not changed, else None
+        """
+        if self.connection is None:
+            return None
+        image_path = Path(image_path)
+        key = str(image_path.absolute())
+        try:
+            stat = image_path.stat()
+        except OSError:
+            return None
+        try:
+            row = self.connection.execute(
+                "SELECT size, mtime_ns, width, height, channels FROM image_meta WHERE path = ?",
+                (key,),
+            ).fetchone()
+            if row is None or row[0] != stat.st_size or row[1] != stat.st_mtime_ns:
+                self.miss_count += 1
+                return None
+            self.connection.execute("UPDATE image_meta SET last_used = ? WHERE path = ?", (time.time(), key))
+            self._count_pending()
+        except sqlite3.OperationalError as e:
+            self._disable(e)
+            return None
+        self.hit_count += 1
+        return row[2], row[3], row[4]
+
+    def store(self, image_path: Union[str, Path], image_size: tuple) -> None:
+        """Store probed image size
+
+        Args:
+            image_path (str | pathlib.Path): Image file path
+            image_size (tuple): (width, height, channels)
+        """
+        if self.connection is None:
+            return
+        image_path = Path(image_path)
+        try:
+            stat = image_path.stat()
+        except OSError:
+            return
+        try:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO image_meta VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (str(image_path.absolute()), stat.st_size, stat.st_mtime_ns, *image_size, image_path.suffix, time.time()),
+            )
+            self._count_pending()
+        except sqlite3.OperationalError as e:
+            self._disable(e)
+
+    def _count_pending(self):
+        self.pending_count += 1
+        if self.pending_count >= COMMIT_INTERVAL:
+            self.connection.commit()
+            self.pending_count = 0
+
+    def _disable(self, error):
+        # Entries not committed yet are discarded
+        self.logger.warning(f"Image metadata cache '{self.cache_path}' not available, continued without cache: {error}")
+        self.connection.close()
+        self.connection = None
+
+    def cleanup(self, max_age_days: Union[None, float] = None) -> int:
+        """Evict stale entries
+           Entries whose file is removed or changed are deleted.
+           If 'max_age_days' is specified, entries not used for the days are deleted as well.
+
+        Args:
+            max_age_days (None | float): Max days since an entry was used last
+
+        Returns:
+            int: Number of deleted entries
+        """
+        stale_key_list = list()
+        rows = self.connection.execute("SELECT path, size, mtime_ns, last_used FROM image_meta").fetchall()
+        threshold = None
+        if max_age_days is not None:
+            threshold = time.time() - max_age_days * 24 * 60 * 60
+        for path, size, mtime_ns, last_used in rows:
+            if (threshold is not None) and (last_used < threshold):
+                stale_key_list.append((path,))
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                stale_key_list.append((path,))
+                continue
+            if stat.st_size != size or stat.st_mtime_ns != mtime_ns:
+                stale_key_list.append((path,))
+        self.connection.executemany("DELETE FROM image_meta WHERE path = ?", stale_key_list)
+        self.connection.commit()
+        self.connection.execute("VACUUM")
+        return len(stale_key_list)
+
+    def clear(self) -> None:
+        """Delete all entries"""
+        self.connection.execute("DELETE FROM image_meta")
+        self.connection.commit()
+        self.connection.execute("VACUUM")
+
+    def close(self) -> None:
+        """Commit pending entries and close cache file"""
+        if self.connection is None:
+            return
+        try:
+            self.connection.commit()
+        except sqlite3.OperationalError as e:
+            self._disable(e)
+            return
+        self.connection.close()
+        self.logger.debug(f"Image metadata cache: {self.hit_count} hit, {self.miss_count} miss")
+
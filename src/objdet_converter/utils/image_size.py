@@ -0,0 +1,225 @@
+import struct
+from pathlib import Path
+from typing import Union
+
+import cv2
+import numpy as np
+
+# Bytes read from the head of a file. Enough for PNG/BMP/TIFF headers and
+# for most JPEG files whose SOF marker follows a small EXIF block.
+HEADER_READ_SIZE = 64 * 1024
+
+# JPEG SOFn markers carrying frame size (DHT, JPG and DAC are excluded)
+JPEG_SOF_MARKERS = {
+    0xC0, 0xC1, 0xC2, 0xC3,
+    0xC5, 0xC6, 0xC7,
+    0xC9, 0xCA, 0xCB,
+    0xCD, 0xCE, 0xCF,
+}
+
+# PNG color type -> number of channels (as decoded by OpenCV)
+PNG_COLOR_TYPE_TO_CHANNELS = {
+    0: 1,  # Grayscale
+    2: 3,  # RGB
+    3: 3,  # Palette
+    4: 4,  # Grayscale + alpha (OpenCV expands to BGRA)
+    6: 4,  # RGBA
+}
+
+
+def _parse_png(header: bytes) -> Union[None, tuple]:
+    if len(header) < 26 or header[12:16] != b"IHDR":
+        return None
+    width, height = struct.unpack(">II", header[16:24])
+    channels = PNG_COLOR_TYPE_TO_CHANNELS.get(header[25], 3)
+    return width, height, channels
+
+def _parse_bmp(header: bytes) -> Union[None, tuple]:
+    if len(header) < 26:
+        return None
+    dib_header_size = struct.unpack("<I", header[14:18])[0]
+    if dib_header_size == 12:
+        # BITMAPCOREHEADER
+        width, height, _, bit_count = struct.unpack("<HHHH", header[18:26])
+    else:
+        if len(header) < 30:
+            return None
+        width, height, _, bit_count = struct.unpack("<iiHH", header[18:30])
+    channels = 4 if bit_count == 32 else 3
+    if bit_count <= 8 and dib_header_size >= 40:
+        # Palette image. OpenCV decodes it as grayscale when all palette entries are gray
+        color_count = struct.unpack("<I", header[46:50])[0] or 2 ** bit_count
+        palette_offset = 14 + dib_header_size
+        palette = header[palette_offset:palette_offset + color_count * 4]
+        if len(palette) == color_count * 4 and all(
+            palette[i] == palette[i+1] == palette[i+2] for i in range(0, len(palette), 4)
+        ):
+            channels = 1
+    # Negative height means top-down bitmap
+    return abs(width), abs(height), channels
+
+def _parse_tiff_ifd(data: bytes, offset: int, endian: str) -> Union[None, dict]:
+    """Read IFD entries as {tag: first value}"""
+    if offset + 2 > len(data):
+        return None
+    entry_count = struct.unpack(endian + "H", data[offset:offset+2])[0]
+    entries = dict()
+    for i in range(entry_count):
+        entry_offset = offset + 2 + i * 12
+        if entry_offset + 12 > len(data):
+            break
+        tag, value_type = struct.unpack(endian + "HH", data[entry_offset:entry_offset+4])
+        if value_type == 3:
+            # SHORT
+            value = struct.unpack(endian + "H", data[entry_offset+8:entry_offset+10])[0]
+        elif value_type == 4:
+            # LONG
+            value = struct.unpack(endian + "I", data[entry_offset+8:entry_offset+12])[0]
+        else:
+            continue
+        entries[tag] = value
+    return entries
+
+def _parse_tiff(f, header: bytes) -> Union[None, tuple]:
+    if len(header) < 8:
+        return None
+    endian = "<" if header[:2] == b"II" else ">"
+    ifd_offset = struct.unpack(endian + "I", header[4:8])[0]
+    if ifd_offset + 2 > len(header):
+        # IFD is located after image data
+        f.seek(ifd_offset)
+        header = f.read(HEADER_READ_SIZE)
+        ifd_offset = 0
+    entries = _parse_tiff_ifd(header, ifd_offset, endian)
+    if not entries or 256 not in entries or 257 not in entries:
+        return None
+    width = entries[256]
+    height = entries[257]
+    samples_per_pixel = entries.get(277, 1)
+    channels = 1 if samples_per_pixel == 1 else min(samples_per_pixel, 4)
+    return width, height, channels
+
+def _parse_exif_orientation(segment: bytes) -> int:
+    """Get orientation tag value from JPEG APP1 segment. 1 (normal) if not found"""
+    if segment[:6] != b"Exif\x00\x00":
+        return 1
+    tiff_data = segment[6:]
+    if len(tiff_data) < 8:
+        return 1
+    endian = "<" if tiff_data[:2] == b"II" else ">"
+    ifd_offset = struct.unpack(endian + "I", tiff_data[4:8])[0]
+    entries = _parse_tiff_ifd(tiff_data, ifd_offset, endian)
+    if not entries:
+        return 1
+    return entries.get(274, 1)
+
+def _parse_jpeg(f, header: bytes) -> Union[None, tuple]:
+    data = header
+    position = 2
+    orientation = 1
+    while True:
+        # Read more only if marker straddles the buffer
+        if position + 10 > len(data):
+            chunk = f.read(HEADER_READ_SIZE)
+            if not chunk:
+                return None
+            data = data + chunk
+            continue
+        if data[position] != 0xFF:
+            return None
+        marker = data[position+1]
+        if marker == 0xFF:
+            # Fill byte
+            position += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            # Markers without payload
+            position += 2
+            continue
+        segment_length = struct.unpack(">H", data[position+2:position+4])[0]
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">HH", data[position+5:position+9])
+            channels = data[position+9]
+            # OpenCV applies EXIF orientation when decoding, width and height are swapped
+            if orientation in (5, 6, 7, 8):
+                width, height = height, width
+            return width, height, channels
+        if marker == 0xDA or marker == 0xD9:
+            # Start of scan or end of image before any frame header
+            return None
+        segment_end = position + 2 + segment_length
+        if marker == 0xE1:
+            while segment_end > len(data):
+                chunk = f.read(segment_end - len(data))
+                if not chunk:
+                    return None
+                data = data + chunk
+            orientation = _parse_exif_orientation(data[position+4:segment_end])
+        position = segment_end
+
+def _probe_file(f) -> Union[None, tuple]:
+    header = f.read(HEADER_READ_SIZE)
+    if header[:8] == b"\x89PNG\r\n\x1a\n":
+        return _parse_png(header)
+    if header[:2] == b"\xff\xd8":
+        return _parse_jpeg(f, header)
+    if header[:2] == b"BM":
+        return _parse_bmp(header)
+    if header[:4] in (b"II*\x00", b"MM\x00*"):
+        return _parse_tiff(f, header)
+    return None
+
+def _probe_header(image_path: Path) -> Union[None, tuple]:
+    with open(image_path, "rb") as f:
+        return _probe_file(f)
+
+def _get_decoded_size(image) -> Union[None, tuple]:
+    if image is None:
+        return None
+    image_height, image_width = image.shape[:2]
+    image_channel = 1 if image.ndim == 2 else image.shape[-1]
+    return image_width, image_height, image_channel
+
+def _probe_opencv(image_path: Path) -> Union[None, tuple]:
+    return _get_decoded_size(cv2.imread(str(image_path), cv2.IMREAD_UNCHANGED))
+
+def get_image_size(image_path: Union[str, Path]) -> Union[None, tuple]:
+    """Get image size reading only file header.
+       PNG, JPEG, BMP and TIFF headers are parsed directly. Other formats or
+       headers which cannot be parsed fall back to decoding with OpenCV.
+
+    Args:
+        image_path (str | pathlib.Path): Image file path
+
+    Returns:
+        None | tuple: (width, height, channels) if image is readable, else None
+    """
+    image_path = Path(image_path)
+    try:
+        image_size = _probe_header(image_path)
+    except (OSError, struct.error, IndexError):
+        image_size = None
+    if image_size is None:
+        image_size = _probe_opencv(image_path)
+    return image_size
+
+def get_image_size_from_file(f) -> Union[None, tuple]:
+    """Get image size from binary file object. e.g. archive member. See 'get_image_size()' as well.
+
+    Args:
+        f (BinaryIO): Seekable binary file object at the head of image
+
+    Returns:
+        None | tuple: (width, height, channels) if image is readable, else None
+    """
+    try:
+        image_size = _probe_file(f)
+    except (OSError, struct.error, IndexError):
+        image_size = None
+    if image_size is None:
+        f.seek(0)
+        data = np.frombuffer(f.read(), dtype=np.uint8)
+        if len(data) == 0:
+            return None
+        image_size = _get_decoded_size(cv2.imdecode(data, cv2.IMREAD_UNCHANGED))
+    return image_size
@@ -0,0 +1,295 @@
+"""Incremental conversion
+   A manifest of source annotation files (size, mtime, sha256 and corresponding image) is kept next to the output.
+   On the next run, only added or changed files are parsed and written, and outputs of removed files are deleted.
+   Writers of whole dataset (e.g. MSCOCO) are fed by parsed records of unchanged files cached in '*.npz'
+   together with re-parsed records, so the output is the same as full conversion.
+"""
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+
+from .annotation_writer import get_bbox_is_int
+from .stats import get_stats
+from .utils import bbox_array2list
+
+MANIFEST_VERSION = 1
+
+# Manifest file name in output dir of per-file formats
+MANIFEST_FILE_NAME = ".objdet_manifest.json"
+
+# Suffixes appended to output file name of whole dataset formats. e.g. 'annotation.json.objdet_manifest.json'
+MANIFEST_SUFFIX = ".objdet_manifest.json"
+CACHE_SUFFIX = ".objdet_cache.npz"
+
+# Bytes read at once for hashing
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def get_file_hash(file_path: Union[str, Path]) -> str:
+    """Get sha256 hex digest of file content"""
+    file_hash = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+def _get_stat(file_path) -> Union[None, list]:
+    if file_path is None:
+        return None
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class ConversionManifest:
+    """Manifest of source annotation files converted last time
+
+    Args:
+        manifest_path (pathlib.Path): Manifest json file path
+        settings (dict): Conversion settings. Manifest of different settings is discarded
+    """
+    def __init__(self, manifest_path: Path, settings: dict) -> None:
+        self.manifest_path = Path(manifest_path)
+        self.settings = settings
+        self.logger = logging.getLogger("logger")
+        self.file_dict = dict()
+        self.class_list = None
+        self.valid = False
+        if not self.manifest_path.exists():
+            return
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Manifest '{self.manifest_path}' could not be read: {e}")
+            return
+        if manifest.get("version") != MANIFEST_VERSION or manifest.get("settings") != settings:
+            self.logger.info("Conversion settings changed since last run. All files are converted")
+            return
+        self.file_dict = manifest["files"]
+        self.class_list = manifest["classes"]
+        self.valid = True
+
+    def is_unchanged(self, key: str, annotation_path: Path, image_path: Union[None, Path]) -> bool:
+        """Whether annotation file and its image are same as last time and its output exists
+
+        Args:
+            key (str): Annotation file path relative to source dir
+            annotation_path (pathlib.Path): Annotation file path
+            image_path (None | pathlib.Path): Image file path
+
+        Returns:
+            bool: True if unchanged
+        """
+        entry = self.file_dict.get(key)
+        if entry is None:
+            return False
+        if entry["image"] != (None if image_path is None else str(image_path)):
+            return False
+        if entry["image_stat"] != _get_stat(image_path):
+            return False
+        if (entry["output"] is not None) and (not os.path.exists(entry["output"])):
+            return False
+        stat = _get_stat(annotation_path)
+        if stat == entry["stat"]:
+            return True
+        if stat is None or stat[0] != entry["stat"][0]:
+            return False
+        # Touched but content may be same
+        if get_file_hash(annotation_path) != entry["sha256"]:
+            return False
+        entry["stat"] = stat
+        return True
+
+    def create_entry(self, annotation_path: Path, image_path: Union[None, Path], output_path: Union[None, Path]) -> dict:
+        """Create entry of converted annotation file"""
+        return {
+            "stat": _get_stat(annotation_path),
+            "sha256": get_file_hash(annotation_path),
+            "image": None if image_path is None else str(image_path),
+            "image_stat": _get_stat(image_path),
+            "output": None if output_path is None else str(output_path),
+        }
+
+    def save(self, file_dict: dict, class_list: list) -> None:
+        """Write manifest atomically
+
+        Args:
+            file_dict (dict): {key: entry}
+            class_list (list): [[class_id, class_name], ...] before conversion
+        """
+        self.manifest_path.parent.mkdir(exist_ok=True, parents=True)
+        tmp_path = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "version": MANIFEST_VERSION,
+                "settings": self.settings,
+                "classes": class_list,
+                "files": file_dict,
+            }, f)
+        os.replace(tmp_path, self.manifest_path)
+
+
+def save_record_cache(cache_path: Path, key_record_list: list) -> None:
+    """Save parsed records in columnar form
+
+    Args:
+        cache_path (pathlib.Path): Cache file path ('*.npz')
+        key_record_list (list): [(key, image_info, [(class_id, bbox, score or None), ...]), ...]
+    """
+    annotation_list = [annotation for _, _, image_annotation_list in key_record_list for annotation in image_annotation_list]
+    bbox_list = [bbox for _, bbox, _ in annotation_list]
+    tmp_path = cache_path.with_name(cache_path.name + ".tmp.npz")
+    np.savez(
+        tmp_path,
+        key=np.array([key for key, _, _ in key_record_list], dtype=str),
+        file_name=np.array([image_info["file_name"] for _, image_info, _ in key_record_list], dtype=str),
+        file_path=np.array([image_info["file_path"] for _, image_info, _ in key_record_list], dtype=str),
+        width=np.array([image_info["width"] for _, image_info, _ in key_record_list], dtype=np.int64),
+        height=np.array([image_info["height"] for _, image_info, _ in key_record_list], dtype=np.int64),
+        count=np.array([len(image_annotation_list) for _, _, image_annotation_list in key_record_list], dtype=np.int64),
+        class_id=np.array([class_id for class_id, _, _ in annotation_list], dtype=np.int64),
+        bbox=np.array(bbox_list, dtype=np.float64).reshape(-1, 4),
+        bbox_is_int=get_bbox_is_int(bbox_list),
+        score=np.array([np.nan if score is None else score for _, _, score in annotation_list], dtype=np.float64),
+    )
+    os.replace(tmp_path, cache_path)
+
+def load_record_cache(cache_path: Path) -> dict:
+    """Load records saved by 'save_record_cache()'
+
+    Returns:
+        dict: {key: (image_info, [(class_id, bbox, score or None), ...])}
+    """
+    key_to_record = dict()
+    with np.load(cache_path) as data:
+        offsets = np.concatenate([[0], np.cumsum(data["count"])]).tolist()
+        class_id_list = data["class_id"].tolist()
+        bbox_list = bbox_array2list(data["bbox"], data["bbox_is_int"])
+        score_list = [None if score != score else score for score in data["score"].tolist()]
+        for index, (key, file_name, file_path, width, height) in enumerate(zip(
+            data["key"].tolist(), data["file_name"].tolist(), data["file_path"].tolist(),
+            data["width"].tolist(), data["height"].tolist(),
+        )):
+            image_info = {
+                "file_name": file_name,
+                "file_path": file_path,
+                "width": width,
+                "height": height,
+            }
+            rows = slice(offsets[index], offsets[index+1])
+            key_to_record[key] = (image_info, list(zip(class_id_list[rows], bbox_list[rows], score_list[rows])))
+    return key_to_record
+
+
+def get_manifest_path(writer) -> Path:
+    """Get manifest path. In output dir of per-file formats, next to output file otherwise"""
+    if writer.per_file:
+        return writer.dst_path / MANIFEST_FILE_NAME
+    output_path = Path(writer.get_output_path(None))
+    return output_path.with_name(output_path.name + MANIFEST_SUFFIX)
+
+def convert_incremental(reader, writer, settings: dict) -> list:
+    """Convert only added or changed annotation files. See module docstring.
+
+    Args:
+        reader (BaseDataFormat): Dataset with 'annotation_image_list'
+        writer (BaseWriter): Writer of output format
+        settings (dict): Conversion settings. Everything is converted when they are changed
+
+    Returns:
+        list: [(output path, error message), ...] of failed outputs
+    """
+    logger = logging.getLogger("logger")
+    manifest_path = get_manifest_path(writer)
+    manifest = ConversionManifest(manifest_path, settings)
+    cache_path = manifest_path.with_name(manifest_path.name[:-len(MANIFEST_SUFFIX)] + CACHE_SUFFIX)
+    # Snapshot before parsing since YOLO dataset without class list adds classes while parsing
+    class_list = [[class_id, class_name] for class_id, class_name in reader.class_id_to_class_name.items()]
+    if manifest.valid and manifest.class_list != class_list:
+        logger.info("Class list changed since last run. All files are converted")
+        manifest.valid = False
+    key_to_cached_record = dict()
+    if manifest.valid and (not writer.per_file):
+        if cache_path.exists():
+            key_to_cached_record = load_record_cache(cache_path)
+        else:
+            manifest.valid = False
+
+    annotation_image_list = reader.annotation_image_list
+    key_list = [str(Path(annotation_path).relative_to(reader.src_path)) for annotation_path, _ in annotation_image_list]
+    file_dict = dict()
+    changed_list = list()
+    changed_key_list = list()
+    for key, (annotation_path, image_path) in zip(key_list, annotation_image_list):
+        if manifest.valid and manifest.is_unchanged(key, annotation_path, image_path):
+            entry = manifest.file_dict[key]
+            if writer.per_file or (entry["output"] is None) or (key in key_to_cached_record):
+                file_dict[key] = entry
+                continue
+        changed_list.append((annotation_path, image_path))
+        changed_key_list.append(key)
+    changed_key_set = set(changed_key_list)
+    removed_key_list = [key for key in manifest.file_dict if (not key in file_dict) and (not key in changed_key_set)]
+    logger.info(
+        f"Incremental: {len(changed_list)} added or changed, {len(file_dict)} unchanged, {len(removed_key_list)} removed"
+    )
+    # Records of unchanged files are not parsed this time
+    key_to_record = {key: key_to_cached_record[key] for key in file_dict if key in key_to_cached_record}
+    reader._restore_classes([class_id for _, annotation_list in key_to_record.values() for class_id, _, _ in annotation_list])
+
+    def iter_changed_records():
+        reader.annotation_image_list = changed_list
+        try:
+            parsed_key_set = set()
+            records = reader.progress.track(
+                reader._iter_image_records(), "parse", len(changed_list), lambda record: record[0] + 1
+            )
+            for index, image_info, annotation_list in get_stats().iter_records(records):
+                key = changed_key_list[index]
+                annotation_path, image_path = changed_list[index]
+                parsed_key_set.add(key)
+                file_dict[key] = manifest.create_entry(annotation_path, image_path, writer.get_output_path(image_info))
+                yield key, image_info, annotation_list
+            # Files skipped by the reader (e.g. image not found) are not parsed again until they change
+            for key, (annotation_path, image_path) in zip(changed_key_list, changed_list):
+                if not key in parsed_key_set:
+                    file_dict[key] = manifest.create_entry(annotation_path, image_path, None)
+        finally:
+            reader.annotation_image_list = annotation_image_list
+
+    if writer.per_file:
+        write_error_list = writer.write_records(
+            (image_id, image_info, annotation_list) for image_id, (_, image_info, annotation_list) in enumerate(iter_changed_records())
+        )
+    else:
+        for key, image_info, annotation_list in iter_changed_records():
+            key_to_record[key] = (image_info, annotation_list)
+        # Whole dataset is written again in file order with same image ids as full conversion
+        key_record_list = [(image_id, key) + key_to_record[key] for image_id, key in enumerate(key_list) if key in key_to_record]
+        write_error_list = writer.write_records(
+            (image_id, image_info, annotation_list) for image_id, _, image_info, annotation_list in key_record_list
+        )
+        save_record_cache(cache_path, [record[1:] for record in key_record_list])
+
+    # Outputs of removed files unless same output is written from another file
+    output_set = {entry["output"] for entry in file_dict.values()}
+    for key in removed_key_list:
+        output = manifest.file_dict[key]["output"]
+        if writer.per_file and (not output is None) and (not output in output_set) and os.path.exists(output):
+            os.remove(output)
+    # Failed outputs are converted again next time
+    failed_output_set = {str(output_path) for output_path, _ in write_error_list}
+    file_dict = {key: entry for key, entry in file_dict.items() if not entry["output"] in failed_output_set}
+    manifest.save(file_dict, class_list)
+    return write_error_list
@@ -0,0 +1,196 @@
+import json
+import re
+from typing import Iterable, Iterator, TextIO
+
+# Characters read from file at once
+READ_CHUNK_SIZE = 1024 * 1024
+
+# Number of array elements encoded at once in JSONStreamWriter
+WRITE_BATCH_SIZE = 1000
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+# Characters which may continue a number. e.g. '1.5' + 'e3'
+NUMBER_TAIL = re.compile(r"[0-9.eE+-]*")
+
+# Longest token whose decode error is reported at its start when it is split. e.g. '-Infinity', '\ud83d\ude00'
+MAX_TOKEN_LENGTH = 12
+
+
+class JSONStreamReader:
+    """Incremental reader of a JSON file whose top level is an object.
+       Elements of the top level arrays are decoded one by one, so only the read buffer
+       and a single element are held in memory. The whole JSON tree is never built.
+
+    Args:
+        f (TextIO): File object opened in text mode
+    """
+    def __init__(self, f: TextIO) -> None:
+        self.f = f
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def _read_more(self, size: int = 0) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(size or READ_CHUNK_SIZE)
+        if chunk == "":
+            self.eof = True
+            return False
+        # Drop consumed part of the buffer
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def _peek(self) -> str:
+        """Skip whitespaces and get next character. Empty string at EOF"""
+        while True:
+            self.position = WHITESPACE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self._read_more():
+                return ""
+
+    def _expect(self, characters: str) -> str:
+        character = self._peek()
+        if character == "" or not character in characters:
+            raise json.JSONDecodeError(f"Expecting one of '{characters}'", self.buffer, self.position)
+        self.position += 1
+        return character
+
+    def _is_split(self, error: json.JSONDecodeError) -> bool:
+        """Whether decode error may be caused by the end of the buffer, not by malformed JSON"""
+        return error.msg.startswith("Unterminated string") or error.pos >= len(self.buffer) - MAX_TOKEN_LENGTH
+
+    def _decode_value(self):
+        self._peek()
+        read_size = READ_CHUNK_SIZE
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError as e:
+                # Value may be split at the end of the buffer.
+                # Malformed value raises at once, so the rest of the file is not read into the buffer
+                if not self._is_split(e) or not self._read_more(read_size):
+                    raise
+                read_size *= 2
+                continue
+            # Number at the end of the buffer may continue in next chunk
+            number_split = isinstance(value, (int, float)) and NUMBER_TAIL.match(self.buffer, end).end() == len(self.buffer)
+            if (end == len(self.buffer) or number_split) and self._read_more(read_size):
+                continue
+            self.position = end
+            return value
+
+    def iter_items(self, array_key_list: list) -> Iterator:
+        """Iterate top level items
+
+        Args:
+            array_key_list (list): Keys whose array elements are yielded one by one
+
+        Yields:
+            tuple: (key, element) for each element of arrays in 'array_key_list'.
+                   (key, value) for other keys.
+        """
+        self._expect("{")
+        if self._peek() == "}":
+            return
+        while True:
+            key = self._decode_value()
+            self._expect(":")
+            if key in array_key_list and self._peek() == "[":
+                self._expect("[")
+                if self._peek() == "]":
+                    self.position += 1
+                else:
+                    while True:
+                        yield key, self._decode_value()
+                        if self._expect(",]") == "]":
+                            break
+            else:
+                yield key, self._decode_value()
+            if self._expect(",}") == "}":
+                return
+
+
+class JSONStreamWriter:
+    """Incremental writer of a JSON file whose top level is an object.
+       Array elements are encoded and written one by one, so the whole JSON tree is never built.
+       With 'indent=4', output is byte-identical to 'json.dump(obj, f, indent=4)'.
+
+    Args:
+        f (TextIO): File object opened in text mode
+        indent (None | int): Indent width. None writes compact JSON without whitespaces
+    """
+    def __init__(self, f: TextIO, indent=4) -> None:
+        self.f = f
+        self.indent = indent
+        if indent is None:
+            self.encoder = json.JSONEncoder(separators=(",", ":"))
+        else:
+            self.encoder = json.JSONEncoder(indent=indent)
+        self.item_count = 0
+        self.element_count = 0
+
+    def _newline(self, level: int) -> str:
+        if self.indent is None:
+            return ""
+        return "\n" + " " * (self.indent * level)
+
+    def _encode(self, value, level: int) -> str:
+        text = self.encoder.encode(value)
+        if self.indent is None:
+            return text
+        return text.replace("\n", self._newline(level))
+
+    def _write_key(self, key: str) -> None:
+        self.f.write("," if self.item_count > 0 else "")
+        self.f.write(self._newline(1))
+        self.f.write(self.encoder.encode(key))
+        self.f.write(":" if self.indent is None else ": ")
+        self.item_count += 1
+
+    def begin(self) -> None:
+        self.f.write("{")
+
+    def end(self) -> None:
+        if self.item_count > 0:
+            self.f.write(self._newline(0))
+        self.f.write("}")
+
+    def write_item(self, key: str, value) -> None:
+        """Write top level item at once"""
+        self._write_key(key)
+        self.f.write(self._encode(value, 1))
+
+    def write_array(self, key: str, elements: Iterable) -> None:
+        """Write top level array consuming 'elements' one by one"""
+        self._write_key(key)
+        self.f.write("[")
+        element_count = 0
+        batch = list()
+        for element in elements:
+            batch.append(element)
+            if len(batch) >= WRITE_BATCH_SIZE:
+                self._write_batch(batch, element_count)
+                element_count += len(batch)
+                batch = list()
+        if batch:
+            self._write_batch(batch, element_count)
+            element_count += len(batch)
+        if element_count > 0:
+            self.f.write(self._newline(1))
+        self.f.write("]")
+        self.element_count += element_count
+
+    def _write_batch(self, batch: list, written_count: int) -> None:
+        # Encoding a list of elements at once is much faster than encoding each element
+        text = self._encode(batch, 1)
+        # Strip brackets of the list, elements are kept at the array level
+        text = text[1:-1]
+        if self.indent is not None:
+            text = text[:-len(self._newline(1))]
+        self.f.write("," if written_count > 0 else "")
+        self.f.write(text)
@@ -1,31 +1,102 @@
-import cv2
+from functools import partial
 
+from .archive import file_exists, get_image_size, open_file, prefetch_files, scan_annotation_files
 from .base import BaseDataFormat
-from .mscoco import MSCOCODataset
-from .utils import check_image_existence, topleftbottomright2topleftwh
+from .label_reader import parse_kitti_files, read_label_files, split_label_batches
+from .parallel import parallel_map, thread_map
+from .utils import topleftbottomright2topleftwh, topleftbottomright2topleftwh_batch
+
+
+def _parse_annotation_file(task):
+    """Parse one KITTI annotation file. Called in worker process.
+
+    Args:
+        task (tuple): (annotation_path, image_path, cached image size or None)
+
+    Returns:
+        tuple: ((width, height, channels) or None, [(class_name, bbox, score), ...])
+               bbox is absolute [left, top, width, height]
+    """
+    annotation_path, image_path, image_size = task
+    # Labels are parsed even if image is not found, since class names of all files are collected
+    object_list = list()
+    with open_file(annotation_path) as f:
+        lines = f.read().split('\n')
+    for line in lines:
+        if line == "":
+            continue
+        split_line = line.split(" ")
+        score = None
+        # Space in class name is not allowed
+        if len(split_line) == 17:
+            score = float(split_line[-1])
+            split_line = split_line[:-1]
+        class_name = split_line[0]
+        bbox = [float(b) for b in split_line[4:8]]
+        bbox = topleftbottomright2topleftwh(bbox)
+        object_list.append((class_name, bbox, score))
+    if image_path is None:
+        return None, object_list
+    if image_size is None:
+        image_size = get_image_size(image_path)
+    return image_size, object_list
+
+def _parse_annotation_batch(task_batch, io_threads=0):
+    """Parse KITTI annotation files at once. Called in worker process. See 'label_reader.py' as well.
+
+    Args:
+        task_batch (list): [task of '_parse_annotation_file()', ...]
+        io_threads (int): Number of threads reading files concurrently. See 'archive.prefetch_files()' as well.
+
+    Returns:
+        list: Result of '_parse_annotation_file()' for each task
+    """
+    probe_index_list = [
+        index for index, (_, image_path, image_size) in enumerate(task_batch) if not image_path is None and image_size is None
+    ]
+    index_to_probed_size = dict(zip(
+        probe_index_list, thread_map(get_image_size, [task_batch[index][1] for index in probe_index_list], io_threads)
+    ))
+    annotation_path_list = [annotation_path for annotation_path, _, _ in task_batch]
+    # Files parsed line by line below are read from prefetched data as well
+    with prefetch_files(annotation_path_list, io_threads):
+        data_list = read_label_files(annotation_path_list)
+        file_is_valid_list, line_count_list, class_name_list, bboxes, score_list = parse_kitti_files(data_list)
+        bbox_list = topleftbottomright2topleftwh_batch(bboxes).tolist()
+        result_list = list()
+        offset = 0
+        for index, (task, is_valid, line_count) in enumerate(zip(task_batch, file_is_valid_list, line_count_list)):
+            annotation_path, image_path, image_size = task
+            if image_size is None:
+                image_size = index_to_probed_size.get(index)
+            if not is_valid:
+                result_list.append(_parse_annotation_file((annotation_path, image_path, image_size)))
+                continue
+            rows = slice(offset, offset+line_count)
+            offset += line_count
+            object_list = list(zip(class_name_list[rows], bbox_list[rows], score_list[rows]))
+            if image_path is None:
+                result_list.append((None, object_list))
+                continue
+            result_list.append((image_size, object_list))
+    return result_list
 
 class KITTIDataset(BaseDataFormat):
     """Dataset parser for KITTI
        See 'base.py' as well.
     """
-    def __init__(self, dst_path, class_txt_path, src_path) -> None:
-        super().__init__(dst_path, class_txt_path, src_path)
+    def __init__(self, dst_path, class_txt_path, src_path, **kwargs) -> None:
+        super().__init__(dst_path, class_txt_path, src_path, **kwargs)
+        self.annotation_image_list = scan_annotation_files(self.src_path, "txt")
+        # Without class list, classes are collected while parsing. See '_iter_image_records()'
+        self.class_dict_from_annotation = False
         self._parse_class_list()
-        self.mscoco_data = MSCOCODataset(dst_path, class_txt_path, "")
-        self._parse_annotation()
-        self.mscoco_data.set_data(
-            self.image_id_to_image_info,
-            self.image_id_to_annotation_list,
-            self.class_id_to_class_name,
-            self.class_name_to_class_id
-        )
 
     def _parse_class_list(self):
         def _scan_annotation_file():
-            annotation_path_list = sorted(self.src_path.glob("**/*txt"))
             appeared_class_name_list = list()
-            for annotation_path in annotation_path_list:
-                with open(annotation_path) as f:
+            for annotation_path, _ in self.annotation_image_list:
+                with open_file(annotation_path) as f:
                     lines = f.read().split('\n')
                 for line in lines:
                     if line == "":
@@ -38,63 +109,69 @@ class KITTIDataset(BaseDataFormat):
             class_name_to_sequence_class_id = {class_name: class_id for class_id, class_name in class_id_to_class_name.items()}
             return class_id_to_class_name, class_name_to_sequence_class_id
 
-        if str(self.class_txt_path) == ".":
-            self.class_id_to_class_name, self.class_name_to_class_id = _scan_annotation_file()
+        if (str(self.class_txt_path) == ".") or (not file_exists(self.class_txt_path)):
+            if self.incremental:
+                # Class list is compared with last run before parsing
+                self.class_id_to_class_name, self.class_name_to_class_id = _scan_annotation_file()
+            else:
+                self.class_dict_from_annotation = True
             return
-        if not self.class_txt_path.exists():
-            self.class_id_to_class_name, self.class_name_to_class_id = _scan_annotation_file()
-            return
-        with open(self.class_txt_path) as f:
+        with open_file(self.class_txt_path) as f:
             lines = f.read().split('\n')
         # For MSCOCO, 1-origin
         self.class_id_to_class_name = {index+1: line.replace(' ', '-') for index, line in enumerate(lines) if line != ""}
         self.class_name_to_class_id = {class_name: class_id for class_id, class_name in self.class_id_to_class_name.items()}
 
     
-    def _parse_annotation(self):
+    def _iter_image_records(self):
+        if self.class_dict_from_annotation:
+            # Class ids are assigned after all files are parsed
+            appeared_class_name_set = set()
+            named_records = self._iter_named_records(appeared_class_name_set)
+            yield from self._iter_records_assigning_class_ids(named_records, appeared_class_name_set)
+            return
+        for index, image_info, object_list in self._iter_named_records(set()):
+            annotation_list = [
+                (self.class_name_to_class_id[class_name], bbox, score) for class_name, bbox, score in object_list
+            ]
+            yield index, image_info, annotation_list
+
+    def _iter_named_records(self, appeared_class_name_set):
+        """Parse annotation files. Class names of all files, including ignored ones, are added to 'appeared_class_name_set'"""
         self.logger.info("Parsing annotation file")
-        annotation_path_list = sorted(self.src_path.glob("**/*txt"))
-        annotation_id = 1
-        for index, annotation_path in enumerate(annotation_path_list):
-            image_extension = check_image_existence(annotation_path)
-            if not image_extension:
+        task_list = list()
+        for annotation_path, image_path in self.annotation_image_list:
+            cached_image_size = None
+            if not image_path is None:
+                cached_image_size = self._lookup_image_size(image_path)
+            task_list.append((annotation_path, image_path, cached_image_size))
+        # Label files are parsed in batches
+        batch_results = parallel_map(
+            partial(_parse_annotation_batch, io_threads=self.io_threads), split_label_batches(task_list, self.workers), self.workers
+        )
+        results = (result for result_list in batch_results for result in result_list)
+        # Yield in file order so that ids are same as serial parsing
+        for index, (task, (image_size, object_list)) in enumerate(zip(task_list, results)):
+            annotation_path, image_path, cached_image_size = task
+            appeared_class_name_set.update(class_name for class_name, _, _ in object_list)
+            if image_path is None:
                 print(f"Image file corresponding to '{annotation_path}' not found. Ignored.")
                 continue
-            image_path = annotation_path.with_suffix(image_extension)
-            image = cv2.imread(str(image_path))
-            image_height, image_width = image.shape[:2]
-            self.image_id_to_image_info[index] = {
+            if image_size is None:
+                print(f"Image file '{image_path}' could not be read. Ignored.")
+                continue
+            if cached_image_size is None:
+                self._store_image_size(image_path, image_size)
+            image_width, image_height, image_channel = image_size
+            image_info = {
                 "file_name": image_path.name,
                 "file_path": str(image_path.absolute()),
                 "width": image_width,
                 "height": image_height,
+                # Optional. PascalVOC writer does not probe image
+                "channels": image_channel,
             }
-            with open(annotation_path) as f:
-                lines = f.read().split('\n')
-            for line in lines:
-                if line == "":
-                    continue
-                split_line = line.split(" ")
-                score = None
-                # Space in class name is not allowed
-                if len(split_line) == 17:
-                    score = float(split_line[-1])
-                    split_line = split_line[:-1]
-                class_name = split_line[0]
-                class_id = self.class_name_to_class_id[class_name]
-                bbox = [float(b) for b in split_line[4:8]]
-                bbox = topleftbottomright2topleftwh(bbox)
-                self.image_id_to_annotation_list[index].append({
-                    "annotation_id": annotation_id,
-                    "class_id": class_id,
-                    "bbox": bbox,
-                    "score": score,
-                })
-                annotation_id += 1
-            
-
-    def convert(self, dst_format):
-        self.mscoco_data.convert(dst_format)
+            yield index, image_info, object_list
 
     def validation_check(self):
         if not self.src_path.exists():
@@ -0,0 +1,187 @@
+"""Bulk readers of text label files (YOLO, KITTI)
+   Label files of a batch are split into tokens at once and numbers are converted by one 'np.array()' call,
+   instead of splitting each line and calling 'float()' per value. NumPy converts bytes same as 'float()'.
+   Files in other layout (e.g. double spaces, tabs, different number of tokens per line) and batches
+   with invalid numbers are marked invalid, and the caller parses them line by line, so results are always same.
+"""
+import numpy as np
+
+from .archive import open_file
+
+# Number of label files parsed at once
+LABEL_BATCH_SIZE = 256
+
+# Tokens of KITTI line with score
+KITTI_SCORE_TOKEN_COUNT = 17
+
+_NEWLINE = ord("\n")
+_SPACE = ord(" ")
+# Whitespaces of 'bytes.split()' other than space and line break
+_OTHER_WHITESPACE_LIST = [b"\t", b"\x0b", b"\x0c"]
+
+
+def split_label_batches(item_list: list, workers: int) -> list:
+    """Split items into batches of at most LABEL_BATCH_SIZE. Batches are small enough to be shared by workers
+
+    Args:
+        item_list (list): Items. e.g. parse tasks of label files
+        workers (int): Number of workers
+
+    Returns:
+        list: [[item, ...], ...]
+    """
+    batch_size = max(1, min(LABEL_BATCH_SIZE, len(item_list) // (workers * 8)))
+    return [item_list[start:start+batch_size] for start in range(0, len(item_list), batch_size)]
+
+def read_label_files(path_list: list) -> list:
+    """Read label files. Line breaks are normalized same as text mode
+
+    Args:
+        path_list (list): Label file paths or virtual paths of archive members. See 'archive.py' as well.
+
+    Returns:
+        list: Bytes of each file
+    """
+    data_list = list()
+    for path in path_list:
+        with open_file(path, "rb") as f:
+            data = f.read()
+        if b"\r" in data:
+            data = data.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+        data_list.append(data)
+    return data_list
+
+def _is_regular(data: bytes) -> bool:
+    """Whether tokens of 'bytes.split()' are same as splitting lines by space"""
+    if data.startswith(b" ") or data.endswith(b" "):
+        return False
+    if (b"  " in data) or (b" \n" in data) or (b"\n " in data):
+        return False
+    return not any(whitespace in data for whitespace in _OTHER_WHITESPACE_LIST)
+
+def _is_utf8(data: bytes) -> bool:
+    if data.isascii():
+        return True
+    try:
+        data.decode("utf-8")
+    except UnicodeDecodeError:
+        return False
+    return True
+
+def _group_files(data_list: list, min_token_count: int, max_token_count: int) -> tuple:
+    """Group regular files by number of tokens per line
+
+    Args:
+        data_list (list): Bytes of each file
+        min_token_count (int): Minimum number of tokens per line
+        max_token_count (int): Maximum number of tokens per line
+
+    Returns:
+        tuple: ({tokens per line: [file index, ...]}, [number of non-empty lines of each file, ...])
+               Empty files are grouped as 0
+    """
+    file_count = len(data_list)
+    buffer = b"\n".join(data_list) + b"\n"
+    chars = np.frombuffer(buffer, dtype=np.uint8)
+    file_starts = np.cumsum([0] + [len(data) + 1 for data in data_list[:-1]])
+    line_ends = np.flatnonzero(chars == _NEWLINE)
+    line_starts = np.concatenate([[0], line_ends[:-1] + 1])
+    is_non_empty = line_ends > line_starts
+    line_ends = line_ends[is_non_empty]
+    line_starts = line_starts[is_non_empty]
+    space_positions = np.flatnonzero(chars == _SPACE)
+    line_token_counts = np.searchsorted(space_positions, line_ends) - np.searchsorted(space_positions, line_starts) + 1
+    line_file_index = np.searchsorted(file_starts, line_starts, side="right") - 1
+    token_counts = np.zeros(file_count, dtype=np.int64)
+    # Token count of one of lines is assigned to each file, then files with other token counts are marked -1
+    token_counts[line_file_index] = line_token_counts
+    token_counts[line_file_index[line_token_counts != token_counts[line_file_index]]] = -1
+    # Files are joined by line break, so all files are regular if the buffer is
+    all_regular = _is_regular(buffer)
+    token_count_to_index_list = dict()
+    for index, token_count in enumerate(token_counts.tolist()):
+        if token_count == 0 or (
+            min_token_count <= token_count <= max_token_count and (all_regular or _is_regular(data_list[index]))
+        ):
+            token_count_to_index_list.setdefault(token_count, list()).append(index)
+    return token_count_to_index_list, np.bincount(line_file_index, minlength=file_count).tolist()
+
+def parse_yolo_files(data_list: list) -> tuple:
+    """Parse YOLO label files
+
+    Args:
+        data_list (list): Bytes of each file. See 'read_label_files()'
+
+    Returns:
+        tuple: ([whether each file is valid, ...], [line count of each file, ...],
+                [class_id, ...], (L, 4) float64 relative [center_x, center_y, width, height])
+               Lines are of valid files in file order. Invalid files should be parsed line by line
+    """
+    file_is_valid_list = [False] * len(data_list)
+    if len(data_list) == 0:
+        return file_is_valid_list, list(), list(), np.zeros((0, 4), dtype=np.float64)
+    # Lines with other than 5 tokens are parsed line by line
+    token_count_to_index_list, line_count_list = _group_files(data_list, 5, 5)
+    index_list = sorted(token_count_to_index_list.get(0, list()) + token_count_to_index_list.get(5, list()))
+    tokens = b" ".join([data_list[index] for index in index_list]).split()
+    try:
+        class_id_list = list(map(int, tokens[0::5]))
+        bboxes = np.array(tokens, dtype=np.float64).reshape(-1, 5)[:, 1:]
+    except ValueError:
+        # Invalid number in the batch
+        return file_is_valid_list, line_count_list, list(), np.zeros((0, 4), dtype=np.float64)
+    for index in index_list:
+        file_is_valid_list[index] = True
+    return file_is_valid_list, line_count_list, class_id_list, bboxes
+
+def parse_kitti_files(data_list: list) -> tuple:
+    """Parse KITTI label files
+       Only class name, bbox and score are converted, same as line by line parsing.
+
+    Args:
+        data_list (list): Bytes of each file. See 'read_label_files()'
+
+    Returns:
+        tuple: ([whether each file is valid, ...], [line count of each file, ...],
+                [class_name, ...], (L, 4) float64 [left, top, right, bottom], [score or None, ...])
+               Lines are of valid files in file order. Invalid files should be parsed line by line
+    """
+    file_is_valid_list = [False] * len(data_list)
+    if len(data_list) == 0:
+        return file_is_valid_list, list(), list(), np.zeros((0, 4), dtype=np.float64), list()
+    # Bbox is 5th-8th tokens. Score is the last token of line with 17 tokens
+    token_count_to_index_list, line_count_list = _group_files(data_list, 8, np.inf)
+    index_to_result = dict()
+    for token_count, index_list in token_count_to_index_list.items():
+        # Files are decoded as text when parsed line by line
+        index_list = [index for index in index_list if _is_utf8(data_list[index])]
+        if token_count == 0:
+            for index in index_list:
+                index_to_result[index] = (list(), np.zeros((0, 4), dtype=np.float64), list())
+            continue
+        tokens = b" ".join([data_list[index] for index in index_list]).split()
+        try:
+            class_name_list = b"\n".join(tokens[0::token_count]).decode("utf-8").split("\n")
+            bboxes = np.array([tokens[column::token_count] for column in range(4, 8)], dtype=np.float64).T
+            if token_count == KITTI_SCORE_TOKEN_COUNT:
+                score_list = np.array(tokens[token_count-1::token_count], dtype=np.float64).tolist()
+            else:
+                score_list = [None] * len(class_name_list)
+        except ValueError:
+            # Invalid number in the batch
+            continue
+        offset = 0
+        for index in index_list:
+            rows = slice(offset, offset+line_count_list[index])
+            offset += line_count_list[index]
+            index_to_result[index] = (class_name_list[rows], bboxes[rows], score_list[rows])
+    class_name_list = list()
+    bbox_list = [np.zeros((0, 4), dtype=np.float64)]
+    score_list = list()
+    for index in sorted(index_to_result):
+        file_is_valid_list[index] = True
+        class_names, bboxes, scores = index_to_result[index]
+        class_name_list.extend(class_names)
+        bbox_list.append(bboxes)
+        score_list.extend(scores)
+    return file_is_valid_list, line_count_list, class_name_list, np.concatenate(bbox_list), score_list
@@ -1,22 +1,60 @@
-from collections import defaultdict
 import datetime
+import gzip
+import io
 import json
 from pathlib import Path
-import xml.etree.ElementTree as ET
-
-import cv2
-import numpy as np
 
+from .annotation_table import AnnotationTable, AnnotationTableBuilder
+from .annotation_writer import BaseWriter
 from .base import BaseDataFormat
-from .utils import absolute2relative, calculate_area, get_rectangle_all_points, topleftwh2centerwh, topleftwh2topleftbottomright
+from .json_stream import JSONStreamReader, JSONStreamWriter
+from .registry import get_writer_class
+from .stats import get_stats
+from .utils import calculate_area
+
+# Lower than gzip default (9), which is several times slower for a few percent smaller file
+GZIP_COMPRESS_LEVEL = 6
+
+# Number of images whose encoded size is measured to estimate shard file size
+SHARD_SIZE_SAMPLE_COUNT = 1000
+
+
+# Keys of elements read from each top level array
+COCO_KEY_TO_REQUIRED_KEYS = {
+    "images": ["id", "file_name", "width", "height"],
+    "annotations": ["id", "image_id", "category_id", "bbox"],
+    "categories": ["id", "name"],
+}
+
+
+def _check_coco_dict(coco_dict):
+    """Raise ValueError if MSCOCO dict cannot be loaded. See 'MSCOCODataset.load_dict()'"""
+    if not isinstance(coco_dict, dict):
+        raise ValueError(f"MSCOCO data must be dict, not {type(coco_dict).__name__}")
+    for key, required_key_list in COCO_KEY_TO_REQUIRED_KEYS.items():
+        if not key in coco_dict:
+            raise ValueError(f"'{key}' key not found in MSCOCO data")
+        if not isinstance(coco_dict[key], list):
+            raise ValueError(f"'{key}' must be list, not {type(coco_dict[key]).__name__}")
+        for index, element in enumerate(coco_dict[key]):
+            if not isinstance(element, dict):
+                raise ValueError(f"{index}-th element of '{key}' must be dict")
+            missing_key_list = [required_key for required_key in required_key_list if not required_key in element]
+            if missing_key_list:
+                raise ValueError(f"{index}-th element of '{key}' lacks {missing_key_list}")
+            if key == "annotations" and not (isinstance(element["bbox"], (list, tuple)) and len(element["bbox"]) == 4):
+                raise ValueError(f"{index}-th element of 'annotations' must have bbox of 4 values")
+    if len(coco_dict["categories"]) == 0:
+        raise ValueError("'categories' is empty. Class information is required")
+
 
 class MSCOCODataset(BaseDataFormat):
     """Dataset parser for MSCOCO
        This class mainly takes charge of converting.
        See 'base.py' as well.
     """
-    def __init__(self, dst_path, class_txt_path, src_path="") -> None:
-        super().__init__(dst_path, class_txt_path, src_path)
+    def __init__(self, dst_path, class_txt_path, src_path="", **kwargs) -> None:
+        super().__init__(dst_path, class_txt_path, src_path, **kwargs)
         
         self.info_dict = {
             "info": {
@@ -37,6 +75,7 @@ class MSCOCODataset(BaseDataFormat):
 	            },
             ]
         }
+        self.category_list = None
         if str(self.src_path) != ".":
             self._parse_annotation()
             self._parse_class_list()
@@ -56,16 +95,12 @@ class MSCOCODataset(BaseDataFormat):
                 tmp[category_id] = category_name
                 i = category_id + 1
             return tmp
-        with open(self.src_path) as f:
-            json_content = json.load(f)
-        assert "categories" in json_content, "Class information not provided. 'Categories' key not found."
+        # Categories are collected in _parse_annotation() to read the file only once
+        assert not self.category_list is None, "Class information not provided. 'Categories' key not found."
         # TODO:
         # If classes.txt is provided, create categories from the file.
-        category_list = json_content["categories"]
         tmp = dict()
-        for category in category_list:
-            class_id = category["id"]
-            class_name = category["name"]
+        for class_id, class_name in self.category_list:
             tmp[class_id] = class_name
         id_sorted_list = sorted(tmp.items(), key=lambda x:x[0])
         # If not sequential id, index no. is used to fullfille lacked class id alternatively.
@@ -75,169 +110,94 @@ class MSCOCODataset(BaseDataFormat):
         self.class_name_to_class_id = {self.class_id_to_class_name[class_id]: idx+1 for idx, class_id, in enumerate(self.class_id_to_class_name)}
 
     def _parse_annotation(self):
+        with get_stats().measure("parse"):
+            self._parse_annotation_file()
+        get_stats().count("annotation_files")
+        get_stats().count("files_read")
+        get_stats().count("bytes_read", self.src_path.stat().st_size)
+
+    def _parse_annotation_file(self):
         self.logger.info("Parsing annotation file")
+        # Stream top level arrays element by element so that the raw JSON tree is never held
+        # See 'json_stream.py' as well.
         with open(self.src_path) as f:
-            json_content = json.load(f)
-        assert "images" in json_content, f"'images' key is not appeared in {self.src_path}"
-        assert "annotations" in json_content, f"'annotations' key is not appeared in {self.src_path}"
-        image_info_list = json_content["images"]
-        annotation_list = json_content["annotations"]
-        for image_info in image_info_list:
-            image_id = image_info["id"]
-            file_name = image_info["file_name"]
-            file_path = image_info["file_name"]
-            width = image_info["width"]
-            height = image_info["height"]
-            self.image_id_to_image_info[image_id] = {
-                "file_name": file_name,
-                "file_path": file_path,
-                "width": width,
-                "height": height,
-            }
-        for annotation in annotation_list:
-            annotation_id = annotation["id"]
-            class_id = annotation["category_id"]
-            image_id = annotation["image_id"]
-            bbox = annotation["bbox"]
-            score = None
-            if "score" in annotation:
-                score = annotation["score"]
-            self.image_id_to_annotation_list[image_id].append({
-                "annotation_id": annotation_id,
-                "class_id": class_id,
-                "bbox": bbox,
-                "score": score,
-            })
+            reader = JSONStreamReader(f)
+            appeared_key_set = self._add_items(reader.iter_items(["images", "annotations", "categories"]))
+        assert "images" in appeared_key_set, f"'images' key is not appeared in {self.src_path}"
+        assert "annotations" in appeared_key_set, f"'annotations' key is not appeared in {self.src_path}"
 
-    def _convert_to_yolo(self):
-        self.logger.info("Converting to YOLO")
-        self.dst_path.mkdir(exist_ok=True, parents=True)
-        for image_id, image_info in self.image_id_to_image_info.items():
-            image_name = image_info["file_name"]
-            annotation_path = self.dst_path / Path(image_name).with_suffix(".txt")
-            image_width = image_info["width"]
-            image_height = image_info["height"]
-            annotation_list = self.image_id_to_annotation_list[image_id]
-            with open(annotation_path, "w") as f:
-                for annotation in annotation_list:
-                    # MSCOCO "categories" in json file is not sequential
-                    original_class_id = annotation["class_id"]
-                    class_name = self.class_id_to_class_name[original_class_id]
-                    class_id = self.class_name_to_class_id[class_name]
-                    bbox = annotation["bbox"]
-                    bbox = topleftwh2centerwh(bbox)
-                    bbox = absolute2relative(bbox, image_width, image_height)
-                    bbox = [np.clip(b, 0, 1) for b in bbox]
-                    bbox = [str(round(b, 4)) for b in bbox]
-                    print(f"{class_id-1} {' '.join(bbox)}", file=f)
-        with open(self.dst_path / "classes.txt", "w") as f:
-            for _, class_name in self.class_id_to_class_name.items():
-                print(class_name, file=f)
-
-    def _convert_to_kitti(self):
-        self.logger.info("Converting to KITTI")
-        self.dst_path.mkdir(exist_ok=True, parents=True)
-        for image_id, image_info in self.image_id_to_image_info.items():
-            image_name = image_info["file_name"]
-            annotation_path = self.dst_path / Path(image_name).with_suffix(".txt")
-            image_width = image_info["width"]
-            image_height = image_info["height"]
-            annotation_list = self.image_id_to_annotation_list[image_id]
-            with open(annotation_path, "w") as f:
-                for annotation in annotation_list:
-                    # Original MSCOCO "categories" in json file is not sequential
-                    original_class_id = annotation["class_id"]
-                    class_name = self.class_id_to_class_name[original_class_id]
-                    # In case that class name includes space
-                    class_name = class_name.replace(' ', '-')
-                    bbox = annotation["bbox"]
-                    bbox = topleftwh2topleftbottomright(bbox)
-                    bbox[0] = np.clip(bbox[0], 0, image_width)
-                    bbox[1] = np.clip(bbox[1], 0, image_height)
-                    bbox[2] = np.clip(bbox[2], 0, image_width)
-                    bbox[3] = np.clip(bbox[3], 0, image_height)
-                    bbox = [str(round(b, 4)) for b in bbox]
-                    truncated = 0.0
-                    occluded = 0
-                    alpha = 0
-                    dimensions = [str(0) for _ in range(3)]
-                    location = [str(0) for _ in range(3)]
-                    rotation_y = 0
-                    score = annotation["score"]
-                    if score:
-                        print(f"{class_name} {truncated} {occluded} {alpha} {' '.join(bbox)} {' '.join(dimensions)} {' '.join(location)} {rotation_y} {score}", file=f)
-                    else:
-                        print(f"{class_name} {truncated} {occluded} {alpha} {' '.join(bbox)} {' '.join(dimensions)} {' '.join(location)} {rotation_y}", file=f)
-
-    def _convert_to_pascalVOC(self):
-        self.logger.info("Converting to PascalVOC")
-        self.dst_path.mkdir(exist_ok=True, parents=True)
-        for image_id, image_info in self.image_id_to_image_info.items():
-            image_name = image_info["file_name"]
-            image_path = image_info["file_path"]
-            annotation_path = self.dst_path / Path(image_name).with_suffix(".xml")
-            image_width = image_info["width"]
-            image_height = image_info["height"]
-            image_channel = 3
-            if Path(image_path).exists():
-                image = cv2.imread(image_path)
-                image_channel = image.shape[-1]
-            root = ET.Element('annotation')
-            folder_elem = ET.SubElement(root, 'folder')
-            filename_elem = ET.SubElement(root, 'filename')
-            path_elem = ET.SubElement(root, 'path')
-            source_elem = ET.SubElement(root, 'source')
-            size_elem = ET.SubElement(root, 'size')
-            segmented_elem = ET.SubElement(root, 'segmented')
-            folder_elem.text = "Unknown"
-            if len(Path(image_path).parts) > 1:
-                folder_elem.text = str(Path(image_path).parts[-2])
-            filename_elem.text = image_name
-            path_elem.text = image_path
-            ET.SubElement(source_elem, "database").text = "Unknown"
-            ET.SubElement(size_elem, "width").text = str(image_width)
-            ET.SubElement(size_elem, "height").text = str(image_height)
-            ET.SubElement(size_elem, "depth").text = str(image_channel)
-            segmented_elem.text = "1"
-            
-            annotation_list = self.image_id_to_annotation_list[image_id]
-            for annotation in annotation_list:
-                # MSCOCO "categories" in json file is not sequential
-                original_class_id = annotation["class_id"]
-                class_name = self.class_id_to_class_name[original_class_id]
-                bbox = annotation["bbox"]
-                bbox = topleftwh2topleftbottomright(bbox)
-                bbox[0] = np.clip(bbox[0], 0, image_width)
-                bbox[1] = np.clip(bbox[1], 0, image_height)
-                bbox[2] = np.clip(bbox[2], 0, image_width)
-                bbox[3] = np.clip(bbox[3], 0, image_height)
-                bbox = [str(int(b)) for b in bbox]
-                object_elem = ET.SubElement(root, "object")
-                ET.SubElement(object_elem, "name").text = class_name
-                ET.SubElement(object_elem, "pose").text = "Unspecified"
-                ET.SubElement(object_elem, "truncated").text = "0"
-                ET.SubElement(object_elem, "difficult").text = "0"
-                bbox_elem = ET.SubElement(object_elem, "bndbox")
-                ET.SubElement(bbox_elem, "xmin").text = bbox[0]
-                ET.SubElement(bbox_elem, "ymin").text = bbox[1]
-                ET.SubElement(bbox_elem, "xmax").text = bbox[2]
-                ET.SubElement(bbox_elem, "ymax").text = bbox[3]
-            # doc = minidom.parseString(ET.tostring(root, 'utf-8'))
-            # with open(annotation_path,'w') as f:
-            #     doc.writexml(f, encoding='utf-8', newl='\n', indent='', addindent='  ')
-            tree = ET.ElementTree(root)
-            ET.indent(tree, space='  ')
-            tree.write(str(annotation_path), xml_declaration=False)
-        
-    def dump_json(self):
-        self.logger.info("Converting to MSCOCO")
-        current_time = datetime.datetime.now()
-        current_time = current_time.strftime('%Y-%m-%d %H:%M:%S')
-        image_info_list = defaultdict(list)
-        annotation_info_list = defaultdict(list)
-        category_info_list = defaultdict(list)
-        for image_id, image_info in self.image_id_to_image_info.items():
-            appending_image_info_dict = {
+    def _add_items(self, items):
+        """Add elements of top level arrays and set 'annotation_table'
+
+        Args:
+            items (Iterable): (key, element) of 'images', 'annotations' and 'categories'
+
+        Returns:
+            set: Appeared keys
+        """
+        appeared_key_set = set()
+        self.annotation_builder = AnnotationTableBuilder()
+        for key, element in items:
+            appeared_key_set.add(key)
+            if key == "images":
+                self._add_image_info(element)
+            elif key == "annotations":
+                self._add_annotation(element)
+            elif key == "categories":
+                if self.category_list is None:
+                    self.category_list = list()
+                if isinstance(element, dict):
+                    self.category_list.append((element["id"], element["name"]))
+        self._set_annotation_table(self.annotation_builder.build())
+        self.annotation_builder = None
+        return appeared_key_set
+
+    def load_dict(self, coco_dict):
+        """Load dataset from MSCOCO dict in memory instead of 'src_path'. See 'memory.py' as well.
+
+        Args:
+            coco_dict (dict): Same structure as MSCOCO json file
+
+        Raises:
+            ValueError: If 'coco_dict' is malformed
+        """
+        _check_coco_dict(coco_dict)
+        self._add_items((key, element) for key in COCO_KEY_TO_REQUIRED_KEYS for element in coco_dict[key])
+        self._parse_class_list()
+        # Lacked ids between listed ones are filled by '_parse_class_list()'
+        for annotation in coco_dict["annotations"]:
+            if not annotation["category_id"] in self.class_id_to_class_name:
+                raise ValueError(
+                    f"Category id {annotation['category_id']} of annotation {annotation['id']} not found in 'categories'"
+                )
+
+    def _add_image_info(self, image_info):
+        image_id = image_info["id"]
+        file_name = image_info["file_name"]
+        file_path = image_info["file_name"]
+        width = image_info["width"]
+        height = image_info["height"]
+        self.image_id_to_image_info[image_id] = {
+            "file_name": file_name,
+            "file_path": file_path,
+            "width": width,
+            "height": height,
+        }
+
+    def _add_annotation(self, annotation):
+        annotation_id = annotation["id"]
+        class_id = annotation["category_id"]
+        image_id = annotation["image_id"]
+        bbox = annotation["bbox"]
+        score = None
+        if "score" in annotation:
+            score = annotation["score"]
+        self.annotation_builder.add(image_id, annotation_id, class_id, bbox, score)
+
+    def _iter_image_entries(self, image_id_list, current_time):
+        for image_id in image_id_list:
+            image_info = self.image_id_to_image_info[image_id]
+            yield {
                 "license": 100,
                 "file_name": image_info["file_name"],
                 "coco_url": image_info["file_path"],
@@ -247,11 +207,17 @@ class MSCOCODataset(BaseDataFormat):
                 "flickr_url": "",
                 "id": image_id
             }
-            image_info_list["images"].append(appending_image_info_dict)
-        for image_id, annotation_list in self.image_id_to_annotation_list.items():
-            for annotation in annotation_list:
-                bbox = annotation["bbox"]
-                score = annotation["score"]
+
+    def _iter_annotation_entries(self, image_rows_list):
+        """Yield annotation entries of '(image_id, rows of annotation table)' in 'image_rows_list'"""
+        table = self.annotation_table
+        for image_id, rows in image_rows_list:
+            for annotation_id, class_id, bbox, score in zip(
+                table.annotation_id[rows].tolist(),
+                table.class_id[rows].tolist(),
+                table.bbox_list(rows),
+                table.score[rows].tolist(),
+            ):
                 appending_annotation_info_dict = {
                     # "segmentation": get_rectangle_all_points(bbox),
                     "segmentation": [],
@@ -261,47 +227,213 @@ class MSCOCODataset(BaseDataFormat):
                     "keypoints": [],
                     "image_id": image_id,
                     "bbox": bbox,
-                    "category_id": annotation["class_id"],
-                    "id": annotation["annotation_id"],
+                    "category_id": class_id,
+                    "id": annotation_id,
                     "caption": "hoge hoge"
                 }
-                if score:
+                # NaN means score is not provided
+                if score and score == score:
                     appending_annotation_info_dict["score"] = score
-                annotation_info_list["annotations"].append(appending_annotation_info_dict)
+                yield appending_annotation_info_dict
+
+    def _iter_category_entries(self):
         for category_id, category_name in self.class_id_to_class_name.items():
-            category_dict = {
+            yield {
                 "supercategory": "Unspecified",
                 "id": category_id,
                 "name": category_name,
                 "keypoints": [],
                 "skeleton": [],
             }
-            category_info_list["categories"].append(category_dict)
-        annotation_dict = dict()
-        annotation_dict.update(self.info_dict)
-        annotation_dict.update(self.license)
-        annotation_dict.update(image_info_list)
-        annotation_dict.update(annotation_info_list)
-        annotation_dict.update(category_info_list)
-        if self.dst_path.suffix != ".json":
-            self.dst_path = self.dst_path / "annotation.json"
-        self.dst_path.parent.mkdir(exist_ok=True, parents=True)
-        with open(self.dst_path, "w") as f:
-            json.dump(annotation_dict, f, indent=4)
 
-    def convert(self, format):
-        if format == "yolo":
-            self._convert_to_yolo()
-            return
-        elif format == "kitti":
-            self._convert_to_kitti()
+    def _write_json(self, f, image_entries, annotation_entries):
+        # Images and annotations are encoded and written one by one. See 'json_stream.py' as well.
+        writer = JSONStreamWriter(f, indent=None if self.compact_json else 4)
+        writer.begin()
+        writer.write_item("info", self.info_dict["info"])
+        writer.write_item("licenses", self.license["licenses"])
+        writer.write_array("images", image_entries)
+        writer.write_array("annotations", annotation_entries)
+        writer.write_array("categories", self._iter_category_entries())
+        writer.end()
+
+    def _write_json_file(self, dst_path, image_entries, annotation_entries):
+        with self._open_json_output(dst_path) as f:
+            self._write_json(f, image_entries, annotation_entries)
+        get_stats().count("files_written")
+        get_stats().count("bytes_written", dst_path.stat().st_size)
+
+    def to_dict(self):
+        """Get dataset as MSCOCO dict. Same contents as json file written by 'dump_json()' without shards"""
+        current_time = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        return {
+            "info": self.info_dict["info"],
+            "licenses": self.license["licenses"],
+            "images": list(self._iter_image_entries(self.image_id_to_image_info, current_time)),
+            "annotations": list(self._iter_annotation_entries(self.annotation_table.iter_images())),
+            "categories": list(self._iter_category_entries()),
+        }
+
+    def dump_json(self):
+        self.logger.info("Converting to MSCOCO")
+        current_time = datetime.datetime.now()
+        current_time = current_time.strftime('%Y-%m-%d %H:%M:%S')
+        if self.json_shard_images > 0 or self.json_shard_size > 0:
+            self._dump_json_shards(current_time)
             return
-        elif format == "pascalvoc":
-            self._convert_to_pascalVOC()
+        self.dst_path = self._get_json_output_path()
+        self.dst_path.parent.mkdir(exist_ok=True, parents=True)
+        self._write_json_file(
+            self.dst_path,
+            self._iter_image_entries(self.image_id_to_image_info, current_time),
+            self._iter_annotation_entries(self.annotation_table.iter_images()),
+        )
+
+    def _encode_entries(self, entry_list):
+        """Encode array elements same as '_write_json_file()'"""
+        f = io.StringIO()
+        writer = JSONStreamWriter(f, indent=None if self.compact_json else 4)
+        writer.write_array("", entry_list)
+        return f.getvalue().encode("utf-8")
+
+    def _get_output_size(self, data):
+        """Get size of encoded json in output file. Compressed size if output is gzip"""
+        if self._get_json_output_path().suffix == ".gz":
+            return len(gzip.compress(data, compresslevel=GZIP_COMPRESS_LEVEL))
+        return len(data)
+
+    def _split_shards(self, current_time):
+        """Split image ids into shards by 'json_shard_images' and 'json_shard_size'.
+           File size is estimated from encoded size of the first SHARD_SIZE_SAMPLE_COUNT images and their annotations.
+           For gzip output, sizes are scaled by compression ratio of the samples.
+
+        Returns:
+            list: [[image_id, ...], ...]
+        """
+        image_id_list = list(self.image_id_to_image_info)
+        annotation_counts = [self.annotation_table.rows(image_id) for image_id in image_id_list]
+        annotation_counts = [rows.stop - rows.start for rows in annotation_counts]
+        image_bytes = 0
+        annotation_bytes = 0
+        # info, licenses, categories and brackets
+        f = io.StringIO()
+        self._write_json(f, [], [])
+        header_bytes = self._get_output_size(f.getvalue().encode("utf-8"))
+        if self.json_shard_size > 0 and len(image_id_list) > 0:
+            sample_id_list = image_id_list[:SHARD_SIZE_SAMPLE_COUNT]
+            image_data = self._encode_entries(list(self._iter_image_entries(sample_id_list, current_time)))
+            annotation_entry_list = list(self._iter_annotation_entries(
+                (image_id, self.annotation_table.rows(image_id)) for image_id in sample_id_list
+            ))
+            annotation_data = self._encode_entries(annotation_entry_list)
+            # Images and annotations are compressed together, so one ratio is applied to both
+            compression_ratio = self._get_output_size(image_data + annotation_data) / len(image_data + annotation_data)
+            image_bytes = len(image_data) * compression_ratio / len(sample_id_list)
+            if len(annotation_entry_list) > 0:
+                annotation_bytes = len(annotation_data) * compression_ratio / len(annotation_entry_list)
+        shard_list = list()
+        image_id_shard = list()
+        shard_bytes = header_bytes
+        for image_id, annotation_count in zip(image_id_list, annotation_counts):
+            entry_bytes = image_bytes + annotation_count * annotation_bytes
+            if len(image_id_shard) > 0:
+                full = self.json_shard_images > 0 and len(image_id_shard) >= self.json_shard_images
+                full |= self.json_shard_size > 0 and shard_bytes + entry_bytes > self.json_shard_size
+                if full:
+                    shard_list.append(image_id_shard)
+                    image_id_shard = list()
+                    shard_bytes = header_bytes
+            image_id_shard.append(image_id)
+            shard_bytes += entry_bytes
+        shard_list.append(image_id_shard)
+        return shard_list
+
+    def _dump_json_shards(self, current_time):
+        """Write images and their annotations into several json files with same categories,
+           and index file listing them. Shards are written one by one.
+        """
+        index_path = self._get_shard_index_path()
+        index_path.parent.mkdir(exist_ok=True, parents=True)
+        shard_list = self._split_shards(current_time)
+        # Annotations of images not in 'images' are written in the last shard
+        unknown_image_id_list = [
+            image_id for image_id, _ in self.annotation_table.iter_images() if not image_id in self.image_id_to_image_info
+        ]
+        json_path = self._get_json_output_path()
+        stem = json_path.name[:-len(".json.gz")] if json_path.suffix == ".gz" else json_path.stem
+        suffix = json_path.name[len(stem):]
+        shard_info_list = list()
+        for shard_index, image_id_shard in enumerate(shard_list):
+            if shard_index == len(shard_list) - 1:
+                image_id_shard = image_id_shard + unknown_image_id_list
+            image_rows_list = [(image_id, self.annotation_table.rows(image_id)) for image_id in image_id_shard]
+            shard_path = json_path.with_name(f"{stem}-{shard_index:05d}-of-{len(shard_list):05d}{suffix}")
+            self._write_json_file(
+                shard_path,
+                self._iter_image_entries([image_id for image_id in image_id_shard if image_id in self.image_id_to_image_info], current_time),
+                self._iter_annotation_entries(image_rows_list),
+            )
+            shard_info_list.append({
+                "file_name": shard_path.name,
+                "num_images": sum(image_id in self.image_id_to_image_info for image_id in image_id_shard),
+                "num_annotations": sum(rows.stop - rows.start for _, rows in image_rows_list),
+            })
+        self._remove_old_shards(index_path, [shard_info["file_name"] for shard_info in shard_info_list])
+        with open(index_path, "w") as f:
+            json.dump({
+                "num_images": sum(shard_info["num_images"] for shard_info in shard_info_list),
+                "num_annotations": sum(shard_info["num_annotations"] for shard_info in shard_info_list),
+                "num_categories": len(self.class_id_to_class_name),
+                "shards": shard_info_list,
+            }, f, indent=4)
+        self.dst_path = index_path
+        self.logger.info(f"{len(shard_info_list)} shards are listed in '{index_path}'")
+
+    def _remove_old_shards(self, index_path, shard_name_list):
+        """Remove shards listed in index file of last run and not written this time"""
+        if not index_path.exists():
             return
-        elif format == "coco":
-            self.dump_json()
+        try:
+            with open(index_path) as f:
+                old_shard_name_list = [shard_info["file_name"] for shard_info in json.load(f)["shards"]]
+        except (OSError, ValueError, KeyError, TypeError):
             return
+        for shard_name in old_shard_name_list:
+            shard_path = index_path.with_name(Path(shard_name).name)
+            if not shard_name in shard_name_list and shard_path.exists():
+                shard_path.unlink()
+
+    def _get_shard_index_path(self):
+        """Get index file path of shards. e.g. 'annotation.index.json' for 'annotation.json'"""
+        json_path = self._get_json_output_path()
+        stem = json_path.name[:-len(".json.gz")] if json_path.suffix == ".gz" else json_path.stem
+        return json_path.with_name(f"{stem}.index.json")
+
+    def _get_json_output_path(self):
+        """Get output file path. If 'dst_path' is not json file, 'annotation.json' in the dir is used"""
+        dst_path = self.dst_path
+        if dst_path.suffix == ".gz" and Path(dst_path.stem).suffix == ".json":
+            return dst_path
+        if dst_path.suffix != ".json":
+            dst_path = dst_path / "annotation.json"
+        if self.gzip_json:
+            dst_path = dst_path.with_name(dst_path.name + ".gz")
+        return dst_path
+
+    def _open_json_output(self, dst_path):
+        if dst_path.suffix == ".gz":
+            return gzip.open(dst_path, "wt", compresslevel=GZIP_COMPRESS_LEVEL)
+        return open(dst_path, "w")
+
+    def convert(self, format):
+        """Convert to 'format'. Whole dataset is passed to the writer at once. See 'registry.py' as well."""
+        writer_class = get_writer_class(format)
+        writer = writer_class(self.dst_path, self.class_id_to_class_name, self.class_name_to_class_id, **self._get_dataset_options())
+        if self.incremental:
+            self.logger.warning("Incremental conversion is not supported for MSCOCO source. All data is converted")
+        get_stats().count("images", len(self.image_id_to_image_info))
+        get_stats().count("boxes", len(self.annotation_table))
+        self.write_error_list = writer.write_table(self.image_id_to_image_info, self.annotation_table)
 
     def validation_check(self):
         # assert self.src_path.exists(), f"File/Dir path '{self.src_path}' not found"
@@ -320,7 +452,75 @@ class MSCOCODataset(BaseDataFormat):
                  class_id_to_class_name,
                  class_name_to_class_id,
                  ):
+        """Set dataset to be converted
+
+        Args:
+            image_id_to_image_info (dict): See 'base.py' as well.
+            image_id_to_annotation_list (AnnotationTable | dict): AnnotationTable or
+                                                                  dict form {image_id: [annotation dict, ...]}
+            class_id_to_class_name (dict): Class id to class name
+            class_name_to_class_id (dict): Class name to class id
+        """
         self.image_id_to_image_info = image_id_to_image_info
-        self.image_id_to_annotation_list = image_id_to_annotation_list
+        annotation_table = image_id_to_annotation_list
+        if not isinstance(annotation_table, AnnotationTable):
+            annotation_table = AnnotationTable.from_annotation_lists(image_id_to_annotation_list)
+        self._set_annotation_table(annotation_table)
         self.class_id_to_class_name = class_id_to_class_name
-        self.class_name_to_class_id = class_name_to_class_id
\ No newline at end of file
+        self.class_name_to_class_id = class_name_to_class_id
+
+
+class MSCOCOWriter(BaseWriter):
+    """Writer for MSCOCO
+       All records are collected into AnnotationTable, since images and annotations are
+       written in separate arrays of one json file. See 'MSCOCODataset.dump_json()' as well.
+    """
+    def __init__(self, dst_path, class_id_to_class_name, class_name_to_class_id, **kwargs) -> None:
+        super().__init__(dst_path, class_id_to_class_name, class_name_to_class_id, **kwargs)
+        self.dataset_options = kwargs
+
+    def get_output_path(self, image_info):
+        # All images are written in one json file or shards listed in index file
+        mscoco_data = MSCOCODataset(self.dst_path, "", "", **self.dataset_options)
+        if mscoco_data.json_shard_images > 0 or mscoco_data.json_shard_size > 0:
+            return mscoco_data._get_shard_index_path()
+        return mscoco_data._get_json_output_path()
+
+    def write_records(self, records):
+        return self.write_table(*self.collect_records(records))
+
+    def collect_records(self, records):
+        """Collect records with annotation ids in record order
+
+        Args:
+            records (Iterable): (image_id, image_info, [(class_id, bbox, score or None), ...]) for each image
+
+        Returns:
+            tuple: (image_id_to_image_info, AnnotationTable)
+        """
+        image_id_to_image_info = dict()
+        annotation_id = 1
+        annotation_builder = AnnotationTableBuilder()
+        for image_id, image_info, annotation_list in records:
+            image_id_to_image_info[image_id] = image_info
+            for class_id, bbox, score in annotation_list:
+                annotation_builder.add(image_id, annotation_id, class_id, bbox, score)
+                annotation_id += 1
+        return image_id_to_image_info, annotation_builder.build()
+
+    def create_dataset(self, image_id_to_image_info, annotation_table):
+        """Create MSCOCODataset of the records to be written. See 'MSCOCODataset.set_data()' as well."""
+        mscoco_data = MSCOCODataset(self.dst_path, "", "", **self.dataset_options)
+        mscoco_data.set_data(
+            image_id_to_image_info,
+            annotation_table,
+            self.class_id_to_class_name,
+            self.class_name_to_class_id
+        )
+        return mscoco_data
+
+    def write_table(self, image_id_to_image_info, annotation_table):
+        mscoco_data = self.create_dataset(image_id_to_image_info, annotation_table)
+        with get_stats().measure("write"):
+            mscoco_data.dump_json()
+        return list()
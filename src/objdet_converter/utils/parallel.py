@@ -0,0 +1,179 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+import os
+from typing import Callable, Iterable, Iterator, Union
+
+from .stats import get_stats, reset_stats
+
+# Max number of submitted but not finished jobs per worker in 'run_bounded'
+PENDING_JOBS_PER_WORKER = 4
+
+# Pool types of 'run_bounded'
+WRITER_POOL_LIST = ["thread", "process"]
+
+
+def get_worker_count(workers: int) -> int:
+    """Resolve worker count. 0 or negative means all CPU cores
+
+    Args:
+        workers (int): Requested worker count
+
+    Returns:
+        int: Worker count (>= 1)
+    """
+    if workers is None:
+        return 1
+    workers = int(workers)
+    if workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+def _init_map_worker(path_to_archive: dict) -> None:
+    # Imported here, since 'archive.py' uses 'thread_map()' of this module
+    from .archive import add_shared_archives
+    add_shared_archives(path_to_archive)
+
+def _map_chunk(func: Callable, chunk: list) -> tuple:
+    # Stats of the chunk are sent back with results. See 'stats.py' as well.
+    stats = reset_stats()
+    result_list = [func(item) for item in chunk]
+    return result_list, stats.as_dict()
+
+def _merge_chunk_result(chunk_result: tuple) -> list:
+    result_list, stats_dict = chunk_result
+    get_stats().merge(stats_dict)
+    return result_list
+
+def parallel_map(func: Callable, item_list: list, workers: int = 1) -> Iterator:
+    """Apply function to each item and yield results in the same order as 'item_list'.
+       When 'workers' > 1, items are sharded across a process pool.
+       At most 'workers' * PENDING_JOBS_PER_WORKER chunks are submitted ahead of the consumer,
+       so results are not piled up when the consumer is slower than workers.
+       'func' and items must be picklable (module level function, plain data).
+       Tar archives loaded in current process are passed to workers once, so that workers started by
+       spawn/forkserver do not load them again. They are inherited without copy under fork.
+
+    Args:
+        func (Callable): Function called with one item
+        item_list (list): Items to be processed
+        workers (int): Number of worker processes. 1 means serial in current process
+
+    Yields:
+        Any: Return value of 'func' for each item
+    """
+    if workers <= 1 or len(item_list) <= 1:
+        for item in item_list:
+            yield func(item)
+        return
+    # Several chunks per worker to balance load between small and large files
+    chunksize = max(1, len(item_list) // (workers * 8))
+    max_pending = workers * PENDING_JOBS_PER_WORKER
+    pending_futures = deque()
+    from .archive import get_shared_archives
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_map_worker, initargs=(get_shared_archives(),)) as executor:
+        for start in range(0, len(item_list), chunksize):
+            if len(pending_futures) >= max_pending:
+                yield from _merge_chunk_result(pending_futures.popleft().result())
+            pending_futures.append(executor.submit(_map_chunk, func, item_list[start:start+chunksize]))
+        while pending_futures:
+            yield from _merge_chunk_result(pending_futures.popleft().result())
+
+# Thread pool of 'thread_map()' and (process id, number of threads) it was created for
+_io_executor = None
+_io_executor_key = None
+
+def thread_map(func: Callable, item_list: list, threads: int = 1) -> list:
+    """Apply function to each item in a thread pool and return results in the same order as 'item_list'.
+       Used for file I/O on high-latency filesystems (e.g. NFS, FUSE mounted object storage),
+       where each open/read waits for the network rather than CPU, so many requests are kept in flight.
+       Pool is created once per process, including worker processes of 'parallel_map()'.
+
+    Args:
+        func (Callable): Function called with one item
+        item_list (list): Items to be processed
+        threads (int): Number of threads. 1 or less means serial in current thread
+
+    Returns:
+        list: Return value of 'func' for each item
+    """
+    global _io_executor, _io_executor_key
+    if threads <= 1 or len(item_list) <= 1:
+        return [func(item) for item in item_list]
+    # Threads of parent process do not exist after fork
+    executor_key = (os.getpid(), threads)
+    if _io_executor_key != executor_key:
+        _io_executor = ThreadPoolExecutor(max_workers=threads)
+        _io_executor_key = executor_key
+    return list(_io_executor.map(func, item_list))
+
+# Shared read-only data for 'run_bounded' jobs in worker process. Set by pool initializer.
+_worker_context = None
+
+def _init_worker_context(context):
+    global _worker_context
+    _worker_context = context
+
+def _call_with_worker_context(func, job):
+    stats = reset_stats()
+    func(job, _worker_context)
+    return stats.as_dict()
+
+def _run_job(func, job, context) -> Union[None, str]:
+    try:
+        func(job, context)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+def run_bounded(func: Callable, jobs: Iterable, workers: int = 1, pool: str = "thread", context=None) -> list:
+    """Run 'func(job, context)' for each job with bounded number of pending jobs.
+       Jobs are consumed lazily from 'jobs', so at most 'workers' * PENDING_JOBS_PER_WORKER
+       jobs are held in memory. An exception raised by a job is collected instead of aborting.
+
+    Args:
+        func (Callable): Function called with (job, context). Job's first item must be its key (e.g. output path)
+        jobs (Iterable): Jobs to be processed
+        workers (int): Number of workers. 1 means serial in current thread
+        pool (str): 'thread' or 'process'
+        context (Any): Read-only data shared by all jobs. Sent once per worker process.
+
+    Returns:
+        list: [(job key, error message), ...] sorted by job key
+    """
+    error_list = list()
+    if workers <= 1:
+        for job in jobs:
+            error = _run_job(func, job, context)
+            if error is not None:
+                error_list.append((job[0], error))
+        return sorted(error_list, key=lambda x: str(x[0]))
+    if pool == "process":
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker_context, initargs=(context,))
+        submit = lambda job: executor.submit(_call_with_worker_context, func, job)
+    elif pool == "thread":
+        executor = ThreadPoolExecutor(max_workers=workers)
+        submit = lambda job: executor.submit(func, job, context)
+    else:
+        raise ValueError(f"Unknown pool type '{pool}'. Choose from {WRITER_POOL_LIST}")
+    max_pending = workers * PENDING_JOBS_PER_WORKER
+    future_to_key = dict()
+
+    def collect(done_futures):
+        for future in done_futures:
+            key = future_to_key.pop(future)
+            error = future.exception()
+            if error is not None:
+                error_list.append((key, f"{type(error).__name__}: {error}"))
+            elif not future.result() is None:
+                # Stats of writer process
+                get_stats().merge(future.result())
+
+    with executor:
+        for job in jobs:
+            if len(future_to_key) >= max_pending:
+                done_futures, _ = wait(future_to_key, return_when=FIRST_COMPLETED)
+                collect(done_futures)
+            future_to_key[submit(job)] = job[0]
+        done_futures, _ = wait(future_to_key)
+        collect(done_futures)
+    return sorted(error_list, key=lambda x: str(x[0]))
@@ -1,144 +1,125 @@
-from pathlib import Path
-import xml.etree.ElementTree as ET
-
-import cv2
+from functools import partial
 
+from .archive import file_exists, open_file, prefetch_files, scan_annotation_files
 from .base import BaseDataFormat
-from .mscoco import MSCOCODataset
-from .utils import check_image_existence, topleftbottomright2topleftwh
+from .label_reader import split_label_batches
+from .parallel import parallel_map
+from .utils import topleftbottomright2topleftwh
+from .voc_parser import get_voc_parser, lxml_etree
+
+
+def _parse_annotation_file(task):
+    """Parse one PascalVOC annotation file. Called in worker process.
+
+    Args:
+        task (tuple): (annotation_path, image_path found next to annotation file or None, parser name)
+                      See 'voc_parser.py' as well.
+
+    Returns:
+        tuple: (image_path, width or None, height or None, [(class_name, bbox), ...], [message, ...], {class_name, ...})
+               bbox is absolute [left, top, width, height]
+               Class names of objects without bbox are included in the set as well
+    """
+    annotation_path, found_image_path, parser_name = task
+    parse_func = get_voc_parser(parser_name)
+    image_path, image_width, image_height, object_list, message_list, class_name_set = parse_func(annotation_path, found_image_path)
+    object_list = [(class_name, topleftbottomright2topleftwh(bbox)) for class_name, bbox in object_list]
+    return image_path, image_width, image_height, object_list, message_list, class_name_set
+
+def _parse_annotation_batch(task_batch, io_threads=0):
+    """Parse PascalVOC annotation files of a batch. Called in worker process.
+
+    Args:
+        task_batch (list): [task of '_parse_annotation_file()', ...]
+        io_threads (int): Number of threads reading files concurrently. See 'archive.prefetch_files()' as well.
+
+    Returns:
+        list: Result of '_parse_annotation_file()' for each task
+    """
+    with prefetch_files([annotation_path for annotation_path, _, _ in task_batch], io_threads):
+        return [_parse_annotation_file(task) for task in task_batch]
 
 class PascalVOCDataset(BaseDataFormat):
     """Dataset parser for PascalVOC
        See 'base.py' as well.
     """
-    def __init__(self, dst_path, class_txt_path, src_path) -> None:
-        super().__init__(dst_path, class_txt_path, src_path)
+    def __init__(self, dst_path, class_txt_path, src_path, **kwargs) -> None:
+        super().__init__(dst_path, class_txt_path, src_path, **kwargs)
+        self.annotation_image_list = scan_annotation_files(self.src_path, "xml")
+        if self.voc_parser == "lxml" and lxml_etree is None:
+            self.logger.warning("lxml is not installed. ElementTree is used to parse annotation files")
+        # Without class list, classes are collected while parsing. See '_iter_image_records()'
+        self.class_dict_from_annotation = False
         self._parse_class_list()
-        self._parse_annotation()
-        self.mscooc_data = MSCOCODataset(dst_path, class_txt_path, "")
-        self.mscooc_data.set_data(
-            self.image_id_to_image_info,
-            self.image_id_to_annotation_list,
-            self.class_id_to_class_name,
-            self.class_name_to_class_id
-        )
 
     def _parse_class_list(self):
         def scan_annotation_file():
-            annotation_path_list = sorted(self.src_path.glob("**/*xml"))
-            tmp_class_name_list = list()
-            for annotation_path in annotation_path_list:
-                tree = ET.parse(annotation_path)
-                root = tree.getroot()
-                for obj in root.iter("object"):
-                    class_name_info = obj.find("name")
-                    if class_name_info is None:
-                        continue
-                    class_name = class_name_info.text
-                    tmp_class_name_list.append(class_name)
-            class_name_to_id = {class_name: index+1 for index, class_name in enumerate(sorted(set(tmp_class_name_list)))}
+            parse_func = get_voc_parser(self.voc_parser)
+            tmp_class_name_set = set()
+            for annotation_path, found_image_path in self.annotation_image_list:
+                tmp_class_name_set.update(parse_func(annotation_path, found_image_path)[5])
+            class_name_to_id = {class_name: index+1 for index, class_name in enumerate(sorted(tmp_class_name_set))}
             id_to_class_name = {index: class_name for class_name, index in class_name_to_id.items()}
             return class_name_to_id, id_to_class_name
-        if str(self.class_txt_path) == ".":
-            self.class_name_to_class_id, self.class_id_to_class_name = scan_annotation_file()
-            return
-        if not self.class_txt_path.exists():
-            self.class_name_to_class_id, self.class_id_to_class_name = scan_annotation_file()
+        if (str(self.class_txt_path) == ".") or (not file_exists(self.class_txt_path)):
+            if self.incremental:
+                # Class list is compared with last run before parsing
+                self.class_name_to_class_id, self.class_id_to_class_name = scan_annotation_file()
+            else:
+                self.class_dict_from_annotation = True
             return
-        with open(self.class_txt_path) as f:
+        with open_file(self.class_txt_path) as f:
             lines = f.read().split('\n')
         # For MSCOCO, 1-origin
         self.class_id_to_class_name = {index+1: line for index, line in enumerate(lines) if line != ""}
         self.class_name_to_class_id = {class_name: class_id for class_id, class_name in self.class_id_to_class_name.items()}
 
     
-    def _parse_annotation(self):
-        self.logger.info("Parsing annotation file")
-        annotation_path_list = sorted(self.src_path.glob("**/*xml"))
-        annotation_id = 1
-        for index, annotation_path in enumerate(annotation_path_list):
-            tree = ET.parse(annotation_path)
-            root = tree.getroot()
+    def _iter_image_records(self):
+        if self.class_dict_from_annotation:
+            # Class ids are assigned after all files are parsed
+            appeared_class_name_set = set()
+            named_records = self._iter_named_records(appeared_class_name_set)
+            yield from self._iter_records_assigning_class_ids(named_records, appeared_class_name_set)
+            return
+        for index, image_info, object_list in self._iter_named_records(set()):
+            annotation_list = [
+                (self.class_name_to_class_id[class_name], bbox, score) for class_name, bbox, score in object_list
+            ]
+            yield index, image_info, annotation_list
 
-            file_name = root.find("filename")
-            if not file_name is None:
-                image_path = Path(file_name.text)
-            else:
-                image_path = Path(annotation_path.stem)
-                image_extension = check_image_existence(annotation_path)
-                if image_extension:
-                    image_path = annotation_path.with_suffix(image_extension)
-            
-            image_info = root.find("size")
-            image_width = None
-            image_height = None
-            if image_info:
-                width_info = image_info.find("width")
-                height_info = image_info.find("height")
-                if not width_info is None:
-                    image_width = int(width_info.text)
-                if not width_info is None:
-                    image_height = int(height_info.text)
-            if image_width is None:
-                if image_path.exists():
-                    image = cv2.imread(str(image_path))
-                    image_height, image_width = image.shape[:2]
-            if image_height is None:
-                if image_path.exists():
-                    image = cv2.imread(str(image_path))
-                    image_height, image_width = image.shape[:2]
+    def _iter_named_records(self, appeared_class_name_set):
+        """Parse annotation files. Class names of all files, including ignored ones, are added to 'appeared_class_name_set'"""
+        self.logger.info("Parsing annotation file")
+        task_list = [
+            (annotation_path, found_image_path, self.voc_parser) for annotation_path, found_image_path in self.annotation_image_list
+        ]
+        # Files are parsed in batches, so that files of a batch are read concurrently
+        batch_results = parallel_map(
+            partial(_parse_annotation_batch, io_threads=self.io_threads), split_label_batches(task_list, self.workers), self.workers
+        )
+        results = (result for result_list in batch_results for result in result_list)
+        # Yield in file order so that ids are same as serial parsing
+        for index, ((annotation_path, _), result) in enumerate(zip(self.annotation_image_list, results)):
+            image_path, image_width, image_height, object_list, message_list, class_name_set = result
+            appeared_class_name_set.update(class_name_set)
+            if (image_width is None) or (image_height is None):
+                if file_exists(image_path):
+                    image_size = self._get_image_size(image_path)
+                    if image_size is not None:
+                        image_width, image_height, _ = image_size
             if (image_width is None) or (image_height is None):
                 print(f"Image size not specified in {annotation_path}, Ignored")
                 continue
-            self.image_id_to_image_info[index] = {
+            image_info = {
                 "file_name": image_path.name,
                 "file_path": str(image_path),
                 "width": image_width,
                 "height": image_height,
             }
-            for i, obj in enumerate(root.iter("object")):
-                class_name_info = obj.find("name")
-                bbox_info = obj.find("bndbox")
-                if class_name_info is None:
-                    print(f"Class name not found in '{annotation_path}' {i}-th object")
-                    continue
-                if bbox_info is None:
-                    print(f"Bbox info not found in '{annotation_path}' {i}-th object")
-                    continue
-                class_name = class_name_info.text
-                xmin_info = bbox_info.find("xmin")
-                ymin_info = bbox_info.find("ymin")
-                xmax_info = bbox_info.find("xmax")
-                ymax_info = bbox_info.find("ymax")
-                if xmin_info is None:
-                    print(f"Tag xmin not found in '{annotation_path} {i}-th object")
-                    continue
-                if ymin_info is None:
-                    print(f"Tag ymin not found in '{annotation_path} {i}-th object")
-                    continue
-                if xmax_info is None:
-                    print(f"Tag xmax not found in '{annotation_path} {i}-th object")
-                    continue
-                if ymax_info is None:
-                    print(f"Tag ymax not found in '{annotation_path} {i}-th object")
-                    continue
-                xmin = int(xmin_info.text)
-                ymin = int(ymin_info.text)
-                xmax = int(xmax_info.text)
-                ymax = int(ymax_info.text)
-                bbox = [xmin, ymin, xmax, ymax]
-                class_id = self.class_name_to_class_id[class_name]
-                bbox = topleftbottomright2topleftwh(bbox)
-                self.image_id_to_annotation_list[index].append({
-                    "annotation_id": annotation_id,
-                    "class_id": class_id,
-                    "bbox": bbox,
-                    "score": None,
-                })
-                annotation_id += 1
-
-    def convert(self, dst_format):
-        self.mscooc_data.convert(dst_format)
+            for message in message_list:
+                print(message)
+            yield index, image_info, [(class_name, bbox, None) for class_name, bbox in object_list]
 
     def validation_check(self):
         if not self.src_path.exists():
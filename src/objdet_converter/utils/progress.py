@@ -0,0 +1,121 @@
+"""Progress reporting
+   Readers and writers report items processed in each stage to a ProgressReporter passed as 'progress' option.
+   Updates are counted in the main process: records parsed by worker processes are counted when they are
+   received, and output files when their jobs are handed to writers. So no message is sent between processes.
+   The callback is called at most once per 'interval' seconds and when a stage finishes,
+   so updating per item costs only an addition and a clock read.
+   Stages:
+       parse: Annotation files parsed. Total is number of annotation files. Files skipped by the reader
+              (e.g. image not found) are counted as done by position of the next record
+       write: Output files of formats with one file per image. Total is unknown while records are streamed
+   Stages of a streamed conversion run at the same time, so their updates are interleaved.
+"""
+import sys
+import time
+from typing import Callable, Iterable, Iterator, Union
+
+
+class ProgressReporter:
+    """Rate-limited progress reporter
+
+    Args:
+        callback (None | Callable): Called with dict {"stage": str, "done": int, "total": None or int,
+                                    "elapsed": seconds, "rate": items per second, "eta": None or seconds,
+                                    "finished": bool}. Progress is not tracked if None
+        interval (float): Minimum seconds between calls of 'callback'
+    """
+    def __init__(self, callback: Union[None, Callable] = None, interval: float = 1.0) -> None:
+        self.callback = callback
+        self.interval = interval
+
+    def track(self, items: Iterable, stage: str, total: Union[None, int] = None,
+              get_position: Union[None, Callable] = None) -> Iterable:
+        """Report progress while items are consumed
+
+        Args:
+            items (Iterable): Items of the stage. e.g. per-image records
+            stage (str): Stage name
+            total (None | int): Number of inputs if known
+            get_position (None | Callable): Get number of inputs consumed until the item, for items which skip
+                                            some inputs. e.g. 'lambda record: record[0] + 1' for records whose
+                                            image id is index of annotation file. Items are counted if None
+
+        Returns:
+            Iterable: Same items
+        """
+        if self.callback is None:
+            return items
+        return self._track(items, stage, total, get_position)
+
+    def _track(self, items: Iterable, stage: str, total: Union[None, int], get_position: Union[None, Callable]) -> Iterator:
+        start = time.perf_counter()
+        next_time = start + self.interval
+        done = 0
+        for item in items:
+            yield item
+            done = done + 1 if get_position is None else get_position(item)
+            now = time.perf_counter()
+            if now >= next_time:
+                next_time = now + self.interval
+                self._report(stage, done, total, now - start, False)
+        if not total is None:
+            # All inputs are consumed, including ones skipped after the last item
+            done = total
+        self._report(stage, done, total, time.perf_counter() - start, True)
+
+    def _report(self, stage: str, done: int, total: Union[None, int], elapsed: float, finished: bool) -> None:
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if not total is None and rate > 0:
+            eta = max(total - done, 0) / rate
+        self.callback({
+            "stage": stage,
+            "done": done,
+            "total": total,
+            "elapsed": elapsed,
+            "rate": rate,
+            "eta": eta,
+            "finished": finished,
+        })
+
+
+def _format_seconds(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+class ProgressPrinter:
+    """Callback of ProgressReporter printing progress into one updating line. Used by CLI
+       Unfinished stages share the line, and each stage is left in its own line when it finishes.
+
+    Args:
+        file (IO): Output stream
+    """
+    def __init__(self, file=sys.stderr) -> None:
+        self.file = file
+        # {stage: text} of unfinished stages in start order
+        self.stage_to_text = dict()
+
+    def __call__(self, progress: dict) -> None:
+        text = self._format(progress)
+        if progress["finished"]:
+            self.stage_to_text.pop(progress["stage"], None)
+            print(f"\r{text}\033[K", file=self.file)
+        else:
+            self.stage_to_text[progress["stage"]] = text
+        if self.stage_to_text:
+            print(f"\r{' | '.join(self.stage_to_text.values())}\033[K", end="", file=self.file)
+        self.file.flush()
+
+    def _format(self, progress: dict) -> str:
+        if progress["total"] is None:
+            text = f"[{progress['stage']}] {progress['done']}"
+        else:
+            percent = 100 * progress["done"] / progress["total"] if progress["total"] > 0 else 100.0
+            text = f"[{progress['stage']}] {progress['done']}/{progress['total']} ({percent:.1f}%)"
+        text += f" {progress['rate']:.1f} files/s"
+        if progress["finished"]:
+            text += f" in {_format_seconds(progress['elapsed'])}"
+        elif not progress["eta"] is None:
+            text += f" ETA {_format_seconds(progress['eta'])}"
+        return text
@@ -0,0 +1,106 @@
+"""Registry of dataset formats
+   A reader is a dataset class (see 'base.py') which yields per-image records by '_iter_image_records()'.
+   A writer consumes the records (see 'annotation_writer.py').
+   Formats of other packages are discovered through entry points in group 'objdet_converter.formats'.
+   An entry point refers to a module registering formats on import, or a function called with no args.
+        Example (pyproject.toml of plugin package):
+            ```toml
+            [project.entry-points."objdet_converter.formats"]
+            myformat = "my_package.formats:register"
+            ```
+"""
+from importlib import metadata
+import inspect
+import logging
+from typing import Union
+
+ENTRY_POINT_GROUP = "objdet_converter.formats"
+
+reader_class_dict = dict()
+writer_class_dict = dict()
+_formats_loaded = False
+
+
+def register_reader(format: str, reader_class) -> None:
+    """Register reader (dataset class) of format
+
+    Args:
+        format (str): Format name. e.g. 'yolo'
+        reader_class (type): Subclass of BaseDataFormat
+    """
+    reader_class_dict[format] = reader_class
+
+def register_writer(format: str, writer_class) -> None:
+    """Register writer of format
+
+    Args:
+        format (str): Format name. e.g. 'yolo'
+        writer_class (type): Subclass of BaseWriter
+
+    Raises:
+        TypeError: If abstract methods of BaseWriter are not implemented
+    """
+    # Checked here, not when the writer is created after the whole source is parsed
+    if inspect.isabstract(writer_class):
+        method_list = sorted(writer_class.__abstractmethods__)
+        raise TypeError(f"Writer of format '{format}' does not implement {method_list}")
+    writer_class_dict[format] = writer_class
+
+def _register_builtin_formats() -> None:
+    # Imported here since dataset modules import this module
+    from .annotation_writer import KITTIFileWriter, PascalVOCFileWriter, YoloFileWriter
+    from .columnar import ColumnarDataset, ColumnarWriter
+    from .kitti import KITTIDataset
+    from .mscoco import MSCOCODataset, MSCOCOWriter
+    from .pascalvoc import PascalVOCDataset
+    from .yolo import YoloDataset
+    register_reader("coco", MSCOCODataset)
+    register_reader("yolo", YoloDataset)
+    register_reader("pascalvoc", PascalVOCDataset)
+    register_reader("kitti", KITTIDataset)
+    register_reader("columnar", ColumnarDataset)
+    register_writer("coco", MSCOCOWriter)
+    register_writer("yolo", YoloFileWriter)
+    register_writer("pascalvoc", PascalVOCFileWriter)
+    register_writer("kitti", KITTIFileWriter)
+    register_writer("columnar", ColumnarWriter)
+
+def _get_entry_points() -> list:
+    entry_points = metadata.entry_points()
+    if hasattr(entry_points, "select"):
+        return list(entry_points.select(group=ENTRY_POINT_GROUP))
+    # Python < 3.10
+    return list(entry_points.get(ENTRY_POINT_GROUP, []))
+
+def load_formats() -> None:
+    """Register built-in formats and formats of installed plugins. Called once"""
+    global _formats_loaded
+    if _formats_loaded:
+        return
+    _formats_loaded = True
+    _register_builtin_formats()
+    logger = logging.getLogger("logger")
+    for entry_point in _get_entry_points():
+        try:
+            loaded = entry_point.load()
+            if callable(loaded):
+                loaded()
+        except Exception as e:
+            logger.warning(f"Format plugin '{entry_point.name}' could not be loaded: {e}")
+
+def get_reader_class(format: str) -> Union[None, type]:
+    """Get reader (dataset class) of format. None if not registered"""
+    load_formats()
+    return reader_class_dict.get(format)
+
+def get_writer_class(format: str) -> Union[None, type]:
+    """Get writer of format. None if not registered"""
+    load_formats()
+    return writer_class_dict.get(format)
+
+def get_format_list() -> list:
+    """Get names of registered formats in registration order"""
+    load_formats()
+    format_list = list(reader_class_dict)
+    format_list += [format for format in writer_class_dict if not format in reader_class_dict]
+    return format_list
@@ -0,0 +1,140 @@
+"""Conversion statistics
+   Wall time and CPU time of each stage and counters are recorded into the stats of the current process.
+   Worker processes of 'parallel.py' send their stats back with results, so stats cover all processes.
+   Stages:
+       load   : Creating reader. Includes scanning, and parsing of MSCOCO/columnar source
+       scan   : Listing annotation files
+       parse  : Parsing annotation files. For per-file formats, time waiting for records of workers
+       probe  : Reading image headers for sizes (summed over workers)
+       bbox   : Converting bbox coordinates in writers
+       write  : Formatting and writing output files (summed over writers)
+       convert: Whole conversion after reader is created
+   Stages are nested (e.g. 'probe' is in 'parse' in serial mode), and time of workers is summed,
+   so time of stages does not add up to total time.
+   CPU time is of the thread running the stage.
+"""
+from contextlib import contextmanager
+import threading
+import time
+from typing import Iterable, Iterator
+
+STAGE_LIST = ["load", "scan", "parse", "probe", "bbox", "write", "convert"]
+
+COUNTER_LIST = [
+    "annotation_files",  # Annotation files found by scanning
+    "images",            # Images (records) passed to writer
+    "boxes",             # Boxes passed to writer
+    "images_probed",     # Image headers read
+    "files_read",        # Annotation files read
+    "bytes_read",        # Bytes of annotation files read
+    "files_written",     # Output files written
+    "bytes_written",     # Bytes of output files written
+]
+
+
+class ConversionStats:
+    """Per-stage timing and counters of a conversion. Thread safe"""
+    def __init__(self) -> None:
+        # {stage: [wall time, cpu time, calls]}
+        self.stage_dict = dict()
+        self.counter_dict = {name: 0 for name in COUNTER_LIST}
+        self.total_time = 0.0
+        self.lock = threading.Lock()
+
+    def add_time(self, stage: str, wall_time: float, cpu_time: float, calls: int = 1) -> None:
+        with self.lock:
+            record = self.stage_dict.setdefault(stage, [0.0, 0.0, 0])
+            record[0] += wall_time
+            record[1] += cpu_time
+            record[2] += calls
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self.lock:
+            self.counter_dict[name] = self.counter_dict.get(name, 0) + value
+
+    @contextmanager
+    def measure(self, stage: str):
+        """Measure time of the block as 'stage'"""
+        start_wall = time.perf_counter()
+        start_cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start_wall, time.thread_time() - start_cpu)
+
+    def iter_records(self, records: Iterable, stage: str = "parse") -> Iterator:
+        """Yield records measuring time to produce each record as 'stage'. Images and boxes are counted
+
+        Args:
+            records (Iterable): (image_id, image_info, [(class_id, bbox, score or None), ...]) for each image
+            stage (str): Stage name
+        """
+        iterator = iter(records)
+        while True:
+            start_wall = time.perf_counter()
+            start_cpu = time.thread_time()
+            record = next(iterator, None)
+            self.add_time(stage, time.perf_counter() - start_wall, time.thread_time() - start_cpu, 0)
+            if record is None:
+                return
+            with self.lock:
+                self.stage_dict[stage][2] += 1
+                self.counter_dict["images"] += 1
+                self.counter_dict["boxes"] += len(record[2])
+            yield record
+
+    def merge(self, stats_dict: dict) -> None:
+        """Add stats of another process. See 'as_dict()'"""
+        for stage, record in stats_dict["stages"].items():
+            self.add_time(stage, record["wall"], record["cpu"], record["calls"])
+        for name, value in stats_dict["counters"].items():
+            self.count(name, value)
+
+    def as_dict(self) -> dict:
+        """Get stats as JSON serializable dict
+
+        Returns:
+            dict: {"total_time": seconds,
+                   "stages": {stage: {"wall": seconds, "cpu": seconds, "calls": count}, ...},
+                   "counters": {name: count, ...}}
+        """
+        with self.lock:
+            stage_list = [stage for stage in STAGE_LIST if stage in self.stage_dict]
+            stage_list += [stage for stage in self.stage_dict if not stage in STAGE_LIST]
+            return {
+                "total_time": self.total_time,
+                "stages": {
+                    stage: {"wall": self.stage_dict[stage][0], "cpu": self.stage_dict[stage][1], "calls": self.stage_dict[stage][2]}
+                    for stage in stage_list
+                },
+                "counters": dict(self.counter_dict),
+            }
+
+    def format_table(self) -> list:
+        """Format stats as lines of a table"""
+        stats_dict = self.as_dict()
+        line_list = [f"{'stage':8} {'wall[s]':>10} {'cpu[s]':>10} {'calls':>10}"]
+        for stage, record in stats_dict["stages"].items():
+            line_list.append(f"{stage:8} {record['wall']:>10.3f} {record['cpu']:>10.3f} {record['calls']:>10}")
+        line_list.append(f"{'total':8} {stats_dict['total_time']:>10.3f}")
+        for name, value in stats_dict["counters"].items():
+            line_list.append(f"{name:16} {value:>12}")
+        return line_list
+
+
+# Stats of current process. Replaced by 'reset_stats()'
+_stats = ConversionStats()
+
+def get_stats() -> ConversionStats:
+    """Get stats of current process"""
+    return _stats
+
+def reset_stats() -> ConversionStats:
+    """Start new stats of current process. Called at start of conversion and of each job of worker process
+
+    Returns:
+        ConversionStats: New stats
+    """
+    global _stats
+    _stats = ConversionStats()
+    return _stats
@@ -1,14 +1,11 @@
 import logging
+import os
 from typing import Union
 
+import numpy as np
 from pathlib import Path
 
-supported_data_format_list = [
-    "coco",
-    "yolo",
-    "pascalvoc",
-    "kitti",
-]
+from .registry import get_format_list
 
 supported_ext_list = [
     ".png",
@@ -30,13 +27,40 @@ def check_format_validation(format: str) -> bool:
         bool: Dataset format is supported = True, else = False
     """
     logger = logging.getLogger("logger")
-    if not format in supported_data_format_list:
+    # Built-in formats and formats of plugins. See 'registry.py' as well.
+    format_list = get_format_list()
+    if not format in format_list:
         logger.error(f"Format '{format}' not Supported")
-        logger.error(f"Supported data format: [{', '.join(supported_data_format_list)}]")
+        logger.error(f"Supported data format: [{', '.join(format_list)}]")
         return False
     logger.info(f"Format '{format}' valid")
     return True
 
+def parse_byte_size(size: Union[int, str]) -> Union[None, int]:
+    """Parse byte size with optional unit. e.g. 1000, '500K', '512MB', '2G'
+
+    Args:
+        size (int | str): Byte size
+
+    Returns:
+        None | int: Number of bytes. None if invalid
+    """
+    units = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+    size = str(size).strip().upper()
+    if size.endswith("B"):
+        size = size[:-1]
+    unit = ""
+    if size[-1:] in units:
+        unit = size[-1]
+        size = size[:-1]
+    try:
+        value = float(size)
+    except ValueError:
+        return None
+    if value < 0:
+        return None
+    return int(value * units[unit])
+
 def check_image_existence(file_path: Path) -> Union[None, str]:
     """Check whether image exists or not.
        Get annotation file path, add supported image extension to the path and check existence
@@ -52,6 +76,67 @@ def check_image_existence(file_path: Path) -> Union[None, str]:
             return ext
     return None
 
+def scan_annotation_dir(src_path: Path, annotation_suffix: str) -> list:
+    """Scan directory recursively once and pair annotation files with image files.
+       Same result as 'sorted(src_path.glob(f"**/*{annotation_suffix}"))' + 'check_image_existence()'
+       for each file, but directory entries are listed by os.scandir and no stat is issued per file.
+
+    Args:
+        src_path (pathlib.Path): Dataset directory
+        annotation_suffix (str): Annotation file name suffix. e.g. 'txt'
+
+    Returns:
+        list: [(annotation_path, image_path), ...] sorted by annotation path.
+              image_path is None if corresponding image does not exist.
+    """
+    annotation_image_list = list()
+    dir_list = [str(src_path)]
+    while dir_list:
+        dir_name = dir_list.pop()
+        name_list = list()
+        with os.scandir(dir_name) as entries:
+            for entry in entries:
+                # Symlinks to directories are not followed, same as '**' of glob
+                if entry.is_dir(follow_symlinks=False):
+                    dir_list.append(entry.path)
+                    continue
+                name_list.append(entry.name)
+        annotation_image_list.extend(pair_annotation_files(Path(dir_name), name_list, annotation_suffix))
+    annotation_image_list.sort(key=lambda x: x[0])
+    return annotation_image_list
+
+def pair_annotation_files(dir_path: Path, name_list: list, annotation_suffix: str) -> list:
+    """Pair annotation files with image files of the same stem in one directory. See 'scan_annotation_dir()' as well.
+
+    Args:
+        dir_path (pathlib.Path): Directory of files
+        name_list (list): File names in the directory
+        annotation_suffix (str): Annotation file name suffix. e.g. 'txt'
+
+    Returns:
+        list: [(annotation_path, image_path), ...] in order of 'name_list'.
+              image_path is None if corresponding image does not exist.
+    """
+    ext_priority = {ext: index for index, ext in enumerate(supported_ext_list)}
+    annotation_name_list = list()
+    stem_to_image_name = dict()
+    for name in name_list:
+        if name.endswith(annotation_suffix):
+            annotation_name_list.append(name)
+        stem, ext = os.path.splitext(name)
+        if not ext in ext_priority:
+            continue
+        # Same priority as check_image_existence
+        registered_name = stem_to_image_name.get(stem)
+        if registered_name is None or ext_priority[ext] < ext_priority[os.path.splitext(registered_name)[1]]:
+            stem_to_image_name[stem] = name
+    annotation_image_list = list()
+    for name in annotation_name_list:
+        image_name = stem_to_image_name.get(os.path.splitext(name)[0])
+        image_path = None if image_name is None else dir_path / image_name
+        annotation_image_list.append((dir_path / name, image_path))
+    return annotation_image_list
+
 def topleftwh2centerwh(bbox: list) -> list:
     """Convert bbox coordinates
         [left, top, width, height] -> [center_x, center_y, width, height]
@@ -183,4 +268,168 @@ def get_rectangle_all_points(bbox):
         bbox[2], bbox[1],
         bbox[2], bbox[3],
         bbox[0], bbox[3],
-    ]
\ No newline at end of file
+    ]
+
+def _get_size_scale(image_sizes: np.ndarray) -> np.ndarray:
+    """Expand [width, height] of images to [width, height, width, height]"""
+    image_sizes = np.asarray(image_sizes, dtype=np.float64)
+    return image_sizes[..., [0, 1, 0, 1]]
+
+def topleftwh2centerwh_batch(bboxes: np.ndarray) -> np.ndarray:
+    """Batched 'topleftwh2centerwh'
+
+    Args:
+        bboxes (np.ndarray): (N, 4) [left, top, width, height]
+
+    Returns:
+        np.ndarray: (N, 4) [center_x, center_y, width, height]
+    """
+    bboxes = np.array(bboxes, dtype=np.float64).reshape(-1, 4)
+    bboxes[:, :2] += bboxes[:, 2:] / 2
+    return bboxes
+
+def centerwh2topleftwh_batch(bboxes: np.ndarray) -> np.ndarray:
+    """Batched 'centerwh2topleftwh'
+
+    Args:
+        bboxes (np.ndarray): (N, 4) [center_x, center_y, width, height]
+
+    Returns:
+        np.ndarray: (N, 4) [left, top, width, height]
+    """
+    bboxes = np.array(bboxes, dtype=np.float64).reshape(-1, 4)
+    bboxes[:, :2] -= bboxes[:, 2:] / 2
+    return bboxes
+
+def topleftbottomright2topleftwh_batch(bboxes: np.ndarray) -> np.ndarray:
+    """Batched 'topleftbottomright2topleftwh'
+
+    Args:
+        bboxes (np.ndarray): (N, 4) [left, top, right, bottom]
+
+    Returns:
+        np.ndarray: (N, 4) [left, top, width, height]
+    """
+    bboxes = np.array(bboxes, dtype=np.float64).reshape(-1, 4)
+    bboxes[:, 2:] -= bboxes[:, :2]
+    return bboxes
+
+def topleftwh2topleftbottomright_batch(bboxes: np.ndarray) -> np.ndarray:
+    """Batched 'topleftwh2topleftbottomright'
+
+    Args:
+        bboxes (np.ndarray): (N, 4) [left, top, width, height]
+
+    Returns:
+        np.ndarray: (N, 4) [left, top, right, bottom]
+    """
+    bboxes = np.array(bboxes, dtype=np.float64).reshape(-1, 4)
+    bboxes[:, 2:] += bboxes[:, :2]
+    return bboxes
+
+def absolute2relative_batch(bboxes: np.ndarray, image_sizes: np.ndarray) -> np.ndarray:
+    """Batched 'absolute2relative'
+
+    Args:
+        bboxes (np.ndarray): (N, 4) Absolute bbox points [x1, y1, x2, y2]
+        image_sizes (np.ndarray): (N, 2) [width, height] of image of each bbox, or (2,) shared by all bboxes
+
+    Returns:
+        np.ndarray: (N, 4) Relative bbox points [x1, y1, x2, y2]
+    """
+    bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    return bboxes / _get_size_scale(image_sizes)
+
+def relative2absolute_batch(bboxes: np.ndarray, image_sizes: np.ndarray) -> np.ndarray:
+    """Batched 'relative2absolute'
+
+    Args:
+        bboxes (np.ndarray): (N, 4) Relative bbox points [x1, y1, x2, y2]
+        image_sizes (np.ndarray): (N, 2) [width, height] of image of each bbox, or (2,) shared by all bboxes
+
+    Returns:
+        np.ndarray: (N, 4) Absolute bbox points [x1, y1, x2, y2]
+    """
+    bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    return bboxes * _get_size_scale(image_sizes)
+
+def clip_bbox_batch(bboxes: np.ndarray, image_sizes: Union[None, np.ndarray] = None) -> np.ndarray:
+    """Clip bbox points into image
+
+    Args:
+        bboxes (np.ndarray): (N, 4) Bbox points [x1, y1, x2, y2]
+        image_sizes (None | np.ndarray): (N, 2) [width, height] of image of each bbox, or (2,) shared by all bboxes.
+                                         None clips relative points into [0, 1]
+
+    Returns:
+        np.ndarray: (N, 4) Clipped bbox points
+    """
+    bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    upper = 1.0 if image_sizes is None else _get_size_scale(image_sizes)
+    return np.clip(bboxes, 0, upper)
+
+def calculate_area_batch(bboxes: np.ndarray) -> np.ndarray:
+    """Batched 'calculate_area'
+
+    Args:
+        bboxes (np.ndarray): (N, 4) Bbox points. Expected topleft-wh
+
+    Returns:
+        np.ndarray: (N,) Bbox areas
+    """
+    bboxes = np.asarray(bboxes).reshape(-1, 4)
+    return bboxes[:, 2] * bboxes[:, 3]
+
+def topleftwh2yolo_batch(bboxes: np.ndarray, image_sizes: np.ndarray, decimals: int = 4) -> np.ndarray:
+    """Convert absolute [left, top, width, height] to YOLO points in one pass.
+       Conversion to center-wh, normalization, clipping into [0, 1] and rounding.
+
+    Args:
+        bboxes (np.ndarray): (N, 4) Absolute [left, top, width, height]
+        image_sizes (np.ndarray): (N, 2) [width, height] of image of each bbox, or (2,) shared by all bboxes
+        decimals (int): Number of decimals
+
+    Returns:
+        np.ndarray: (N, 4) Relative [center_x, center_y, width, height]
+    """
+    bboxes = topleftwh2centerwh_batch(bboxes)
+    bboxes = absolute2relative_batch(bboxes, image_sizes)
+    bboxes = clip_bbox_batch(bboxes)
+    return np.round(bboxes, decimals)
+
+def topleftwh2kitti_batch(bboxes: np.ndarray, image_sizes: np.ndarray, decimals: Union[None, int] = 4) -> np.ndarray:
+    """Convert absolute [left, top, width, height] to KITTI/PascalVOC points in one pass.
+       Conversion to topleft-bottomright, clipping into image and rounding.
+
+    Args:
+        bboxes (np.ndarray): (N, 4) Absolute [left, top, width, height]
+        image_sizes (np.ndarray): (N, 2) [width, height] of image of each bbox, or (2,) shared by all bboxes
+        decimals (None | int): Number of decimals. None means no rounding
+
+    Returns:
+        np.ndarray: (N, 4) Absolute [left, top, right, bottom]
+    """
+    bboxes = topleftwh2topleftbottomright_batch(bboxes)
+    bboxes = clip_bbox_batch(bboxes, image_sizes)
+    if decimals is None:
+        return bboxes
+    return np.round(bboxes, decimals)
+
+def bbox_array2list(bboxes: np.ndarray, bbox_is_int: Union[None, np.ndarray] = None) -> list:
+    """Convert bbox array to lists of python numbers
+
+    Args:
+        bboxes (np.ndarray): (N, 4) Bbox points
+        bbox_is_int (None | np.ndarray): (N, 4) bool. Values to be returned as int. None means all float
+
+    Returns:
+        list: [[x1, y1, x2, y2], ...]
+    """
+    if bbox_is_int is None or not bbox_is_int.any():
+        return bboxes.tolist()
+    if bbox_is_int.all():
+        return bboxes.astype(np.int64).tolist()
+    return [
+        [int(b) if is_int else b for b, is_int in zip(bbox_row, is_int_row)]
+        for bbox_row, is_int_row in zip(bboxes.tolist(), bbox_is_int.tolist())
+    ]
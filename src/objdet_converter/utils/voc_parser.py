@@ -0,0 +1,245 @@
+"""PascalVOC annotation file parsers
+   Every parser returns same values as 'parse_etree()'. Parser is selected by name. See 'get_voc_parser()'.
+       etree : xml.etree.ElementTree
+       lxml  : lxml.etree (optional dependency, 'pip install lxml'). ElementTree is used if not installed
+       fast  : Regular expressions for standard VOC layout. Falls back to ElementTree for other files
+"""
+from pathlib import Path
+import re
+import xml.etree.ElementTree as ET
+from typing import Callable, Union
+
+from .archive import open_file
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
+
+VOC_PARSER_LIST = ["etree", "lxml", "fast"]
+
+
+def _parse_root(root, annotation_path: Path, found_image_path):
+    """Read values from root element of ElementTree compatible API
+
+    Returns:
+        tuple: (image_path, width or None, height or None, [(class_name, bbox), ...], [message, ...], {class_name, ...})
+               bbox is [xmin, ymin, xmax, ymax]
+               Class names of objects without bbox are included in the set as well
+    """
+    file_name = root.find("filename")
+    if not file_name is None:
+        image_path = Path(file_name.text)
+    else:
+        image_path = Path(annotation_path.stem)
+        if not found_image_path is None:
+            image_path = found_image_path
+
+    image_info = root.find("size")
+    image_width = None
+    image_height = None
+    # Element without children is ignored
+    if (not image_info is None) and len(image_info) > 0:
+        width_info = image_info.find("width")
+        height_info = image_info.find("height")
+        if not width_info is None:
+            image_width = int(width_info.text)
+        if not width_info is None:
+            image_height = int(height_info.text)
+    object_list = list()
+    message_list = list()
+    class_name_set = set()
+    for i, obj in enumerate(root.iter("object")):
+        class_name_info = obj.find("name")
+        bbox_info = obj.find("bndbox")
+        if class_name_info is None:
+            message_list.append(f"Class name not found in '{annotation_path}' {i}-th object")
+            continue
+        class_name_set.add(class_name_info.text)
+        if bbox_info is None:
+            message_list.append(f"Bbox info not found in '{annotation_path}' {i}-th object")
+            continue
+        class_name = class_name_info.text
+        xmin_info = bbox_info.find("xmin")
+        ymin_info = bbox_info.find("ymin")
+        xmax_info = bbox_info.find("xmax")
+        ymax_info = bbox_info.find("ymax")
+        if xmin_info is None:
+            message_list.append(f"Tag xmin not found in '{annotation_path} {i}-th object")
+            continue
+        if ymin_info is None:
+            message_list.append(f"Tag ymin not found in '{annotation_path} {i}-th object")
+            continue
+        if xmax_info is None:
+            message_list.append(f"Tag xmax not found in '{annotation_path} {i}-th object")
+            continue
+        if ymax_info is None:
+            message_list.append(f"Tag ymax not found in '{annotation_path} {i}-th object")
+            continue
+        xmin = int(xmin_info.text)
+        ymin = int(ymin_info.text)
+        xmax = int(xmax_info.text)
+        ymax = int(ymax_info.text)
+        object_list.append((class_name, [xmin, ymin, xmax, ymax]))
+    return image_path, image_width, image_height, object_list, message_list, class_name_set
+
+def _read_data(annotation_path: Path, data: Union[None, bytes]) -> bytes:
+    if not data is None:
+        return data
+    with open_file(annotation_path, "rb") as f:
+        return f.read()
+
+def parse_etree(annotation_path: Path, found_image_path, data: Union[None, bytes] = None):
+    """Parse PascalVOC annotation file with xml.etree.ElementTree
+
+    Args:
+        annotation_path (pathlib.Path): Annotation file path or virtual path of archive member. See 'archive.py' as well.
+        found_image_path (None | pathlib.Path): Image path found next to annotation file
+        data (None | bytes): Content of annotation file. The file is not read if given
+
+    Returns:
+        tuple: See '_parse_root()'
+    """
+    root = ET.fromstring(_read_data(annotation_path, data))
+    return _parse_root(root, annotation_path, found_image_path)
+
+def parse_lxml(annotation_path: Path, found_image_path, data: Union[None, bytes] = None):
+    """Parse PascalVOC annotation file with lxml. See 'parse_etree()' as well."""
+    root = lxml_etree.fromstring(_read_data(annotation_path, data))
+    return _parse_root(root, annotation_path, found_image_path)
+
+
+# Standard object element. Tags other than these or in other order are parsed by ElementTree
+_OBJECT_PATTERN = re.compile(
+    r"<object>\s*<name>([^<]+)</name>\s*"
+    r"(?:<pose>[^<]*</pose>\s*)?(?:<truncated>[^<]*</truncated>\s*)?"
+    r"(?:<occluded>[^<]*</occluded>\s*)?(?:<difficult>[^<]*</difficult>\s*)?"
+    r"<bndbox>\s*<xmin>([^<]+)</xmin>\s*<ymin>([^<]+)</ymin>\s*"
+    r"<xmax>([^<]+)</xmax>\s*<ymax>([^<]+)</ymax>\s*</bndbox>\s*"
+    r"(?:<pose>[^<]*</pose>\s*)?(?:<truncated>[^<]*</truncated>\s*)?"
+    r"(?:<occluded>[^<]*</occluded>\s*)?(?:<difficult>[^<]*</difficult>\s*)?"
+    r"</object>"
+)
+# Attributes are allowed in elements other than objects. e.g. <annotation verified="yes"> of LabelImg
+_TAG_PATTERN = re.compile(r"<(/?)([A-Za-z_][\w.-]*)(?:\s+[A-Za-z_][\w.-]*\s*=\s*(?:\"[^\"<>]*\"|'[^'<>]*'))*\s*>([^<]*)")
+_DECLARATION_PATTERN = re.compile(r"<\?xml\s[^>]*\?>\s*|\s*")
+_ENCODING_PATTERN = re.compile(r"<\?xml\s[^>]*encoding\s*=\s*[\"'](?!utf-8[\"']|UTF-8[\"'])")
+
+def _parse_header(text: str):
+    """Get text of 'filename' and children of 'size' in root element
+
+    Returns:
+        None | tuple: (filename text or None, {tag: text} of size children or None).
+                      None if not standard layout
+    """
+    position = _DECLARATION_PATTERN.match(text).end()
+    if text[position:].strip() == "" or "<?" in text[position:]:
+        return None
+    tag_stack = list()
+    file_name = None
+    size_dict = None
+    size_count = 0
+    root_closed = False
+    for match in _TAG_PATTERN.finditer(text, position):
+        if match.start() != position or root_closed:
+            return None
+        position = match.end()
+        is_end, tag, tail = match.groups()
+        if is_end:
+            if len(tag_stack) == 0 or tag_stack.pop() != tag:
+                return None
+            root_closed = len(tag_stack) == 0
+            if root_closed and tail.strip() != "":
+                return None
+            continue
+        tag_stack.append(tag)
+        depth = len(tag_stack)
+        if depth == 1 and tag != "annotation":
+            return None
+        if depth == 2 and tag == "filename" and file_name is None:
+            # Text is None for empty element
+            file_name = tail if tail != "" else None
+            if file_name is None:
+                return None
+        elif depth == 2 and tag == "size":
+            size_count += 1
+            size_dict = dict()
+        elif depth == 3 and tag_stack[1] == "size" and size_dict is not None and not tag in size_dict:
+            # Text is None for empty element
+            if tail == "" and tag in ["width", "height"]:
+                return None
+            size_dict[tag] = tail
+        elif depth >= 2 and tag == "object":
+            return None
+    if position != len(text) or not root_closed or size_count > 1:
+        return None
+    return file_name, size_dict
+
+def parse_fast(annotation_path: Path, found_image_path, data: Union[None, bytes] = None):
+    """Parse standard PascalVOC annotation file with regular expressions. See 'parse_etree()' as well.
+       Files with attributes, comments, entities, CDATA, empty elements or non standard objects are
+       parsed by 'parse_etree()', so results are always same.
+    """
+    data = _read_data(annotation_path, data)
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError:
+        return parse_etree(annotation_path, found_image_path, data)
+    if ("&" in text) or ("<!" in text) or ("/>" in text) or text.startswith("\ufeff"):
+        return parse_etree(annotation_path, found_image_path, data)
+    if text.startswith("<?xml") and not _ENCODING_PATTERN.match(text) is None:
+        return parse_etree(annotation_path, found_image_path, data)
+    if "\r" in text:
+        # Line breaks are normalized by XML parser
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    # [text, 5 groups of object, text, 5 groups of object, ..., text]
+    split_list = _OBJECT_PATTERN.split(text)
+    num_objects = len(split_list) // 6
+    if num_objects != text.count("<object"):
+        return parse_etree(annotation_path, found_image_path, data)
+    header = _parse_header("".join(split_list[::6]))
+    if header is None:
+        return parse_etree(annotation_path, found_image_path, data)
+    file_name, size_dict = header
+
+    if not file_name is None:
+        image_path = Path(file_name)
+    else:
+        image_path = Path(annotation_path.stem)
+        if not found_image_path is None:
+            image_path = found_image_path
+    image_width = None
+    image_height = None
+    if size_dict:
+        if "width" in size_dict:
+            if not "height" in size_dict:
+                # ElementTree parser raises error
+                return parse_etree(annotation_path, found_image_path, data)
+            image_width = int(size_dict["width"])
+            image_height = int(size_dict["height"])
+    object_list = list()
+    class_name_set = set()
+    for index in range(num_objects):
+        class_name, xmin, ymin, xmax, ymax = split_list[index*6+1:index*6+6]
+        class_name_set.add(class_name)
+        object_list.append((class_name, [int(xmin), int(ymin), int(xmax), int(ymax)]))
+    return image_path, image_width, image_height, object_list, list(), class_name_set
+
+
+def get_voc_parser(name: str) -> Callable:
+    """Get PascalVOC parser function by name
+
+    Args:
+        name (str): One of VOC_PARSER_LIST
+
+    Returns:
+        Callable: Parser function called with (annotation_path, found_image_path, data=None)
+    """
+    assert name in VOC_PARSER_LIST, f"PascalVOC parser '{name}' not supported. Choose from {VOC_PARSER_LIST}"
+    if name == "lxml" and lxml_etree is None:
+        return parse_etree
+    if name == "lxml":
+        return parse_lxml
+    if name == "fast":
+        return parse_fast
+    return parse_etree
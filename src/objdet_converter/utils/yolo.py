@@ -1,85 +1,174 @@
-import cv2
+from functools import partial
 
+import numpy as np
+
+from .archive import file_exists, get_image_size, open_file, prefetch_files, scan_annotation_files
 from .base import BaseDataFormat
-from .mscoco import MSCOCODataset
-from .utils import check_image_existence, relative2absolute, centerwh2topleftwh
+from .label_reader import parse_yolo_files, read_label_files, split_label_batches
+from .parallel import parallel_map, thread_map
+from .utils import relative2absolute, centerwh2topleftwh, relative2absolute_batch, centerwh2topleftwh_batch
+
+
+def _parse_annotation_file(task):
+    """Parse one YOLO annotation file. Called in worker process.
+
+    Args:
+        task (tuple): (annotation_path, image_path, cached image size or None)
+
+    Returns:
+        tuple: ((width, height, channels) or None, [(class_id, bbox), ...])
+               bbox is absolute [left, top, width, height]
+    """
+    annotation_path, image_path, image_size = task
+    if image_path is None:
+        return None, []
+    if image_size is None:
+        image_size = get_image_size(image_path)
+        if image_size is None:
+            return None, []
+    image_width, image_height, _ = image_size
+    object_list = list()
+    with open_file(annotation_path) as f:
+        lines = f.read().split('\n')
+    for line in lines:
+        if line == "":
+            continue
+        split_line = line.split(" ")
+        class_id = int(split_line[0])
+        bbox = [float(b) for b in split_line[1:]]
+        bbox = relative2absolute(bbox, image_width, image_height)
+        bbox = centerwh2topleftwh(bbox)
+        object_list.append((class_id, bbox))
+    return image_size, object_list
+
+def _parse_annotation_batch(task_batch, io_threads=0):
+    """Parse YOLO annotation files at once. Called in worker process. See 'label_reader.py' as well.
+
+    Args:
+        task_batch (list): [task of '_parse_annotation_file()', ...]
+        io_threads (int): Number of threads reading files concurrently. See 'archive.prefetch_files()' as well.
+
+    Returns:
+        list: Result of '_parse_annotation_file()' for each task
+    """
+    result_list = [(None, []) for _ in task_batch]
+    probe_index_list = [
+        index for index, (_, image_path, image_size) in enumerate(task_batch) if not image_path is None and image_size is None
+    ]
+    index_to_probed_size = dict(zip(
+        probe_index_list, thread_map(get_image_size, [task_batch[index][1] for index in probe_index_list], io_threads)
+    ))
+    parse_index_list = list()
+    image_size_list = list()
+    for index, (_, image_path, image_size) in enumerate(task_batch):
+        if image_path is None:
+            continue
+        if image_size is None:
+            image_size = index_to_probed_size[index]
+            if image_size is None:
+                continue
+        parse_index_list.append(index)
+        image_size_list.append(image_size)
+    annotation_path_list = [task_batch[index][0] for index in parse_index_list]
+    # Files parsed line by line below are read from prefetched data as well
+    with prefetch_files(annotation_path_list, io_threads):
+        data_list = read_label_files(annotation_path_list)
+        file_is_valid_list, line_count_list, class_id_list, bboxes = parse_yolo_files(data_list)
+        # Boxes of the batch are converted at once
+        image_sizes = [image_size[:2] for image_size, is_valid in zip(image_size_list, file_is_valid_list) if is_valid]
+        image_sizes = np.repeat(
+            np.array(image_sizes, dtype=np.float64).reshape(-1, 2),
+            [line_count for line_count, is_valid in zip(line_count_list, file_is_valid_list) if is_valid],
+            axis=0,
+        )
+        bbox_list = centerwh2topleftwh_batch(relative2absolute_batch(bboxes, image_sizes)).tolist()
+        offset = 0
+        for index, image_size, is_valid, line_count in zip(parse_index_list, image_size_list, file_is_valid_list, line_count_list):
+            if not is_valid:
+                annotation_path, image_path, _ = task_batch[index]
+                result_list[index] = _parse_annotation_file((annotation_path, image_path, image_size))
+                continue
+            rows = slice(offset, offset+line_count)
+            offset += line_count
+            result_list[index] = (image_size, list(zip(class_id_list[rows], bbox_list[rows])))
+    return result_list
 
 class YoloDataset(BaseDataFormat):
     """Dataset parser for Yolo
        See 'base.py' as well.
     """
-    def __init__(self, dst_path, class_txt_path, src_path) -> None:
-        super().__init__(dst_path, class_txt_path, src_path)
+    def __init__(self, dst_path, class_txt_path, src_path, **kwargs) -> None:
+        super().__init__(dst_path, class_txt_path, src_path, **kwargs)
+        self.annotation_image_list = scan_annotation_files(self.src_path, "txt")
         self._create_class_dict()
-        self._parse_annotation()
-        self.mscooc_data = MSCOCODataset(dst_path, class_txt_path, "")
-        self.mscooc_data.set_data(
-            self.image_id_to_image_info,
-            self.image_id_to_annotation_list,
-            self.class_id_to_class_name,
-            self.class_name_to_class_id
-        )
+        # Without class list, classes are named by class index as they appear
+        self.class_dict_from_annotation = len(self.class_id_to_class_name) == 0
 
     def _create_class_dict(self):
         if str(self.class_txt_path) == ".":
             # Create later
             return
-        if not self.class_txt_path.exists():
+        if not file_exists(self.class_txt_path):
             # Create later
             return
-        with open(self.class_txt_path) as f:
+        with open_file(self.class_txt_path) as f:
             lines = f.read().split('\n')
         # For MSCOCO, 1-origin
         self.class_id_to_class_name = {index+1: line for index, line in enumerate(lines) if line != ""}
         self.class_name_to_class_id = {class_name: class_id for class_id, class_name in self.class_id_to_class_name.items()}
 
     
-    def _parse_annotation(self):
+    def _iter_image_records(self):
         self.logger.info("Parsing annotation file")
-        annotation_path_list = sorted(self.src_path.glob("**/*txt"))
-        annotation_id = 1
-        tmp_class_list = list()
-        for index, annotation_path in enumerate(annotation_path_list):
+        index_list = list()
+        task_list = list()
+        for index, (annotation_path, image_path) in enumerate(self.annotation_image_list):
             if "classes.txt" in str(annotation_path):
                 continue
-            image_extension = check_image_existence(annotation_path)
-            if not image_extension:
+            cached_image_size = None
+            if not image_path is None:
+                cached_image_size = self._lookup_image_size(image_path)
+            index_list.append(index)
+            task_list.append((annotation_path, image_path, cached_image_size))
+        # Label files are parsed in batches
+        batch_results = parallel_map(
+            partial(_parse_annotation_batch, io_threads=self.io_threads), split_label_batches(task_list, self.workers), self.workers
+        )
+        results = (result for result_list in batch_results for result in result_list)
+        # Yield in file order so that ids are same as serial parsing
+        for index, task, (image_size, object_list) in zip(index_list, task_list, results):
+            annotation_path, image_path, cached_image_size = task
+            if image_path is None:
                 print(f"Image file corresponding to '{annotation_path}' not found")
                 continue
-            image_path = annotation_path.with_suffix(image_extension)
-            image = cv2.imread(str(image_path))
-            image_height, image_width = image.shape[:2]
-            self.image_id_to_image_info[index] = {
+            if image_size is None:
+                print(f"Image file '{image_path}' could not be read")
+                continue
+            if cached_image_size is None:
+                self._store_image_size(image_path, image_size)
+            image_width, image_height, image_channel = image_size
+            image_info = {
                 "file_name": image_path.name,
                 "file_path": str(image_path),
                 "width": image_width,
                 "height": image_height,
+                # Optional. PascalVOC writer does not probe image
+                "channels": image_channel,
             }
-            with open(annotation_path) as f:
-                lines = f.read().split('\n')
-            for line in lines:
-                if line == "":
-                    continue
-                split_line = line.split(" ")
-                class_id = int(split_line[0])
-                tmp_class_list.append(class_id)
-                bbox = [float(b) for b in split_line[1:]]
-                bbox = relative2absolute(bbox, image_width, image_height)
-                bbox = centerwh2topleftwh(bbox)
-                self.image_id_to_annotation_list[index].append({
-                    "annotation_id": annotation_id,
-                    "class_id": class_id+1,
-                    "bbox": bbox,
-                    "score": None,
-                })
-                annotation_id += 1
-        if len(self.class_id_to_class_name) == 0:
-            max_class_id = max(tmp_class_list)
-            self.class_id_to_class_name = {class_id+1: str(class_id) for class_id in range(max_class_id+1)}
-            self.class_name_to_class_id = {class_name: class_id for class_id, class_name in self.class_id_to_class_name.items()}
+            if self.class_dict_from_annotation and len(object_list) > 0:
+                self._add_classes(max(class_id for class_id, _ in object_list))
+            yield index, image_info, [(class_id+1, bbox, None) for class_id, bbox in object_list]
+
+    def _restore_classes(self, class_id_list):
+        if self.class_dict_from_annotation and len(class_id_list) > 0:
+            # 'class_id_list' is 1-origin
+            self._add_classes(max(class_id_list)-1)
 
-    def convert(self, dst_format):
-        self.mscooc_data.convert(dst_format)
+    def _add_classes(self, max_class_id):
+        """Add classes up to 'max_class_id' named by class index. Dicts are updated in place"""
+        for class_id in range(len(self.class_id_to_class_name), max_class_id+1):
+            self.class_id_to_class_name[class_id+1] = str(class_id)
+            self.class_name_to_class_id[str(class_id)] = class_id+1
 
     def validation_check(self):
         if not self.src_path.exists():
@@ -0,0 +1,14 @@
+import pytest
+
+from objdet_converter.convert import convert_format
+from objdet_converter.utils.format_converter import ObjDetFormatConverter
+
+
+def test_convert_format_invalid_writer_pool(tmp_path):
+    # Rejected before source is read, even in serial mode where writer pool is not used
+    assert convert_format("coco", "yolo", tmp_path / "missing.json", tmp_path / "out", writer_pool="proces") is False
+    assert not (tmp_path / "out").exists()
+
+def test_converter_invalid_writer_pool(tmp_path):
+    with pytest.raises(ValueError, match="Writer pool 'proces' not supported"):
+        ObjDetFormatConverter("coco", "yolo", tmp_path / "missing.json", tmp_path / "out", workers=4, writer_pool="proces")
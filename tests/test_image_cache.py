@@ -0,0 +1,29 @@
+import sqlite3
+import struct
+import zlib
+
+from objdet_converter.utils import image_cache
+from objdet_converter.utils.image_cache import ImageMetaCache
+
+
+def write_png(path, width, height):
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    chunk = b"IHDR" + ihdr
+    path.write_bytes(b"\x89PNG\r\n\x1a\n" + struct.pack(">I", len(ihdr)) + chunk + struct.pack(">I", zlib.crc32(chunk)))
+
+def test_locked_cache_is_disabled(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(image_cache, "LOCK_TIMEOUT", 0.1)
+    image_path = tmp_path / "image.png"
+    write_png(image_path, 32, 16)
+    cache = ImageMetaCache(tmp_path)
+    # Another process holds write lock
+    other = sqlite3.connect(str(tmp_path / image_cache.CACHE_FILE_NAME))
+    other.execute("BEGIN EXCLUSIVE")
+    assert cache.get_image_size(image_path) == (32, 16, 3)
+    assert cache.connection is None
+    assert "continued without cache" in caplog.text
+    # Probed without cache after disabled
+    assert cache.get_image_size(image_path) == (32, 16, 3)
+    cache.close()
+    other.rollback()
+    other.close()
@@ -0,0 +1,75 @@
+import io
+import json
+
+import pytest
+
+from objdet_converter.utils import json_stream
+from objdet_converter.utils.json_stream import JSONStreamReader
+
+ARRAY_KEY_LIST = ["images", "annotations", "empty"]
+
+
+class CountingReader(io.StringIO):
+    """Text file counting characters read"""
+    def __init__(self, text: str) -> None:
+        super().__init__(text)
+        self.read_count = 0
+
+    def read(self, size=-1):
+        text = super().read(size)
+        self.read_count += len(text)
+        return text
+
+
+def create_document() -> str:
+    coco_dict = {
+        "info": {"description": "tab\\t \"quoted\" é日😀", "year": 2024, "version": 1.5e3},
+        "ratio": -0.000125,
+        "large": 12345678901234567890,
+        "flag": True,
+        "none": None,
+        "images": [{"id": index, "file_name": f"{index:04d}画像.jpg", "width": 640.5, "height": 480} for index in range(5)],
+        "empty": [],
+        "annotations": [{"id": index, "bbox": [1.25e-3, 2, 3.5, -4], "iscrowd": False, "extra": None} for index in range(5)],
+        "last": "end",
+    }
+    return json.dumps(coco_dict, indent=1, ensure_ascii=False)
+
+def read_document(text: str) -> dict:
+    result = dict()
+    for key, value in JSONStreamReader(io.StringIO(text)).iter_items(ARRAY_KEY_LIST):
+        if key in ARRAY_KEY_LIST:
+            result.setdefault(key, list()).append(value)
+        else:
+            result[key] = value
+    return result
+
+@pytest.mark.parametrize("ensure_ascii", [False, True])
+def test_tokens_split_at_buffer_boundary(monkeypatch, ensure_ascii):
+    text = json.dumps(json.loads(create_document()), ensure_ascii=ensure_ascii, separators=(",", ":"))
+    expected = json.loads(text)
+    expected["empty"] = list()
+    # Every token is split at some read size
+    for read_size in range(1, 17):
+        monkeypatch.setattr(json_stream, "READ_CHUNK_SIZE", read_size)
+        result = read_document(text)
+        result.setdefault("empty", list())
+        assert result == expected, read_size
+
+def test_split_number(monkeypatch):
+    monkeypatch.setattr(json_stream, "READ_CHUNK_SIZE", 1)
+    assert read_document('{"a":1.5e3,"b":-12,"images":[7.25E-2,0]}') == {"a": 1500.0, "b": -12, "images": [0.0725, 0]}
+
+def test_malformed_json_raises_without_reading_rest(monkeypatch):
+    monkeypatch.setattr(json_stream, "READ_CHUNK_SIZE", 64)
+    element = json.dumps({"id": 1, "file_name": "0001.jpg", "width": 640, "height": 480})
+    text = '{"images": [{"id": 0,, "file_name": "0000.jpg"}, ' + ", ".join([element] * 100000) + "]}"
+    f = CountingReader(text)
+    with pytest.raises(json.JSONDecodeError):
+        list(JSONStreamReader(f).iter_items(ARRAY_KEY_LIST))
+    assert f.read_count < 1024
+
+def test_truncated_json_raises(monkeypatch):
+    monkeypatch.setattr(json_stream, "READ_CHUNK_SIZE", 4)
+    with pytest.raises(json.JSONDecodeError):
+        read_document('{"images": [{"id": 0, "file_name": "00')
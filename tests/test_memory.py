@@ -0,0 +1,92 @@
+import pytest
+
+from objdet_converter.memory import coco_to_yolo, voc_to_coco
+
+
+def _create_coco_dict():
+    return {
+        "images": [{"id": 1, "file_name": "0001.jpg", "width": 200, "height": 100}],
+        "annotations": [
+            {"id": 1, "image_id": 1, "category_id": 3, "bbox": [10, 20, 50, 40]},
+            {"id": 2, "image_id": 1, "category_id": 1, "bbox": [0, 0, 200, 100]},
+        ],
+        # Category id 2 is lacked
+        "categories": [{"id": 1, "name": "person"}, {"id": 3, "name": "car"}],
+    }
+
+
+def test_coco_to_yolo():
+    result = coco_to_yolo(_create_coco_dict())
+    image = result["images"][0]
+    assert image["labels"].tolist() == [2, 0]
+    assert image["bboxes"].tolist() == [[0.175, 0.4, 0.25, 0.4], [0.5, 0.5, 1.0, 1.0]]
+
+def test_coco_to_yolo_lacked_class_id():
+    # Same as 'classes.txt' of file conversion
+    assert coco_to_yolo(_create_coco_dict())["classes"] == ["person", "2", "car"]
+
+@pytest.mark.parametrize("key", ["images", "annotations", "categories"])
+def test_coco_to_yolo_missing_key(key):
+    coco_dict = _create_coco_dict()
+    del coco_dict[key]
+    with pytest.raises(ValueError, match=f"'{key}' key not found"):
+        coco_to_yolo(coco_dict)
+
+def test_coco_to_yolo_empty_categories():
+    coco_dict = _create_coco_dict()
+    coco_dict["categories"] = []
+    with pytest.raises(ValueError, match="'categories' is empty"):
+        coco_to_yolo(coco_dict)
+
+def test_coco_to_yolo_malformed_element():
+    coco_dict = _create_coco_dict()
+    del coco_dict["images"][0]["width"]
+    with pytest.raises(ValueError, match="lacks \\['width'\\]"):
+        coco_to_yolo(coco_dict)
+    coco_dict = _create_coco_dict()
+    coco_dict["annotations"][0]["bbox"] = [10, 20, 50]
+    with pytest.raises(ValueError, match="bbox of 4 values"):
+        coco_to_yolo(coco_dict)
+
+def test_coco_to_yolo_unknown_category():
+    coco_dict = _create_coco_dict()
+    coco_dict["annotations"][1]["category_id"] = 7
+    with pytest.raises(ValueError, match="Category id 7 of annotation 2 not found"):
+        coco_to_yolo(coco_dict)
+
+
+def _create_xml(name="dog", size=True):
+    size_text = "<size><width>10</width><height>8</height><depth>3</depth></size>" if size else ""
+    return (
+        f"<annotation><filename>{name}.jpg</filename>{size_text}"
+        f"<object><name>{name}</name><bndbox><xmin>1</xmin><ymin>2</ymin><xmax>5</xmax><ymax>6</ymax></bndbox></object>"
+        "</annotation>"
+    )
+
+@pytest.mark.parametrize("voc_parser", ["fast", "etree"])
+def test_voc_to_coco(voc_parser):
+    result = voc_to_coco([_create_xml("dog"), _create_xml("cat").encode("utf-8")], voc_parser=voc_parser)
+    # Class ids in sorted class name order
+    assert [(category["id"], category["name"]) for category in result["categories"]] == [(1, "cat"), (2, "dog")]
+    assert [(image["id"], image["file_name"], image["width"], image["height"]) for image in result["images"]] == [
+        (0, "dog.jpg", 10, 8), (1, "cat.jpg", 10, 8)
+    ]
+    assert [(annotation["image_id"], annotation["category_id"], annotation["bbox"]) for annotation in result["annotations"]] == [
+        (0, 2, [1, 2, 4, 4]), (1, 1, [1, 2, 4, 4])
+    ]
+
+def test_voc_to_coco_without_size():
+    result = voc_to_coco([_create_xml("dog", size=False), _create_xml("cat")], class_list=["cat", "dog"])
+    assert [image["id"] for image in result["images"]] == [1]
+    assert [annotation["category_id"] for annotation in result["annotations"]] == [1]
+    # Classes are given by 'class_list'
+    assert [category["name"] for category in result["categories"]] == ["cat", "dog"]
+
+def test_voc_to_coco_unknown_class():
+    with pytest.raises(ValueError, match="Class 'dog' of 1-th XML not found"):
+        voc_to_coco([_create_xml("cat"), _create_xml("dog")], class_list=["cat"])
+
+@pytest.mark.parametrize("voc_parser", ["fast", "etree"])
+def test_voc_to_coco_malformed_xml(voc_parser):
+    with pytest.raises(ValueError, match="1-th XML could not be parsed"):
+        voc_to_coco([_create_xml("cat"), "<annotation><size>"], voc_parser=voc_parser)
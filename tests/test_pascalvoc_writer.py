@@ -0,0 +1,35 @@
+import struct
+import zlib
+
+from objdet_converter.utils.annotation_writer import PascalVOCFileWriter
+
+
+def write_grayscale_png(path, width, height):
+    # Color type 0: grayscale
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)
+    chunk = b"IHDR" + ihdr
+    path.write_bytes(b"\x89PNG\r\n\x1a\n" + struct.pack(">I", len(ihdr)) + chunk + struct.pack(">I", zlib.crc32(chunk)))
+
+def test_grayscale_image_bytes(tmp_path):
+    image_path = tmp_path / "images" / "gray.png"
+    image_path.parent.mkdir()
+    write_grayscale_png(image_path, 64, 48)
+    writer = PascalVOCFileWriter(tmp_path / "voc", {1: "cat & dog"}, {"cat & dog": 1})
+    # Channels are probed from image file since reader did not provide them
+    image_info = {"file_name": "gray.png", "file_path": str(image_path), "width": 64, "height": 48}
+    assert writer.write_records([(0, image_info, [(1, [10, 5, 20, 30], None)])]) == []
+    expected = (
+        "<annotation>\n"
+        "  <folder>images</folder>\n"
+        "  <filename>gray.png</filename>\n"
+        f"  <path>{image_path}</path>\n"
+        "  <source>\n    <database>Unknown</database>\n  </source>\n"
+        "  <size>\n    <width>64</width>\n    <height>48</height>\n    <depth>1</depth>\n  </size>\n"
+        "  <segmented>1</segmented>\n"
+        "  <object>\n    <name>cat &amp; dog</name>\n    <pose>Unspecified</pose>\n"
+        "    <truncated>0</truncated>\n    <difficult>0</difficult>\n"
+        "    <bndbox>\n      <xmin>10</xmin>\n      <ymin>5</ymin>\n"
+        "      <xmax>30</xmax>\n      <ymax>35</ymax>\n    </bndbox>\n  </object>\n"
+        "</annotation>"
+    ).encode("ascii")
+    assert (tmp_path / "voc" / "gray.xml").read_bytes() == expected
@@ -0,0 +1,34 @@
+import io
+
+from objdet_converter.utils.progress import ProgressPrinter, ProgressReporter
+
+
+def test_track_counts_skipped_inputs():
+    progress_list = list()
+    reporter = ProgressReporter(progress_list.append, interval=0.0)
+    # Records of inputs 1 and 4 are skipped
+    records = [(0, None, []), (2, None, []), (3, None, [])]
+    assert list(reporter.track(records, "parse", 5, lambda record: record[0] + 1)) == records
+    assert [progress["done"] for progress in progress_list] == [1, 3, 4, 5]
+    assert progress_list[-1]["finished"]
+
+def test_track_without_callback_returns_items():
+    items = [1, 2, 3]
+    assert ProgressReporter().track(items, "write") is items
+
+def test_printer_keeps_unfinished_stage():
+    f = io.StringIO()
+    printer = ProgressPrinter(f)
+    reporter = ProgressReporter(printer, interval=0.0)
+    parse_iterator = iter(reporter.track(range(2), "parse", 2))
+    # Item is counted when the next item is requested
+    next(parse_iterator)
+    next(parse_iterator)
+    list(reporter.track(range(3), "write", 3))
+    list(parse_iterator)
+    line_list = f.getvalue().split("\n")
+    # Each finished stage is left in its own line, and unfinished parse is not overwritten
+    assert line_list[0].split("\r")[-1].startswith("[write] 3/3")
+    assert "[parse] 1/2" in line_list[0]
+    assert line_list[1].split("\r")[-1].startswith("[parse] 2/2")
+    assert line_list[2] == ""
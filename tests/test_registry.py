@@ -0,0 +1,24 @@
+import pytest
+
+from objdet_converter.utils.annotation_writer import AnnotationFileWriter, BaseWriter
+from objdet_converter.utils.registry import get_writer_class, register_writer
+
+
+class IncompleteFileWriter(AnnotationFileWriter):
+    format_name = "Incomplete"
+
+
+class IncompleteWriter(BaseWriter):
+    pass
+
+
+def test_register_writer_without_abstract_methods():
+    with pytest.raises(TypeError, match="does not implement \\['convert_bboxes'\\]"):
+        register_writer("incomplete_file", IncompleteFileWriter)
+    with pytest.raises(TypeError, match="does not implement \\['write_records'\\]"):
+        register_writer("incomplete", IncompleteWriter)
+    assert get_writer_class("incomplete") is None
+
+def test_instantiate_writer_without_abstract_methods(tmp_path):
+    with pytest.raises(TypeError):
+        IncompleteWriter(tmp_path, dict(), dict())
@@ -0,0 +1,33 @@
+import os
+
+from objdet_converter.utils.utils import check_image_existence, scan_annotation_dir
+
+
+def expected_pairs(src_path, annotation_suffix):
+    annotation_image_list = list()
+    for annotation_path in sorted(src_path.glob(f"**/*{annotation_suffix}")):
+        ext = check_image_existence(annotation_path)
+        annotation_image_list.append((annotation_path, None if ext is None else annotation_path.with_suffix(ext)))
+    return annotation_image_list
+
+def test_scan_annotation_dir_same_as_glob(tmp_path):
+    for name in ["x.txt", "x.jpg", "y.txt", "a/z.txt", "a/z.png", "a/z.jpg", "a/b/w.txt", "a/b/v.bmp", "a/c/u.txt"]:
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("")
+    assert scan_annotation_dir(tmp_path, "txt") == expected_pairs(tmp_path, "txt")
+
+def test_scan_annotation_dir_does_not_follow_symlinks(tmp_path):
+    dataset_path = tmp_path / "dataset"
+    (dataset_path / "a").mkdir(parents=True)
+    (dataset_path / "a" / "x.txt").write_text("")
+    (dataset_path / "a" / "x.jpg").write_text("")
+    other_path = tmp_path / "other"
+    other_path.mkdir()
+    (other_path / "y.txt").write_text("")
+    # Symlink cycle and symlinked directory
+    os.symlink("..", dataset_path / "a" / "loop")
+    os.symlink(other_path, dataset_path / "linked")
+    annotation_image_list = scan_annotation_dir(dataset_path, "txt")
+    assert annotation_image_list == [(dataset_path / "a" / "x.txt", dataset_path / "a" / "x.jpg")]
+    assert annotation_image_list == expected_pairs(dataset_path, "txt")
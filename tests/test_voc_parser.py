@@ -0,0 +1,121 @@
+from pathlib import Path
+import random
+
+import pytest
+
+from objdet_converter.utils import voc_parser
+from objdet_converter.utils.voc_parser import parse_etree, parse_fast
+
+OBJECT_TEMPLATE_LIST = [
+    "<object><name>{n}</name><pose>U</pose><truncated>0</truncated><difficult>0</difficult>"
+    "<bndbox><xmin>{a}</xmin><ymin>{b}</ymin><xmax>{c}</xmax><ymax>{d}</ymax></bndbox></object>",
+    "<object>\n <name>{n}</name>\n <bndbox>\n  <xmin> {a} </xmin>\n  <ymin>{b}</ymin>\n  <xmax>{c}</xmax>\n"
+    "  <ymax>{d}</ymax>\n </bndbox>\n <difficult>1</difficult>\n</object>",
+    "<object><name>{n}</name></object>",
+    "<object><bndbox><xmin>{a}</xmin><ymin>{b}</ymin><xmax>{c}</xmax><ymax>{d}</ymax></bndbox></object>",
+    "<object><name>{n}</name><bndbox><xmin>{a}</xmin><ymin>{b}</ymin><xmax>{c}</xmax></bndbox></object>",
+    "<object><name>{n}</name><part><name>hand</name><bndbox><xmin>1</xmin><ymin>1</ymin><xmax>2</xmax><ymax>2</ymax></bndbox></part>"
+    "<bndbox><xmin>{a}</xmin><ymin>{b}</ymin><xmax>{c}</xmax><ymax>{d}</ymax></bndbox></object>",
+    "<object id=\"3\"><name>{n}</name><bndbox><xmin>{a}</xmin><ymin>{b}</ymin><xmax>{c}</xmax><ymax>{d}</ymax></bndbox></object>",
+    "<object><name>{n} &amp; co</name><bndbox><xmin>{a}</xmin><ymin>{b}</ymin><xmax>{c}</xmax><ymax>{d}</ymax></bndbox></object>",
+    "<object><name><![CDATA[{n}]]></name><bndbox><xmin>{a}</xmin><ymin>{b}</ymin><xmax>{c}</xmax><ymax>{d}</ymax></bndbox></object>",
+    "<!-- c --><object><name>{n}</name><bndbox><xmin>{a}</xmin><ymin>{b}</ymin><xmax>{c}</xmax><ymax>{d}</ymax></bndbox></object>",
+    "<object><name>{n}</name><bndbox><xmin>{a}</xmin><ymin>{b}</ymin><xmax>{c}</xmax><ymax>{d}</ymax></bndbox>"
+    "<attributes><a>1</a></attributes></object>",
+    "<object><name>{n}</name><bndbox><xmin>{a}.5</xmin><ymin>{b}</ymin><xmax>{c}</xmax><ymax>{d}</ymax></bndbox></object>",
+]
+HEADER_TEMPLATE_LIST = [
+    "<folder>f</folder><filename>{fn}</filename><size><width>640</width><height>480</height><depth>3</depth></size>",
+    "<filename>{fn}</filename>",
+    "<size><width>640</width><height>480</height></size>",
+    "<size></size>",
+    "<size><depth>3</depth></size>",
+    "<size><width>640</width></size>",
+    "<size><height>480</height></size>",
+    "<source><filename>nested.jpg</filename></source><filename>{fn}</filename>",
+    "<filename></filename>",
+    "<filename>  {fn}\n</filename>",
+    "<owner><name>me</name></owner><size><width> 64 </width><height>48</height></size>",
+    "<size><width>1</width><height>2</height></size><size><width>3</width><height>4</height></size>",
+    "<segmented/>",
+    "",
+]
+DECLARATION_LIST = [
+    "",
+    "<?xml version=\"1.0\"?>\n",
+    "<?xml version='1.0' encoding='utf-8'?>",
+    " ",
+    "<?xml version=\"1.0\" encoding=\"ISO-8859-1\"?>",
+]
+ROOT_LIST = [
+    ("<annotation>", "</annotation>"),
+    ("<annotation verified=\"yes\">", "</annotation>"),
+    ("<root>", "</root>"),
+    ("<annotation>", "</annotation> junk"),
+    ("<annotation>", "</annotation>\n\n"),
+    ("<annotation>", "</annotatio>"),
+]
+STANDARD_TEXT = (
+    "<annotation>\n  <filename>x.jpg</filename>\n  <size>\n    <width>640</width>\n    <height>480</height>\n"
+    "    <depth>3</depth>\n  </size>\n  <object>\n    <name>dog</name>\n    <bndbox>\n      <xmin>1</xmin>\n"
+    "      <ymin>2</ymin>\n      <xmax>3</xmax>\n      <ymax>4</ymax>\n    </bndbox>\n  </object>\n</annotation>"
+)
+
+
+def create_random_document(rng: random.Random) -> bytes:
+    declaration = rng.choice(DECLARATION_LIST)
+    root_start, root_end = rng.choice(ROOT_LIST)
+    objects = "".join(
+        rng.choice(OBJECT_TEMPLATE_LIST).format(n=rng.choice(["dog", "cat", "a b", "ü"]), a=rng.randint(0, 9), b=5, c=20, d=30)
+        for _ in range(rng.randint(0, 4))
+    )
+    header = rng.choice(HEADER_TEMPLATE_LIST).format(fn=rng.choice(["x.jpg", "日本.png"]))
+    part_list = [header, objects]
+    rng.shuffle(part_list)
+    line_break = rng.choice(["", "\n", "\r\n"])
+    text = declaration + root_start + line_break + line_break.join(part_list) + line_break + root_end
+    if "ISO" in declaration:
+        return text.encode("latin-1", errors="replace")
+    return text.encode("utf-8")
+
+def parse_or_error(parse_func, data: bytes):
+    try:
+        return "ok", parse_func(Path("0.xml"), None, data)
+    except Exception as e:
+        return "error", type(e).__name__
+
+def count_fallback(monkeypatch) -> list:
+    fallback_list = list()
+    def parse_etree_counted(*args):
+        fallback_list.append(args)
+        return parse_etree(*args)
+    monkeypatch.setattr(voc_parser, "parse_etree", parse_etree_counted)
+    return fallback_list
+
+def test_fast_same_as_etree_on_random_documents():
+    rng = random.Random(0)
+    for _ in range(500):
+        data = create_random_document(rng)
+        assert parse_or_error(parse_fast, data) == parse_or_error(parse_etree, data), data
+
+def test_fast_parses_standard_layout_without_fallback(monkeypatch):
+    fallback_list = count_fallback(monkeypatch)
+    data = STANDARD_TEXT.encode("utf-8")
+    assert parse_fast(Path("0.xml"), None, data) == parse_etree(Path("0.xml"), None, data)
+    assert fallback_list == []
+
+@pytest.mark.parametrize("old, new", [
+    ("<object>", "<!-- comment --><object>"),
+    ("<name>dog</name>", "<name><![CDATA[dog]]></name>"),
+    ("<name>dog</name>", "<name>dog &amp; cat</name>"),
+    ("<object>", "<object id=\"1\">"),
+    ("</bndbox>", "</bndbox><part><name>hand</name></part>"),
+    ("<name>dog</name>", "<name>dog</name><extra>1</extra>"),
+    ("<depth>3</depth>", "<depth />"),
+    ("<annotation>", "<?xml version=\"1.0\" encoding=\"ISO-8859-1\"?><annotation>"),
+])
+def test_fast_falls_back_to_etree(monkeypatch, old, new):
+    fallback_list = count_fallback(monkeypatch)
+    data = STANDARD_TEXT.replace(old, new, 1).encode("utf-8")
+    assert parse_fast(Path("0.xml"), None, data) == parse_etree(Path("0.xml"), None, data)
+    assert len(fallback_list) == 1